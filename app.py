@@ -12,10 +12,12 @@ from dotenv import load_dotenv
 # Utils
 from src.utils.state import init_session_state
 from src.utils.expert import check_expert_timeout
-from src.utils.ui import show_conversation, add_message, show_debug_panel, stream_message
-from src.utils.cascading_orchestrator import orchestrate_cascading_response
+from src.utils.ui import show_conversation, add_message, show_debug_panel, stream_message, stream_sections
+from src.utils.cascading_orchestrator import orchestrate_cascading_response, stream_cascading_response
 from src.utils.conversation_memory import conversation_memory
 from src.utils.voice_input import voice_interface
+from src.utils.tracing import tracer
+from src.utils.prewarm import expert_prewarmer, PREWARM_ENABLED
 
 
 
@@ -90,10 +92,15 @@ def set_local_background():
 
 load_dotenv()
 DEBUG_MODE = False
+STREAMING_MODE = True  # Render LLM tokens as they arrive instead of replaying the finished turn
 
 # --- Initialize app ---
 init_session_state()
 
+# Start loading the psychology expert now, not on the first turn that needs it (once per process)
+if PREWARM_ENABLED:
+    expert_prewarmer.start()
+
 # Unique session ID for conversation memory
 if 'session_id' not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
@@ -136,23 +143,31 @@ if user_input and user_input != st.session_state.last_input:
         if DEBUG_MODE:
             print(f"DEBUG: Starting cascading response for: {user_input}")
         
-        # 🎯 SINGLE CALL THAT MANAGES EVERYTHING
-        results = orchestrate_cascading_response(user_input, session_id=st.session_state.session_id, debug=DEBUG_MODE)
-        
-        # Build the complete response
-        complete_response = results['peer']
-        
-        if results['expert']:
-            complete_response += f"\n\n🧠 {results['expert']}"
-        
-        complete_response += f"\n\n{results['followup']}"
-        
-        # Display everything in one smooth stream
-        with st.chat_message("assistant"):
-            stream_message(complete_response, speed=0.01)
-        
-        st.session_state.conversation_history.append(("assistant", complete_response))
-        conversation_memory.add_message(st.session_state.session_id, "assistant", complete_response)
+        with tracer.turn(session_id=st.session_state.session_id):
+            if STREAMING_MODE:
+                # 🎯 Tokens flow straight from the LLMs into the chat bubble
+                with st.chat_message("assistant"), tracer.span("ui.render", streaming=True):
+                    complete_response = stream_sections(
+                        stream_cascading_response(user_input, session_id=st.session_state.session_id, debug=DEBUG_MODE)
+                    )
+            else:
+                # 🎯 SINGLE CALL THAT MANAGES EVERYTHING
+                results = orchestrate_cascading_response(user_input, session_id=st.session_state.session_id, debug=DEBUG_MODE)
+                
+                # Build the complete response
+                complete_response = results['peer']
+                
+                if results['expert']:
+                    complete_response += f"\n\n🧠 {results['expert']}"
+                
+                complete_response += f"\n\n{results['followup']}"
+                
+                # Display everything in one smooth stream
+                with st.chat_message("assistant"), tracer.span("ui.render"):
+                    stream_message(complete_response, speed=0.01)
+            
+            st.session_state.conversation_history.append(("assistant", complete_response))
+            conversation_memory.add_message(st.session_state.session_id, "assistant", complete_response)
         
     except Exception as e:
         error_msg = f"I'm having trouble connecting right now. Please try again."
@@ -0,0 +1,130 @@
+# src/benchmarks/ann_recall.py
+"""
+Recall@k and latency of the ANN tier against exact search.
+
+Sweeps nprobe (IVF-PQ) or efSearch (HNSW) over an exported index, or over a
+synthetic clustered corpus to see how the tier behaves far beyond the
+current knowledge base:
+
+    python -m src.benchmarks.ann_recall --kind hnsw --ef-search 16,32,64,128
+    python -m src.benchmarks.ann_recall --synthetic 1000000 --kind ivfpq --nprobe 4,16,64
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+
+from src.benchmarks.vector_search import make_queries, percentile
+from src.core.ann_index import AnnVectorIndex
+from src.core.vector_index import (
+    MemmapVectorIndex, ChunkStoreWriter, MANIFEST_FILE, EMBEDDINGS_FILE, INDEX_FORMAT_VERSION
+)
+from src.data_processing.build_ann_index import build_ann_index
+
+DEFAULT_INDEX_DIR = "./outputs/psychology_books_index"
+
+
+def make_synthetic_index(output_dir, count, queries=0, dim=384, clusters=1000, block_rows=65536, seed=0):
+    """
+    Clustered unit vectors in the exported-index layout (float16, placeholder texts).
+
+    Returns `queries` held-out vectors drawn from the same clusters but never
+    written to the index, so recall reflects unseen questions rather than
+    near-copies of stored rows.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+
+    def sample(n):
+        block = centers[rng.integers(0, clusters, size=n)] + rng.normal(0, 0.6, size=(n, dim)).astype(np.float32)
+        return block / np.linalg.norm(block, axis=1, keepdims=True)
+
+    matrix = np.lib.format.open_memmap(
+        os.path.join(output_dir, EMBEDDINGS_FILE), mode="w+", dtype=np.float16, shape=(count, dim)
+    )
+    for start in range(0, count, block_rows):
+        n = min(block_rows, count - start)
+        matrix[start:start + n] = sample(n)
+    matrix.flush()
+    del matrix
+
+    chunks = ChunkStoreWriter(output_dir)
+    for row in range(count):
+        chunks.add(f"synthetic-{row}", "")
+    chunks.close()
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({"format_version": INDEX_FORMAT_VERSION, "dtype": "float16", "dim": dim, "count": count,
+                   "embedding_model": "synthetic", "source": "synthetic"}, f)
+    return sample(queries)
+
+
+def evaluate(index, queries, truth, k):
+    """(recall@k, latencies_ms) of `index` against the exact top-k rows"""
+    hits, latencies = 0, []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        rows, _ = index.top_k(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(rows.tolist()) & set(expected.tolist()))
+    return hits / (len(queries) * k), latencies
+
+
+def run(index_dir, args, queries=None):
+    exact = MemmapVectorIndex(index_dir)
+    if queries is None:
+        queries = make_queries(index_dir, args.queries, args.noise)
+
+    exact_latencies, truth = [], []
+    for query in queries:
+        start = time.perf_counter()
+        truth.append(exact.top_k(query, args.k)[0])
+        exact_latencies.append((time.perf_counter() - start) * 1000)
+
+    if args.build or not os.path.exists(os.path.join(index_dir, "ann.json")):
+        build_ann_index(index_dir, kind=args.kind, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+    ann = AnnVectorIndex(index_dir, rerank=args.rerank)
+
+    knob = "nprobe" if ann.params["kind"] == "ivfpq" else "ef_search"
+    values = [int(v) for v in (args.nprobe if knob == "nprobe" else args.ef_search).split(",")]
+
+    print(f"📊 {len(exact):,} chunks, {args.queries} queries, k={args.k}, {ann.params['kind']}, rerank={args.rerank}")
+    print(f"   exact    : recall 100.0%, p50 {percentile(exact_latencies, 0.5):.2f}ms, "
+          f"p95 {percentile(exact_latencies, 0.95):.2f}ms")
+    for value in values:
+        ann.set_search_params(**{knob: value})
+        recall, latencies = evaluate(ann, queries, truth, args.k)
+        print(f"   {knob}={value:<4}: recall {recall:.1%}, p50 {percentile(latencies, 0.5):.2f}ms, "
+              f"p95 {percentile(latencies, 0.95):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs exact search for the ANN tier")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark a synthetic corpus of this many chunks")
+    parser.add_argument("--kind", choices=["ivfpq", "hnsw"], default="ivfpq")
+    parser.add_argument("--build", action="store_true", help="rebuild the ANN index even if one exists")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--nprobe", default="1,4,16,64")
+    parser.add_argument("--ef-search", default="16,32,64,128")
+    parser.add_argument("--rerank", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=0.05, help="query noise for exported indexes (synthetic runs use held-out queries)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(f"Generating {args.synthetic:,} synthetic chunks...")
+            queries = make_synthetic_index(tmp, args.synthetic, queries=args.queries)
+            args.build = True
+            run(tmp, args, queries)
+    else:
+        run(args.index_dir, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# src/benchmarks/cleaner_throughput.py
+"""
+Golden-output check and pages/sec benchmark for AcademicPDFCleaner.
+
+The reference is a frozen copy of the cleaner before it was compiled
+(`LegacyAcademicPDFCleaner`). The golden corpus is synthetic book pages
+plus hand-written edge cases for every rule and rule interaction. The
+check has two parts:
+
+- clean_text must match the reference exactly on every page;
+- clean_pages must match the reference run on each page once the
+  detected document-level headers/footers are removed. That header
+  removal is the only intended change.
+
+The run exits non-zero on any mismatch, so it doubles as a regression test.
+
+    python -m src.benchmarks.cleaner_throughput --books 20 --pages 200
+"""
+import argparse
+import re
+import sys
+import time
+import numpy as np
+
+from src.benchmarks.pdf_ingestion import _page_lines
+from src.data_processing.build_knowledge_base import AcademicPDFCleaner
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "Grief is love with nowhere to go. See https://example.org/grief?a=1 and www.petloss.org today.",
+    "Read [the guide](https://example.org/guide) before the [appointment](notes.md).",
+    "As shown (see Figure 3) and [Fig. 2b] and Table 4.1, grief varies (See fig 7).",
+    "Contact dr.smith@www.vetclinic.org or grief-support@example.co.uk for help.",
+    "Bonds persist (Field et al., 2009; Packman et al., 2011) and [3, (Ross et al. 2004), 9] too.",
+    "[Nested (Smith et al., 2020) citation] and (unclosed et al. citation",
+    "• First point\n▪ Second point\n♦ Third ▶ fourth ● fifth",
+    "Disenfran-\nchised grief is com-\nmon after pet loss.\fNext page starts here.",
+    "A hyphen at the end -\n• bullet after the break",
+    "Sentence one.  Sentence two!\n\n\nSentence three?   Done.\t\tTabs.",
+    "Chapter 3\nChapter 3\nChapter 3\nThe body of the chapter.\nChapter 3",
+    "Introduction\nIntroduction\nIntroduction\nMethods\nMethods\nMethods\nok\nok\nok\nok",
+    "A line that is repeated but longer than sixty characters in total, so it stays.\n" * 4,
+    "Café naïve façade — “quotes” and ‘single’ … ellipsis. Ünïcödé dash – en dash.",
+]
+
+
+class LegacyAcademicPDFCleaner:
+    """The cleaner before it was compiled, kept verbatim as the golden reference"""
+
+    def clean_text(self, text: str) -> str:
+        if not text:
+            return ""
+
+        # 1. Remove URLs and hyperlinks
+        text = re.sub(r'https?://\S+|www\.\S+', '', text)
+        text = re.sub(r'\[.*?\]\(.*?\)', '', text)  # Markdown links
+
+        # 2. Remove image and figure references
+        text = re.sub(r'\[?\b(Figure|Fig\.?|Table|Chart)\s+[A-Za-z0-9\.]+\]?', '', text)
+        text = re.sub(r'\(?[Ss]ee\s+[Ff]ig(?:ure)?\.?\s+[A-Za-z0-9\.]+\)?', '', text)
+
+        # 3. Remove email addresses
+        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
+
+        # 4. Remove citation clusters (keep individual citations)
+        text = re.sub(r'\([^)]*et al\.[^)]*\)', '', text)  # (Smith et al., 2020; Jones et al., 2021)
+        text = re.sub(r'\[[^\]]*et al\.[^\]]*\]', '', text)  # [1-5, 7, 9]
+
+        # 5. Clean page headers/footers (common in academic PDFs)
+        text = self._remove_repeating_headers(text)
+
+        # 6. Remove orphaned characters from PDF extraction
+        text = re.sub(r'\s*[•▪♦▶●]\s*', ' ', text)  # Bullet points
+        text = re.sub(r'\f', '\n', text)  # Form feeds to newlines
+        text = re.sub(r'-\n(\w)', r'\1', text)  # Join hyphenated words across lines
+
+        # 7. Normalize whitespace and preserve paragraph structure
+        text = re.sub(r'([.!?])\s+', r'\1\n\n', text)  # Sentence endings get double newlines
+        text = re.sub(r'\s+', ' ', text)  # Collapse multiple spaces
+        text = re.sub(r'\n\s*\n', '\n\n', text)  # Clean paragraph breaks
+
+        return text.strip()
+
+    def _remove_repeating_headers(self, text: str) -> str:
+        lines = text.split('\n')
+        cleaned_lines = []
+        line_frequency = {}
+
+        # Count line frequency
+        for line in lines:
+            clean_line = line.strip()
+            if len(clean_line) > 3:  # Ignore very short lines
+                line_frequency[clean_line] = line_frequency.get(clean_line, 0) + 1
+
+        # Remove lines that appear too frequently (likely headers/footers)
+        threshold = max(3, len(lines) // 20)  # Dynamic threshold
+        for line in lines:
+            clean_line = line.strip()
+            if (line_frequency.get(clean_line, 0) < threshold or
+                len(clean_line) > 60 or  # Long lines are probably content
+                any(keyword in clean_line.lower() for keyword in ['abstract', 'introduction', 'method', 'result', 'discussion', 'conclusion'])):
+                cleaned_lines.append(line)
+
+        return '\n'.join(cleaned_lines)
+
+
+def make_books(books: int, pages: int, lines_per_page: int):
+    """Synthetic documents: lists of page texts with a running header and page-number footer"""
+    corpus = []
+    for seed in range(books):
+        rng = np.random.default_rng(seed)
+        title = f"Journal of Companion Animal Bereavement, Vol. {seed % 40 + 1}"
+        corpus.append(["\n".join(_page_lines(rng, title, page, lines_per_page)) + f"\nPage {page} of {pages}"
+                       for page in range(1, pages + 1)])
+    return corpus
+
+
+def check_golden(cleaner, legacy, books) -> int:
+    """Number of mismatching pages (details of the first few are printed)"""
+    failures = 0
+
+    def report(kind, page, expected, actual):
+        nonlocal failures
+        failures += 1
+        if failures <= 3:
+            at = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+            print(f"❌ {kind} mismatch on {page!r:.60}: expected …{expected[at:at + 40]!r}, got …{actual[at:at + 40]!r}")
+
+    for page in EDGE_CASES + [page for book in books for page in book]:
+        expected, actual = legacy.clean_text(page), cleaner.clean_text(page)
+        if expected != actual:
+            report("clean_text", page, expected, actual)
+
+    for book in books:
+        boilerplate = cleaner.find_boilerplate(book)
+        for page, actual in zip(book, cleaner.clean_pages(book)):
+            expected = legacy.clean_text(cleaner._strip_boilerplate(page, boilerplate))
+            if expected != actual:
+                report("clean_pages", page, expected, actual)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-output check and pages/sec for AcademicPDFCleaner")
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=200, help="pages per book")
+    parser.add_argument("--lines", type=int, default=45, help="text lines per page")
+    args = parser.parse_args()
+
+    cleaner, legacy = AcademicPDFCleaner(), LegacyAcademicPDFCleaner()
+    books = make_books(args.books, args.pages, args.lines)
+    total_pages = args.books * args.pages
+
+    failures = check_golden(cleaner, legacy, books)
+    print(f"{'✅' if not failures else '❌'} golden check: {len(EDGE_CASES)} edge cases + {total_pages} pages, "
+          f"{failures} mismatches")
+
+    start = time.perf_counter()
+    legacy_chars = sum(len(legacy.clean_text(page)) for book in books for page in book)
+    legacy_s = time.perf_counter() - start
+    start = time.perf_counter()
+    chars = sum(len(page) for book in books for page in cleaner.clean_pages(book))
+    compiled_s = time.perf_counter() - start
+
+    print(f"📊 {total_pages} pages ({args.books} books × {args.pages})")
+    print(f"   legacy clean_text:    {total_pages / legacy_s:,.0f} pages/s, {legacy_chars:,} chars out")
+    print(f"   compiled clean_pages: {total_pages / compiled_s:,.0f} pages/s, {chars:,} chars out "
+          f"({legacy_s / compiled_s:.1f}× faster, {legacy_chars - chars:,} chars of headers/footers removed)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# src/benchmarks/cold_start.py
+"""
+Cold-start cost of the psychology expert in a fresh process: how long the
+background prewarm takes per stage, and what the first retrieval costs
+once it reports ready.
+
+    python -m src.benchmarks.cold_start
+"""
+import multiprocessing
+import time
+
+
+def _measure(results):
+    start = time.perf_counter()
+    from src.utils.prewarm import expert_prewarmer
+    import_ms = (time.perf_counter() - start) * 1000
+
+    expert_prewarmer.start()
+    expert_prewarmer.wait_ready()
+    stats = expert_prewarmer.stats()
+
+    retrieval_ms = None
+    if expert_prewarmer.is_ready:
+        from src.core.psychology_rag import PsychologyBookExpert
+        start = time.perf_counter()
+        PsychologyBookExpert().retrieve("Is it normal to still feel guilty months later?")
+        retrieval_ms = (time.perf_counter() - start) * 1000
+    results.put((import_ms, stats, retrieval_ms))
+
+
+def main():
+    ctx = multiprocessing.get_context("spawn")  # a genuinely cold interpreter
+    results = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(results,))
+    proc.start()
+    import_ms, stats, retrieval_ms = results.get()
+    proc.join()
+
+    print(f"📦 imports: {import_ms:.0f}ms")
+    print(f"🔥 prewarm: {stats}")
+    if retrieval_ms is not None:
+        print(f"⚡ first retrieval after prewarm: {retrieval_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
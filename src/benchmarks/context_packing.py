@@ -0,0 +1,126 @@
+# src/benchmarks/context_packing.py
+"""
+MMR re-rank latency, and grounding of packed vs truncated expert context.
+
+The re-rank part runs on synthetic unit vectors (MiniLM's 384 dims). It
+times `mmr` per candidate count and checks its picks against a
+straightforward pure-Python MMR. With `--index`, the grounding part runs
+the hybrid benchmark's grief queries against a real index. It compares
+the old context (top-1 chunk cut at 200 characters) with MMR + sentence
+packing, reporting the key-term hit rate, tokens and how many contexts
+end mid-sentence.
+
+    python -m src.benchmarks.context_packing --candidates 10,20,50,100
+    python -m src.benchmarks.context_packing --index data/outputs/psychology_books_snapshots
+"""
+import argparse
+import os
+import time
+import numpy as np
+
+from src.benchmarks.vector_search import percentile
+from src.core.context_packing import mmr, pack_sentences, MMR_K, MMR_LAMBDA, CONTEXT_TOKENS, RETRIEVAL_CANDIDATES
+from src.utils.tokens import count_tokens
+
+
+def reference_mmr(scores, vectors, k, lambda_mult):
+    """MMR as usually written: a Python loop over candidates, similarities computed pairwise"""
+    scores = [float(score) for score in scores]
+    vectors = [np.asarray(vector, dtype=np.float64) for vector in vectors]
+    picked = [max(range(len(scores)), key=scores.__getitem__)]
+    while len(picked) < min(k, len(scores)):
+        best, best_objective = None, -np.inf
+        for candidate in range(len(scores)):
+            if candidate in picked:
+                continue
+            redundancy = max(float(vectors[candidate] @ vectors[other]) for other in picked)
+            objective = lambda_mult * scores[candidate] - (1 - lambda_mult) * redundancy
+            if objective > best_objective:
+                best, best_objective = candidate, objective
+        picked.append(best)
+    return picked
+
+
+def bench_rerank(candidate_counts, dim, k, lambda_mult, repeat):
+    rng = np.random.default_rng(0)
+    print(f"📊 MMR re-rank, {dim}-dim vectors, k={k}, lambda={lambda_mult}, {repeat} runs per size")
+    for n in candidate_counts:
+        latencies, reference_latencies, mismatches = [], [], 0
+        for _ in range(repeat):
+            query = rng.standard_normal(dim).astype(np.float32)
+            # Candidates cluster around the query, with near-duplicates, like real top-N lists
+            vectors = query + rng.standard_normal((n, dim)).astype(np.float32) * 1.5
+            vectors[n // 2:] = vectors[:n - n // 2] + rng.standard_normal((n - n // 2, dim)).astype(np.float32) * 0.1
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            scores = vectors @ (query / np.linalg.norm(query))
+
+            start = time.perf_counter()
+            picked = mmr(scores, vectors, k, lambda_mult)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            start = time.perf_counter()
+            expected = reference_mmr(scores, vectors, k, lambda_mult)
+            reference_latencies.append((time.perf_counter() - start) * 1e6)
+            mismatches += picked != expected
+        print(f"   N={n:>4}: numpy p50 {percentile(latencies, 0.5):7.1f}µs, p95 {percentile(latencies, 0.95):7.1f}µs | "
+              f"python loop p50 {percentile(reference_latencies, 0.5):8.1f}µs | {mismatches} pick mismatches")
+        if mismatches:
+            print("   ❌ numpy picks differ from the reference")
+
+
+def _open_index(path):
+    from src.core.kb_snapshot import SnapshotVectorIndex, current_snapshot
+    from src.core.vector_index import MemmapVectorIndex, MANIFEST_FILE
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return MemmapVectorIndex(path)
+    return SnapshotVectorIndex(current_snapshot(path) if os.path.isdir(path) else path)
+
+
+def bench_grounding(index_path, candidates, k, lambda_mult, budget):
+    from src.benchmarks.hybrid_retrieval import QUERIES
+    from src.core.embeddings import load_embedding_model
+
+    index = _open_index(index_path)
+    embeddings = load_embedding_model()
+    results = {"truncated": [], "packed": []}
+    latencies = []
+    for query, terms in QUERIES:
+        query_vector = embeddings.embed_query(query)
+        docs, scores, vectors = index.similarity_search_by_vector_with_vectors(query_vector, candidates)
+        if not docs:
+            continue
+        start = time.perf_counter()
+        picked = [docs[i].page_content for i in mmr(scores, vectors, k, lambda_mult)]
+        packed = pack_sentences(picked, budget)
+        latencies.append((time.perf_counter() - start) * 1000)
+        for name, context in (("truncated", docs[0].page_content[:200]), ("packed", packed)):
+            results[name].append((any(term in context.lower() for term in terms), count_tokens(context),
+                                  bool(context) and not context.rstrip().endswith(tuple(".!?\"”’)"))))
+
+    print(f"📊 {len(results['packed'])} queries, {len(index)} chunks, top-{candidates} → MMR {k} → {budget} tokens")
+    for name, rows in results.items():
+        hits, tokens, cut = zip(*rows) if rows else ((), (), ())
+        print(f"   {name:>9}: key-term hit {np.mean(hits):.0%}, {np.mean(tokens):.0f} tokens avg "
+              f"(max {max(tokens, default=0)}), {sum(cut)} end mid-sentence")
+    print(f"   re-rank + packing: p50 {percentile(latencies, 0.5):.2f}ms, p95 {percentile(latencies, 0.95):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MMR re-rank latency and packed-context grounding")
+    parser.add_argument("--candidates", default="10,20,50,100,200", help="candidate counts N to time")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=MMR_K)
+    parser.add_argument("--lambda-mult", type=float, default=MMR_LAMBDA)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=RETRIEVAL_CANDIDATES, help="candidates fetched in the grounding run")
+    parser.add_argument("--index", help="memmap index dir, snapshot dir or snapshot file for the grounding run")
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKENS, help="context tokens")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.candidates.split(",")]
+    bench_rerank(counts, args.dim, args.k, args.lambda_mult, args.repeat)
+    if args.index:
+        bench_grounding(args.index, args.top_n, args.k, args.lambda_mult, args.budget)
+
+
+if __name__ == "__main__":
+    main()
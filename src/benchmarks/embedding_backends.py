@@ -0,0 +1,117 @@
+# src/benchmarks/embedding_backends.py
+"""
+Parity and speed of the embedding backends (PyTorch, ONNX fp32, ONNX int8).
+
+Each backend runs in a fresh process, so load time and resident memory
+include importing its runtime. Parity is the cosine similarity between
+each backend's vectors and the PyTorch reference; the run exits non-zero
+if any backend falls below --min-cosine, so it doubles as a parity test.
+
+    python -m src.data_processing.export_onnx_embedder
+    python -m src.benchmarks.embedding_backends --min-cosine 0.99
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+import numpy as np
+
+from src.benchmarks.vector_search import percentile, rss_mb
+
+PARITY_TEXTS = [
+    "Is it normal to feel guilty after euthanasia?",
+    "My cat died last week and I can't stop crying.",
+    "What is the dual process model of grief?",
+    "Nobody understands why I'm so upset about a dog.",
+    "How do I explain to my children that our rabbit has died?",
+    "I keep hearing his collar jingle even though he's gone.",
+    "Should I adopt another pet or is it too soon?",
+    "Grief after pet loss can be as intense as grief after losing a person, and it is often disenfranchised.",
+    "ok",
+    "The anniversary of her death is next month and I'm dreading it. " * 8,  # longer than the 256-token cap
+]
+
+
+def _corpus(size, seed=0):
+    """Chunk-sized texts built from the parity sentences"""
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(PARITY_TEXTS[:8], size=rng.integers(3, 12))) for _ in range(size)]
+
+
+def _run_backend(backend, onnx_model_dir, queries, corpus, batch_size, results):
+    baseline = rss_mb()
+    start = time.perf_counter()
+    from src.core.embeddings import load_embedding_model
+    model = load_embedding_model(backend, onnx_model_dir)
+    model.embed_query("warm up")
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for text in queries:
+        start = time.perf_counter()
+        model.embed_query(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for offset in range(0, len(corpus), batch_size):
+        model.embed_documents(corpus[offset:offset + batch_size])
+    throughput = len(corpus) / (time.perf_counter() - start)
+
+    results.put((backend, {
+        "load_ms": load_ms,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "docs_per_s": throughput,
+        "rss_mb": rss_mb() - baseline,
+        "vectors": np.asarray(model.embed_documents(PARITY_TEXTS), dtype=np.float32),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends for parity, latency, throughput and RSS")
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--onnx-model-dir", default=None, help="defaults to EMPATHIA_ONNX_MODEL_DIR")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--corpus", type=int, default=512, help="chunks embedded for the throughput run")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="parity threshold against torch")
+    args = parser.parse_args()
+
+    from src.core.embeddings import ONNX_MODEL_DIR
+    onnx_model_dir = args.onnx_model_dir or ONNX_MODEL_DIR
+    queries = [PARITY_TEXTS[i % 8] + f" ({i})" for i in range(args.queries)]
+    corpus = _corpus(args.corpus)
+
+    ctx = multiprocessing.get_context("spawn")
+    report = {}
+    for backend in args.backends.split(","):
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(backend, onnx_model_dir, queries, corpus, args.batch_size, results))
+        proc.start()
+        name, stats = results.get()
+        proc.join()
+        report[name] = stats
+
+    print(f"📊 {args.queries} single queries, {args.corpus} chunks in batches of {args.batch_size}")
+    for name, stats in report.items():
+        print(f"   {name:>9}: load {stats['load_ms']:.0f}ms, query p50 {stats['p50_ms']:.2f}ms / "
+              f"p95 {stats['p95_ms']:.2f}ms, {stats['docs_per_s']:.0f} chunks/s, +{stats['rss_mb']:.0f} MB RSS")
+
+    if "torch" not in report:
+        return
+    failed = False
+    reference = report["torch"]["vectors"]
+    for name, stats in report.items():
+        if name == "torch":
+            continue
+        cosine = np.sum(reference * stats["vectors"], axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(stats["vectors"], axis=1)
+        )
+        ok = cosine.min() >= args.min_cosine
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name} parity vs torch: mean cosine {cosine.mean():.5f}, min {cosine.min():.5f}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# src/benchmarks/embedding_sidecar.py
+"""
+Concurrent query embedding: per-worker models vs. the shared sidecar.
+
+Simulates `--workers` processes each issuing `--queries` single-query
+embeddings from `--concurrency` threads. The baseline gives every worker
+its own model (what each Streamlit process does today); the sidecar run
+sends everything to one micro-batching model. Reports throughput,
+per-request latency and, for the sidecar, its batch-size / queue-wait
+metrics.
+
+    python -m src.benchmarks.embedding_sidecar --backend onnx-int8 --workers 4 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.benchmarks.embedding_backends import PARITY_TEXTS
+from src.benchmarks.vector_search import percentile
+
+
+def _serve(backend, socket_path, max_batch, max_wait_ms):
+    from src.core.embeddings import load_embedding_model
+    from src.core.embedding_service import EmbeddingServer
+    model = load_embedding_model(backend)
+    model.embed_documents(["warm up"])
+    asyncio.run(EmbeddingServer(model, socket_path, max_batch, max_wait_ms).serve())
+
+
+def _worker(backend, socket_path, queries, concurrency, start_barrier, results):
+    from src.core.embeddings import load_embedding_model
+    if socket_path:
+        from src.core.embedding_service import SidecarEmbeddings
+        model = SidecarEmbeddings(socket_path)
+    else:
+        model = load_embedding_model(backend)
+    model.embed_query("warm up")
+
+    def timed(text):
+        start = time.perf_counter()
+        model.embed_query(text)
+        return (time.perf_counter() - start) * 1000
+
+    start_barrier.wait()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(timed, queries))
+    results.put(latencies)
+
+
+def _run(ctx, backend, socket_path, args):
+    queries = [PARITY_TEXTS[i % 8] + f" ({i})" for i in range(args.queries)]
+    barrier = ctx.Barrier(args.workers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(backend, socket_path, queries, args.concurrency, barrier, results))
+        for _ in range(args.workers)
+    ]
+    for proc in procs:
+        proc.start()
+    barrier.wait()
+    start = time.perf_counter()
+    latencies = [ms for _ in procs for ms in results.get()]
+    elapsed = time.perf_counter() - start
+    for proc in procs:
+        proc.join()
+    return len(latencies) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared embedding sidecar against per-worker models")
+    parser.add_argument("--backend", default="torch", help="model backend (inside the sidecar, or per worker)")
+    parser.add_argument("--workers", type=int, default=4, help="simulated worker processes")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent sessions per worker")
+    parser.add_argument("--queries", type=int, default=200, help="queries per worker")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    throughput, latencies = _run(ctx, args.backend, None, args)
+    print(f"📊 {args.workers} workers × {args.concurrency} sessions, {args.queries} queries each")
+    print(f"   per-worker models: {throughput:.0f} queries/s, "
+          f"p50 {percentile(latencies, 0.5):.2f}ms / p95 {percentile(latencies, 0.95):.2f}ms")
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "embeddings.sock")
+    server = ctx.Process(target=_serve, args=(args.backend, socket_path, args.max_batch, args.max_wait_ms), daemon=True)
+    server.start()
+    while not os.path.exists(socket_path):
+        if not server.is_alive():
+            raise SystemExit("❌ Embedding sidecar failed to start")
+        time.sleep(0.05)
+    try:
+        throughput, latencies = _run(ctx, args.backend, socket_path, args)
+        from src.core.embedding_service import SidecarEmbeddings
+        stats = SidecarEmbeddings(socket_path).stats()
+    finally:
+        server.terminate()
+        server.join()
+    print(f"   shared sidecar:    {throughput:.0f} queries/s, "
+          f"p50 {percentile(latencies, 0.5):.2f}ms / p95 {percentile(latencies, 0.95):.2f}ms")
+    print(f"   sidecar batches: {stats['batches']} (mean size {stats['mean_batch_size']}, max {stats['max_batch_size']})")
+    print(json.dumps(stats["latency"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
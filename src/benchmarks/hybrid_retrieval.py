@@ -0,0 +1,85 @@
+# src/benchmarks/hybrid_retrieval.py
+"""
+Dense-only vs hybrid (BM25 + dense, RRF) retrieval on a fixed grief query set.
+
+A query counts as a hit when one of its top-k chunks contains the query's
+key term, i.e. the concept the user actually asked about.
+
+    python -m src.data_processing.build_bm25_index   # once, for KBs built before the BM25 step
+    python -m src.benchmarks.hybrid_retrieval --k 1
+"""
+import argparse
+import time
+from langchain_chroma import Chroma
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from src.benchmarks.vector_search import percentile
+from src.core.bm25_index import BM25Index, HybridRetriever, BM25_INDEX_DIR
+
+DEFAULT_CHROMA_DIR = "./outputs/psychology_books_db_clean"
+DEFAULT_BM25_DIR = BM25_INDEX_DIR
+
+# (query, key terms: a hit needs any of them in a retrieved chunk)
+QUERIES = [
+    ("Is it normal to feel guilty after euthanasia?", ["euthanasia"]),
+    ("What is the dual process model of grief?", ["dual process"]),
+    ("Nobody takes my grief seriously because it was just a dog", ["disenfranchised"]),
+    ("Why do I feel like I failed my cat", ["guilt"]),
+    ("How long does grieving a pet usually last?", ["duration", "months", "years"]),
+    ("Should I get another pet right away?", ["new pet", "replace", "another pet"]),
+    ("How do I tell my children our dog died?", ["children", "child"]),
+    ("I keep thinking I hear him at the door", ["hallucinat", "sense of presence", "presence"]),
+    ("Is it okay to hold a memorial for my rabbit?", ["ritual", "memorial", "funeral"]),
+    ("My bond with my horse was deeper than with most people", ["attachment", "bond"]),
+    ("I can't stop crying weeks after my parrot died", ["complicated grief", "prolonged grief"]),
+    ("Anniversary of my dog's death is coming up", ["anniversary"]),
+    ("Continuing bonds with a pet that has died", ["continuing bonds"]),
+    ("Anticipatory grief while my old dog is sick", ["anticipatory"]),
+]
+
+
+def evaluate(search, k):
+    """(hit rate, latencies_ms) of `search(query) -> docs` over QUERIES"""
+    hits, latencies = 0, []
+    for query, terms in QUERIES:
+        start = time.perf_counter()
+        docs = search(query)[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        text = " ".join(doc.page_content.lower() for doc in docs)
+        hits += any(term in text for term in terms)
+    return hits / len(QUERIES), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dense-only and hybrid retrieval")
+    parser.add_argument("--chroma-dir", default=DEFAULT_CHROMA_DIR)
+    parser.add_argument("--bm25-dir", default=DEFAULT_BM25_DIR)
+    parser.add_argument("--k", type=int, default=1)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the query set, for stable latencies")
+    args = parser.parse_args()
+
+    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    store = Chroma(persist_directory=args.chroma_dir, embedding_function=embeddings)
+    bm25 = BM25Index(args.bm25_dir)
+    hybrid = HybridRetriever(store, bm25, candidates=args.candidates)
+    vectors = {query: embeddings.embed_query(query) for query, _ in QUERIES}  # embedding is the same for both
+
+    backends = {
+        "dense": lambda q: store.similarity_search_by_vector(vectors[q], k=args.k),
+        "bm25": lambda q: bm25.search(q, k=args.k),
+        "hybrid": lambda q: hybrid.search(q, vectors[q], k=args.k),
+    }
+    print(f"📊 {len(QUERIES)} queries, {len(bm25)} chunks, hit@{args.k}")
+    for name, search in backends.items():
+        search(QUERIES[0][0])  # warm-up
+        latencies = []
+        for _ in range(args.repeat):
+            hit_rate, run_latencies = evaluate(search, args.k)
+            latencies += run_latencies
+        print(f"   {name:>6}: hit@{args.k} {hit_rate:.0%}, p50 {percentile(latencies, 0.5):.2f}ms, "
+              f"p95 {percentile(latencies, 0.95):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
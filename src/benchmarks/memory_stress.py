@@ -0,0 +1,125 @@
+# src/benchmarks/memory_stress.py
+"""
+Stress benchmark for ConversationMemory.
+
+Hammers one SQLite-backed memory from many threads (and optionally several
+worker processes), then checks that no message was lost or reordered.
+
+    python -m src.benchmarks.memory_stress --threads 32 --messages 200 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from src.utils.conversation_memory import ConversationMemory
+
+
+def _worker_thread(memory, worker_id, offset, sessions, messages, latencies, errors):
+    try:
+        for i in range(messages):
+            session_id = sessions[(offset + i) % len(sessions)]
+            start = time.perf_counter()
+            memory.add_message(session_id, "user", f"w{worker_id}-m{i}")
+            memory.get_formatted_history(session_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+    except Exception as e:
+        errors.append(repr(e))
+
+
+def run_threads(db_path, threads, messages, sessions, tag="p0"):
+    """Run one process worth of threads, return (latencies_ms, errors)"""
+    memory = ConversationMemory(db_path=db_path, legacy_memory_file=None)
+    session_ids = [f"stress-{n}" for n in range(sessions)]
+    latencies, errors = [], []
+
+    workers = [
+        threading.Thread(
+            target=_worker_thread,
+            args=(memory, f"{tag}-{t}", t, session_ids, messages, latencies, errors)
+        )
+        for t in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, errors
+
+
+def _process_main(db_path, threads, messages, sessions, tag, results):
+    latencies, errors = run_threads(db_path, threads, messages, sessions, tag)
+    results.put((latencies, errors))
+
+
+def check_consistency(db_path, expected_total):
+    """Every message stored exactly once and in per-writer order"""
+    memory = ConversationMemory(db_path=db_path, legacy_memory_file=None)
+    total = memory.store.count()
+    with memory.store._connection() as conn:
+        rows = conn.execute("SELECT session_id, message FROM messages ORDER BY id").fetchall()
+
+    last_seen = {}
+    out_of_order = 0
+    for session_id, message in rows:
+        writer, index = message.rsplit("-m", 1)
+        index = int(index)
+        if last_seen.get((session_id, writer), -1) >= index:
+            out_of_order += 1
+        last_seen[(session_id, writer)] = index
+    return total == expected_total, total, out_of_order
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test the conversation memory store")
+    parser.add_argument("--threads", type=int, default=32, help="threads per process")
+    parser.add_argument("--messages", type=int, default=200, help="messages per thread")
+    parser.add_argument("--sessions", type=int, default=16, help="sessions shared by all writers")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes sharing the store")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stress.sqlite3")
+        ConversationMemory(db_path=db_path, legacy_memory_file=None)  # create schema up front
+
+        start = time.perf_counter()
+        latencies, errors = [], []
+        if args.processes <= 1:
+            latencies, errors = run_threads(db_path, args.threads, args.messages, args.sessions)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            results = ctx.Queue()
+            procs = [
+                ctx.Process(target=_process_main, args=(db_path, args.threads, args.messages, args.sessions, f"p{p}", results))
+                for p in range(args.processes)
+            ]
+            for proc in procs:
+                proc.start()
+            for _ in procs:
+                proc_latencies, proc_errors = results.get()
+                latencies += proc_latencies
+                errors += proc_errors
+            for proc in procs:
+                proc.join()
+        elapsed = time.perf_counter() - start
+
+        expected = args.threads * args.messages * max(1, args.processes)
+        complete, total, out_of_order = check_consistency(db_path, expected)
+
+    print(f"📊 {expected:,} appends+reads in {elapsed:.2f}s ({expected / elapsed:,.0f} ops/s)")
+    print(f"⏱️ add+read latency: p50 {percentile(latencies, 0.5):.2f}ms, "
+          f"p95 {percentile(latencies, 0.95):.2f}ms, p99 {percentile(latencies, 0.99):.2f}ms")
+    print(f"{'✅' if complete else '❌'} stored {total:,}/{expected:,} messages, {out_of_order} out of order, {len(errors)} errors")
+    for error in errors[:5]:
+        print(f"   {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# src/benchmarks/pdf_ingestion.py
+"""
+Extraction + cleaning + splitting throughput of the KB build, serial vs.
+process pool, on a synthetic PDF corpus.
+
+Each PDF gets book-like pages: a running header, a page-number footer,
+hyphenated line breaks, bullets, citations and URLs, so the cleaner does
+real work. Every run starts from an empty stage cache. Embedding is left
+out; it runs in the parent either way.
+
+    python -m src.benchmarks.pdf_ingestion --pdfs 48 --pages 40 --workers 1,2,4,8
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from src.data_processing.build_cache import file_sha256
+from src.data_processing.build_knowledge_base import KnowledgeBaseBuilder
+
+WORDS = ("grief loss pet dog cat owner bond mourning attachment guilt euthanasia support therapy "
+         "companion memory ritual anniversary sadness anger denial acceptance children family "
+         "veterinarian comfort disenfranchised continuing bonds coping").split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng, title, page_number, lines_per_page):
+    lines = [title]
+    carry = ""
+    for _ in range(lines_per_page):
+        line = carry + " ".join(rng.choice(WORDS, size=rng.integers(8, 14)))
+        carry = ""
+        roll = rng.random()
+        if roll < 0.05:
+            line = "• " + line
+        elif roll < 0.08:
+            line += " (Field et al., 2009)"
+        elif roll < 0.10:
+            line += " see https://example.org/grief"
+        elif roll < 0.25:
+            lines.append(line + " bereave-")  # hyphenated across the line break
+            carry = "ment "
+            continue
+        lines.append(line + ".")
+    lines.append(str(page_number))
+    return lines
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int, seed: int):
+    """Minimal multi-page PDF with Helvetica text, written without a PDF library"""
+    rng = np.random.default_rng(seed)
+    title = f"Journal of Companion Animal Bereavement, Vol. {seed % 40 + 1}"
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for page_number in range(1, pages + 1):
+        text = "".join(f"({_escape(line)}) '\n" for line in _page_lines(rng, title, page_number, lines_per_page))
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td\n{text}ET".encode("cp1252")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_corpus(directory: str, pdfs: int, pages: int, lines_per_page: int):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(pdfs):
+        write_synthetic_pdf(os.path.join(directory, f"book_{i:03d}.pdf"), pages, lines_per_page, seed=i)
+
+
+def run(corpus_dir: str, workers: int) -> dict:
+    build_dir = tempfile.mkdtemp(prefix="empathia-ingest-")
+    try:
+        builder = KnowledgeBaseBuilder(pdf_directory=corpus_dir, build_directory=build_dir)
+        todo = []
+        for name in sorted(os.listdir(corpus_dir)):
+            path = os.path.join(corpus_dir, name)
+            todo.append((name, path, builder._stage_keys(name, file_sha256(path), "benchmark")))
+
+        start = time.perf_counter()
+        chunks = 0
+        for _, pdf_chunks in builder.iter_chunks(todo, workers):
+            chunks += len(pdf_chunks)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return {"seconds": elapsed, "chunks": chunks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs. process-pool PDF ingestion")
+    parser.add_argument("--pdfs", type=int, default=48)
+    parser.add_argument("--pages", type=int, default=40, help="pages per PDF")
+    parser.add_argument("--lines", type=int, default=60, help="text lines per page")
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count() or 1}")
+    args = parser.parse_args()
+
+    corpus_dir = tempfile.mkdtemp(prefix="empathia-pdfs-")
+    try:
+        make_corpus(corpus_dir, args.pdfs, args.pages, args.lines)
+        total_pages = args.pdfs * args.pages
+        print(f"📊 {args.pdfs} synthetic PDFs × {args.pages} pages ({total_pages} pages), {os.cpu_count()} CPUs")
+        baseline = None
+        for workers in sorted({int(w) for w in args.workers.split(",")}):
+            stats = run(corpus_dir, workers)
+            baseline = baseline or stats["seconds"]
+            print(f"   {workers:>2} workers: {stats['seconds']:.2f}s, {total_pages / stats['seconds']:.0f} pages/s, "
+                  f"{stats['chunks']} chunks, {baseline / stats['seconds']:.1f}× vs first run")
+        # ru_maxrss is in KiB on Linux
+        parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f"   peak RSS: parent {parent:.0f} MB, largest worker {children:.0f} MB")
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
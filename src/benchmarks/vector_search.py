@@ -0,0 +1,121 @@
+# src/benchmarks/vector_search.py
+"""
+Retrieval benchmark: Chroma vs the memory-mapped NumPy index (and the ANN tier).
+
+Each backend runs in its own fresh process so resident memory is measured
+cleanly. Queries are stored chunk vectors plus noise, so they look like
+real MiniLM queries without loading the model.
+
+    python -m src.data_processing.export_vector_index --dtype float16
+    python -m src.benchmarks.vector_search --queries 500 --k 4
+"""
+import argparse
+import multiprocessing
+import time
+import numpy as np
+
+DEFAULT_CHROMA_DIR = "./outputs/psychology_books_db_clean"
+DEFAULT_INDEX_DIR = "./outputs/psychology_books_index"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, on platforms without /proc
+
+
+def _open_backend(backend, chroma_dir, index_dir):
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+        return Chroma(persist_directory=chroma_dir)
+    if backend == "ann":
+        from src.core.ann_index import AnnVectorIndex
+        return AnnVectorIndex(index_dir)
+    from src.core.vector_index import MemmapVectorIndex
+    return MemmapVectorIndex(index_dir)
+
+
+def _run_backend(backend, chroma_dir, index_dir, queries, k, results):
+    baseline = rss_mb()
+    start = time.perf_counter()
+    store = _open_backend(backend, chroma_dir, index_dir)
+    store.similarity_search_by_vector(queries[0].tolist(), k=k)  # first query pays lazy loading
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies, top_ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector(query.tolist(), k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        top_ids.append([doc.id for doc in docs])
+
+    results.put((backend, {
+        "load_ms": load_ms,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "rss_mb": rss_mb() - baseline,
+        "top_ids": top_ids,
+    }))
+
+
+def make_queries(index_dir, count, noise, seed=0):
+    """Stored chunk vectors with Gaussian noise, re-normalized"""
+    from src.core.vector_index import MemmapVectorIndex
+    index = MemmapVectorIndex(index_dir)
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(index), size=count)
+    vectors = np.asarray(index.embeddings[rows], dtype=np.float32)
+    if index.scales is not None:
+        vectors *= np.asarray(index.scales[rows])[:, None]
+    vectors += rng.normal(0, noise, size=vectors.shape).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Chroma against the memory-mapped vector index")
+    parser.add_argument("--chroma-dir", default=DEFAULT_CHROMA_DIR)
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=0.05, help="std of noise added to stored vectors")
+    parser.add_argument("--backends", default="chroma,memmap", help="comma-separated: chroma, memmap, ann")
+    args = parser.parse_args()
+
+    queries = make_queries(args.index_dir, args.queries, args.noise)
+    ctx = multiprocessing.get_context("spawn")
+    report = {}
+    for backend in args.backends.split(","):
+        results = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(backend, args.chroma_dir, args.index_dir, queries, args.k, results))
+        proc.start()
+        name, stats = results.get()
+        proc.join()
+        report[name] = stats
+
+    print(f"📊 {args.queries} queries, k={args.k}")
+    for name, stats in report.items():
+        print(f"   {name:>7}: load {stats['load_ms']:.0f}ms, p50 {stats['p50_ms']:.2f}ms, "
+              f"p95 {stats['p95_ms']:.2f}ms, p99 {stats['p99_ms']:.2f}ms, +{stats['rss_mb']:.1f} MB RSS")
+
+    if "chroma" in report and "memmap" in report:
+        pairs = list(zip(report["chroma"]["top_ids"], report["memmap"]["top_ids"]))
+        top1 = np.mean([a[:1] == b[:1] for a, b in pairs])
+        overlap = np.mean([len(set(a) & set(b)) / max(1, len(a)) for a, b in pairs])
+        print(f"🎯 agreement with Chroma: top-1 {top1:.1%}, top-{args.k} overlap {overlap:.1%}")
+
+
+if __name__ == "__main__":
+    main()
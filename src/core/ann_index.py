@@ -0,0 +1,114 @@
+# src/core/ann_index.py
+"""
+Approximate-nearest-neighbour tier on top of the memory-mapped vector index.
+
+A faiss index (IVF-PQ or HNSW) is built from the same unit-normalized
+embeddings as the exact index (src.data_processing.build_ann_index) and
+saved next to it:
+
+    ann.faiss         the faiss index (inner product == cosine on unit vectors)
+    ann.json          how it was built (kind, parameters, row count)
+
+Texts and metadata still come from the exact index's sidecar, and the ANN
+candidates can be re-scored exactly against the stored rows (`rerank`),
+which recovers most of the recall PQ compression gives up.
+
+faiss is optional (`pip install faiss-cpu`); only this tier needs it.
+"""
+import json
+import os
+from typing import List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from src.core.vector_index import MemmapVectorIndex
+
+try:
+    import faiss
+except ImportError:  # optional: only the ANN backend needs it
+    faiss = None
+
+ANN_INDEX_FILE = "ann.faiss"
+ANN_PARAMS_FILE = "ann.json"
+
+# Recall/latency knobs, also settable per instance
+ANN_NPROBE = int(os.getenv("EMPATHIA_ANN_NPROBE", 16))  # IVF lists scanned per query
+ANN_EF_SEARCH = int(os.getenv("EMPATHIA_ANN_EF_SEARCH", 64))  # HNSW candidate list size
+ANN_RERANK = int(os.getenv("EMPATHIA_ANN_RERANK", 4))  # candidates fetched per result for exact re-scoring
+
+
+def require_faiss():
+    if faiss is None:
+        raise ImportError("The ANN index needs faiss: pip install faiss-cpu")
+
+
+class AnnVectorIndex:
+    """Approximate top-k search with the same API as MemmapVectorIndex / Chroma"""
+
+    def __init__(self, index_dir: str, embedding_function=None, nprobe: int = ANN_NPROBE,
+                 ef_search: int = ANN_EF_SEARCH, rerank: int = ANN_RERANK):
+        require_faiss()
+        self.base = MemmapVectorIndex(index_dir, embedding_function=embedding_function)
+        self.embedding_function = embedding_function
+        with open(os.path.join(index_dir, ANN_PARAMS_FILE), 'r') as f:
+            self.params = json.load(f)
+        if self.params["count"] != len(self.base):
+            raise ValueError(f"ANN index in {index_dir} is stale: built for {self.params['count']} rows, "
+                             f"exact index has {len(self.base)}")
+        # Memory-map the faiss index too where the index type allows it
+        try:
+            self.ann = faiss.read_index(os.path.join(index_dir, ANN_INDEX_FILE), faiss.IO_FLAG_MMAP)
+        except RuntimeError:
+            self.ann = faiss.read_index(os.path.join(index_dir, ANN_INDEX_FILE))
+        self.rerank = rerank
+        self.set_search_params(nprobe=nprobe, ef_search=ef_search)
+
+    @property
+    def manifest(self) -> dict:
+        return {**self.base.manifest, "ann": self.params}
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def set_search_params(self, nprobe: int = None, ef_search: int = None):
+        """Trade recall for latency: more lists / a longer candidate list is slower and more exact"""
+        if nprobe is not None and hasattr(self.ann, "nprobe"):
+            self.ann.nprobe = nprobe
+        if ef_search is not None and hasattr(self.ann, "hnsw"):
+            self.ann.hnsw.efSearch = ef_search
+
+    def top_k(self, vector, k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, scores) of the k best matches, best first"""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        candidates = k * max(1, self.rerank)
+        scores, rows = self.ann.search(query[None, :], candidates)
+        rows, scores = rows[0], scores[0]
+        rows, scores = rows[rows >= 0], scores[rows >= 0]  # faiss pads with -1 when short of candidates
+        if self.rerank > 1 and len(rows):
+            # Exact scores for the candidates, from the stored rows
+            ordered = np.sort(rows)
+            exact = np.asarray(self.base.embeddings[ordered], dtype=np.float32) @ query
+            if self.base.scales is not None:
+                exact *= np.asarray(self.base.scales[ordered])
+            best = np.argsort(-exact)[:k]
+            return ordered[best], exact[best]
+        return rows[:k], scores[:k]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        rows, scores = self.top_k(embedding, k)
+        return [(self.base._document(int(row)), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vector_with_vectors(self, embedding: List[float], k: int = 4):
+        rows, scores = self.top_k(embedding, k)
+        return [self.base._document(int(row)) for row in rows], scores, self.base.vectors(rows)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        rows, _ = self.top_k(embedding, k)
+        return [self.base._document(int(row)) for row in rows]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        if self.embedding_function is None:
+            raise ValueError("similarity_search needs an embedding_function; use similarity_search_by_vector")
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
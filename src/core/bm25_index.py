@@ -0,0 +1,202 @@
+# src/core/bm25_index.py
+"""
+Compact BM25 inverted index over the knowledge-base chunks, plus the hybrid
+(BM25 + dense) retriever that fuses both rankings.
+
+Layout of a BM25 directory (written by the KB build, or from an existing
+Chroma store with src.data_processing.build_bm25_index):
+
+    bm25.json         k1, b, chunk count, average chunk length
+    vocab.json        term -> term id
+    postings.npz      CSR postings: term_offsets (V+1), docs (int32), tfs (uint16), doc_lengths (int32)
+    texts.bin, offsets.npy, metadata.jsonl   the chunks themselves (ChunkStore)
+
+Chunk ids match the dense store's ids, which is what lets the two rankings
+be fused.
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from src.core.vector_index import ChunkStore, ChunkStoreWriter
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Where the KB build writes the BM25 index and where hybrid retrieval reads it
+BM25_INDEX_DIR = os.getenv("EMPATHIA_BM25_INDEX_DIR", os.path.join(PROJECT_ROOT, "data", "outputs", "psychology_books_bm25"))
+
+BM25_PARAMS_FILE = "bm25.json"
+VOCAB_FILE = "vocab.json"
+POSTINGS_FILE = "postings.npz"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its me my of on or our she so
+that the their them they this to was we were what when which who will with you your
+""".split())
+
+RRF_K = 60  # standard reciprocal-rank-fusion damping constant
+HYBRID_CANDIDATES = int(os.getenv("EMPATHIA_HYBRID_CANDIDATES", 20))  # per ranking, before fusion
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def build_bm25_index(output_dir: str, chunks: Iterable[Tuple[str, str, dict]], k1: float = 1.5, b: float = 0.75) -> dict:
+    """Write a BM25 index for (chunk_id, text, metadata) triples, return its parameters"""
+    os.makedirs(output_dir, exist_ok=True)
+    params_path = os.path.join(output_dir, BM25_PARAMS_FILE)
+    if os.path.exists(params_path):
+        os.remove(params_path)  # readers must not pick up a half-rewritten index
+
+    vocab = {}
+    term_docs, term_tfs = [], []  # per term id: postings lists
+    doc_lengths = []
+    writer = ChunkStoreWriter(output_dir)
+    try:
+        for doc, (chunk_id, text, metadata) in enumerate(chunks):
+            writer.add(chunk_id, text, metadata)
+            tokens = tokenize(text or "")
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = vocab.setdefault(term, len(vocab))
+                if term_id == len(term_docs):
+                    term_docs.append([])
+                    term_tfs.append([])
+                term_docs[term_id].append(doc)
+                term_tfs[term_id].append(min(tf, 65535))
+    finally:
+        count = writer.close()
+
+    lengths = np.fromiter((len(docs) for docs in term_docs), dtype=np.int64, count=len(term_docs))
+    term_offsets = np.zeros(len(term_docs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=term_offsets[1:])
+    np.savez(
+        os.path.join(output_dir, POSTINGS_FILE),
+        term_offsets=term_offsets,
+        docs=np.fromiter((d for docs in term_docs for d in docs), dtype=np.int32, count=int(term_offsets[-1])),
+        tfs=np.fromiter((t for tfs in term_tfs for t in tfs), dtype=np.uint16, count=int(term_offsets[-1])),
+        doc_lengths=np.asarray(doc_lengths, dtype=np.int32),
+    )
+    with open(os.path.join(output_dir, VOCAB_FILE), 'w') as f:
+        json.dump(vocab, f)
+
+    params = {
+        "k1": k1,
+        "b": b,
+        "count": count,
+        "avg_length": float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+        "terms": len(vocab),
+    }
+    with open(params_path, 'w') as f:
+        json.dump(params, f, indent=2)
+    print(f"✅ BM25 index saved to {output_dir} ({count} chunks, {len(vocab)} terms)")
+    return params
+
+
+class BM25Index:
+    """Vectorized BM25 scoring over CSR postings"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, BM25_PARAMS_FILE), 'r') as f:
+            self.params = json.load(f)
+        with open(os.path.join(index_dir, VOCAB_FILE), 'r') as f:
+            self.vocab = json.load(f)
+        with np.load(os.path.join(index_dir, POSTINGS_FILE)) as postings:
+            self.term_offsets = postings["term_offsets"]
+            self.docs = postings["docs"]
+            self.tfs = postings["tfs"].astype(np.float32)
+            doc_lengths = postings["doc_lengths"].astype(np.float32)
+        self.chunks = ChunkStore(index_dir)
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(self.chunks.ids)}
+
+        self.k1, self.b = self.params["k1"], self.params["b"]
+        count = len(doc_lengths)
+        avg_length = self.params["avg_length"] or 1.0
+        # Per-chunk length normalization, precomputed once
+        self.length_norm = self.k1 * (1 - self.b + self.b * doc_lengths / avg_length)
+        df = np.diff(self.term_offsets).astype(np.float32)
+        self.idf = np.log1p((count - df + 0.5) / (df + 0.5))
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for `query`"""
+        term_ids = sorted({self.vocab[token] for token in tokenize(query) if token in self.vocab})
+        if not term_ids:
+            return np.zeros(len(self), dtype=np.float32)
+        slices = [np.arange(self.term_offsets[t], self.term_offsets[t + 1]) for t in term_ids]
+        positions = np.concatenate(slices)
+        docs = self.docs[positions]
+        tfs = self.tfs[positions]
+        idf = np.repeat(self.idf[term_ids], [len(s) for s in slices])
+        contributions = idf * tfs * (self.k1 + 1) / (tfs + self.length_norm[docs])
+        return np.bincount(docs, weights=contributions, minlength=len(self)).astype(np.float32)
+
+    def top_k(self, query: str, k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, scores) of the k best lexical matches with a positive score, best first"""
+        scores = self.scores(query)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.argpartition(-scores, k - 1)[:k]
+        rows = rows[np.argsort(-scores[rows])]
+        return rows, scores[rows]
+
+    def search(self, query: str, k: int = 4) -> List[Document]:
+        rows, _ = self.top_k(query, k)
+        return [self.chunks.document(int(row)) for row in rows]
+
+
+class HybridRetriever:
+    """Dense + BM25 retrieval fused with reciprocal rank fusion.
+
+    Each ranking contributes 1 / (rrf_k + rank) per chunk; the sums over
+    both candidate lists are computed in one vectorized pass. If the vector
+    store can say which chunks it holds (`has_chunk`, a hot-swapped
+    snapshot), BM25 hits it doesn't hold are dropped, so results never
+    come from a KB version the dense side no longer serves.
+    """
+
+    def __init__(self, vector_store, bm25: BM25Index, candidates: int = HYBRID_CANDIDATES, rrf_k: int = RRF_K):
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+
+    def search(self, query: str, query_vector, k: int = 4, dense_docs: List[Document] = None) -> List[Document]:
+        """Top k fused chunks; pass `dense_docs` if the dense candidates were already retrieved"""
+        if dense_docs is None:
+            dense_docs = self.vector_store.similarity_search_by_vector(query_vector, k=self.candidates)
+        lexical_rows, _ = self.bm25.top_k(query, self.candidates)
+
+        by_id = {doc.id: doc for doc in dense_docs}
+        lexical_ids = [self.bm25.chunks.ids[int(row)] for row in lexical_rows]
+        has_chunk = getattr(self.vector_store, "has_chunk", None)
+        if has_chunk is not None:
+            lexical_ids = [chunk_id for chunk_id in lexical_ids if has_chunk(chunk_id)]
+        ids = np.asarray([doc.id for doc in dense_docs] + lexical_ids, dtype=object)
+        if len(ids) == 0:
+            return []
+        ranks = np.concatenate([np.arange(len(dense_docs)), np.arange(len(lexical_ids))]).astype(np.float32)
+
+        unique_ids, inverse = np.unique(ids.astype(str), return_inverse=True)
+        fused = np.bincount(inverse, weights=1.0 / (self.rrf_k + 1 + ranks), minlength=len(unique_ids))
+        best = np.argsort(-fused, kind="stable")[:k]
+
+        results = []
+        for index in best:
+            chunk_id = unique_ids[index]
+            doc = by_id.get(chunk_id)
+            if doc is None:
+                doc = self.bm25.chunks.document(self.bm25.rows[chunk_id])
+            results.append(doc)
+        return results
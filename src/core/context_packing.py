@@ -0,0 +1,96 @@
+# src/core/context_packing.py
+"""
+Multi-chunk grounding context for the expert prompt.
+
+Retrieval fetches the top-N candidate chunks together with their stored
+vectors. `mmr` re-ranks them by maximal marginal relevance, one
+matrix-vector product per pick, in NumPy and without re-embedding
+anything. `pack_sentences` then fills a fixed token budget with whole
+sentences from the picked chunks, instead of cutting the best chunk at a
+character count.
+"""
+import os
+import re
+from typing import List, Sequence
+import numpy as np
+from dotenv import load_dotenv
+from src.utils.tokens import count_tokens, truncate_to_tokens
+
+load_dotenv()
+
+RETRIEVAL_CANDIDATES = int(os.getenv("EMPATHIA_EXPERT_CANDIDATES", 20))  # top-N fetched with their vectors
+MMR_K = int(os.getenv("EMPATHIA_EXPERT_MMR_K", 3))                       # chunks kept after re-ranking
+MMR_LAMBDA = float(os.getenv("EMPATHIA_EXPERT_MMR_LAMBDA", 0.7))         # 1 = relevance only, 0 = diversity only
+CONTEXT_TOKENS = int(os.getenv("EMPATHIA_EXPERT_CONTEXT_TOKENS", 50))    # the old 200-character context was ~50
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+|(?<=[.!?]["”’)])\s+')
+_SENTENCE_ENDINGS = ('.', '!', '?', '"', '”', '’', ')')
+_SENTENCE_STARTS = ('"', '“', '‘', '(')
+
+
+def mmr(scores, vectors, k: int = MMR_K, lambda_mult: float = MMR_LAMBDA, first: int = None) -> List[int]:
+    """Indices of up to k candidates by maximal marginal relevance, in pick order.
+
+    `scores` are the candidates' cosine similarities to the query, `vectors`
+    their unit-length embeddings. Each pick maximizes
+    lambda * relevance - (1 - lambda) * (max similarity to the picks so far).
+    `first` forces the first pick (otherwise the most relevant candidate).
+    """
+    scores = np.asarray(scores, dtype=np.float32)
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    picked = [int(np.argmax(scores)) if first is None else first]
+    redundancy = vectors @ vectors[picked[0]]  # max similarity of each candidate to the picks so far
+    available = np.ones(len(scores), dtype=bool)
+    available[picked[0]] = False
+    relevance = lambda_mult * scores
+    while len(picked) < k:
+        objective = relevance - (1 - lambda_mult) * redundancy
+        objective[~available] = -np.inf
+        best = int(np.argmax(objective))
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, vectors @ vectors[best], out=redundancy)
+    return picked
+
+
+def sentences(text: str) -> List[str]:
+    """Whole sentences of a chunk.
+
+    Chunk boundaries can fall mid-sentence, so a leading fragment
+    (lowercase start) and an unterminated tail are dropped, unless the
+    chunk has nothing else.
+    """
+    parts = [part.strip() for part in _SENTENCE_BREAK.split(text) if part.strip()]
+    if len(parts) > 1 and not (parts[0][0].isupper() or parts[0][0].isdigit() or parts[0].startswith(_SENTENCE_STARTS)):
+        parts = parts[1:]
+    if len(parts) > 1 and not parts[-1].endswith(_SENTENCE_ENDINGS):
+        parts = parts[:-1]
+    return parts
+
+
+def pack_sentences(texts: Sequence[str], budget: int = CONTEXT_TOKENS, model: str = "gpt-3.5-turbo") -> str:
+    """Whole sentences from `texts` (best chunk first) within `budget` tokens.
+
+    Each chunk contributes its sentences in order until the next one
+    doesn't fit; later chunks may still fit shorter ones. Chunks are
+    separated by newlines.
+    """
+    blocks, remaining = [], budget
+    for text in texts:
+        kept = []
+        for sentence in sentences(text):
+            cost = count_tokens(sentence, model) + 1  # +1 for the joining space or newline
+            if cost > remaining:
+                break
+            kept.append(sentence)
+            remaining -= cost
+        if kept:
+            blocks.append(" ".join(kept))
+    if not blocks and texts:
+        # Not even one sentence fits: cut the best chunk at the budget rather than send nothing
+        return truncate_to_tokens(texts[0], budget, model)
+    return "\n".join(blocks)
@@ -0,0 +1,270 @@
+# src/core/embedding_service.py
+"""
+Embedding sidecar: one MiniLM instance serving every worker process over a
+Unix socket, with dynamic micro-batching.
+
+Concurrent requests are coalesced into one forward pass: a batch closes
+when it reaches `max_batch` texts or when its first request has waited
+`max_wait_ms`, whichever comes first.
+
+    python -m src.core.embedding_service --backend onnx-int8 --max-batch 32 --max-wait-ms 5
+    EMPATHIA_EMBEDDING_BACKEND=sidecar streamlit run app.py
+
+Protocol: newline-delimited JSON. Requests are {"op": "embed", "texts": [...]},
+{"op": "info"} or {"op": "stats"}; embed replies carry the float32 vectors
+base64-encoded with their shape.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from typing import List
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from src.utils.tracing import Tracer
+
+load_dotenv()
+
+EMBEDDING_SOCKET = os.getenv("EMPATHIA_EMBEDDING_SOCKET", "/tmp/empathia-embeddings.sock")
+SIDECAR_BACKEND = os.getenv("EMPATHIA_SIDECAR_BACKEND", "torch")  # model backend inside the sidecar
+MAX_BATCH = 32  # texts per forward pass
+MAX_WAIT_MS = 5.0  # how long the first request of a batch waits for company
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+def _encode_vectors(vectors: np.ndarray) -> dict:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return {"shape": list(vectors.shape), "vectors": base64.b64encode(vectors.tobytes()).decode("ascii")}
+
+
+def _decode_vectors(reply: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(reply["vectors"]), dtype=np.float32).reshape(reply["shape"])
+
+
+class EmbeddingServer:
+    """Owns the model; micro-batches embed requests from all connected clients"""
+
+    def __init__(self, model, socket_path: str = EMBEDDING_SOCKET, max_batch: int = MAX_BATCH,
+                 max_wait_ms: float = MAX_WAIT_MS):
+        self.model = model
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = None  # asyncio.Queue of (texts, future, enqueued_at), created on the server loop
+        self.metrics = Tracer()  # queue wait / inference / request latency histograms
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.texts = 0
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            size = len(batch[0][0])
+            deadline = batch[0][2] + self.max_wait
+            while size < self.max_batch:
+                if not self.pending.empty():
+                    # Requests that queued up during the previous forward pass ride along right away
+                    item = self.pending.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.pending.get(), timeout)
+                    except TimeoutError:
+                        break
+                batch.append(item)
+                size += len(item[0])
+
+            started = loop.time()
+            for _, _, enqueued_at in batch:
+                self.metrics.record("sidecar.queue_wait", (started - enqueued_at) * 1000)
+            texts = [text for item_texts, _, _ in batch for text in item_texts]
+            try:
+                # One forward pass for everyone, off the loop so clients keep queueing meanwhile
+                vectors = np.asarray(await asyncio.to_thread(self.model.embed_documents, texts), dtype=np.float32)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.metrics.record("sidecar.inference", (loop.time() - started) * 1000, batch_size=len(texts))
+            self.batch_sizes[len(texts)] += 1
+
+            offset = 0
+            for item_texts, future, _ in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self.pending.put((texts, future, loop.time()))
+        return await future
+
+    def stats(self) -> dict:
+        batches = sum(self.batch_sizes.values())
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": batches,
+            "mean_batch_size": round(self.texts / batches, 2) if batches else 0.0,
+            "max_batch_size": max(self.batch_sizes, default=0),
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "latency": self.metrics.summary(),
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                started = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    op = request.get("op", "embed")
+                    if op == "embed":
+                        texts = [str(text) for text in request["texts"]]
+                        self.requests += 1
+                        self.texts += len(texts)
+                        reply = _encode_vectors(await self.embed(texts)) if texts else {"shape": [0, 0], "vectors": ""}
+                        self.metrics.record("sidecar.request", (time.perf_counter() - started) * 1000)
+                    elif op == "info":
+                        reply = {"model_name": getattr(self.model, "model_name", type(self.model).__name__)}
+                    elif op == "stats":
+                        reply = self.stats()
+                    else:
+                        reply = {"error": f"unknown op {op!r}"}
+                except Exception as e:
+                    reply = {"error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self.pending = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # stale socket from a previous run
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=MAX_LINE_BYTES)
+        batcher = asyncio.create_task(self._batcher())
+        print(f"✅ Embedding sidecar listening on {self.socket_path} "
+              f"(max batch {self.max_batch}, max wait {self.max_wait * 1000:.1f}ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+class SidecarEmbeddings(Embeddings):
+    """Embedding function backed by the sidecar; one connection per thread.
+
+    If the sidecar can't be reached, falls back to a local model built by
+    `fallback` (once, on first failure) so turns keep working.
+    """
+
+    def __init__(self, socket_path: str = EMBEDDING_SOCKET, fallback=None, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.fallback = fallback
+        self.timeout = timeout
+        self._local = threading.local()
+        self._fallback_model = None
+        self._fallback_lock = threading.Lock()
+        try:
+            # Names the vectors for the query-embedding cache: the sidecar's model, not "sidecar"
+            self.model_name = self._request({"op": "info"})["model_name"]
+        except OSError:
+            if fallback is None:
+                raise
+            self.model_name = getattr(self._local_model(), "model_name", "sidecar-fallback")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()  # each failed attempt would otherwise leak a descriptor
+                raise
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def _request(self, request: dict) -> dict:
+        sock, reader = self._connection()
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("embedding sidecar closed the connection")
+        except OSError:
+            self._local.conn = None  # reconnect next time
+            reader.close()
+            sock.close()
+            raise
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(f"Embedding sidecar error: {reply['error']}")
+        return reply
+
+    def _local_model(self):
+        with self._fallback_lock:
+            if self._fallback_model is None:
+                print(f"⚠️ Embedding sidecar unavailable at {self.socket_path}, loading a local model")
+                self._fallback_model = self.fallback()
+        return self._fallback_model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        try:
+            return _decode_vectors(self._request({"op": "embed", "texts": list(texts)})).tolist()
+        except OSError:
+            if self.fallback is None:
+                raise
+            return self._local_model().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self) -> dict:
+        return self._request({"op": "stats"})
+
+
+def main():
+    from src.core.embeddings import load_embedding_model, LOCAL_EMBEDDING_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Serve MiniLM embeddings to all workers over a Unix socket")
+    parser.add_argument("--socket", default=EMBEDDING_SOCKET)
+    parser.add_argument("--backend", choices=LOCAL_EMBEDDING_BACKENDS, default=SIDECAR_BACKEND)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    model = load_embedding_model(args.backend)
+    model.embed_documents(["warm up"])
+    server = EmbeddingServer(model, args.socket, args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print(f"📊 {json.dumps(server.stats(), indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
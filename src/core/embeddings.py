@@ -0,0 +1,31 @@
+# src/core/embeddings.py
+import os
+from dotenv import load_dotenv
+from src.core.onnx_embeddings import OnnxMiniLMEmbeddings
+from src.core.embedding_service import SidecarEmbeddings, EMBEDDING_SOCKET, SIDECAR_BACKEND
+
+load_dotenv()
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# "torch" (sentence-transformers), "onnx" (fp32 ONNX Runtime), "onnx-int8" (dynamically quantized)
+# or "sidecar" (the shared src.core.embedding_service process)
+EMBEDDING_BACKEND = os.getenv("EMPATHIA_EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv("EMPATHIA_ONNX_MODEL_DIR", "./outputs/minilm_onnx")
+LOCAL_EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+EMBEDDING_BACKENDS = LOCAL_EMBEDDING_BACKENDS + ("sidecar",)
+
+
+def load_embedding_model(backend: str = EMBEDDING_BACKEND, onnx_model_dir: str = ONNX_MODEL_DIR):
+    """The all-MiniLM-L6-v2 embedder on the chosen backend"""
+    if backend == "torch":
+        # Imported here so the ONNX backends never pay for importing torch
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxMiniLMEmbeddings(onnx_model_dir, quantized=backend == "onnx-int8")
+    if backend == "sidecar":
+        # Same model as the sidecar, in-process, if the sidecar is down
+        return SidecarEmbeddings(
+            EMBEDDING_SOCKET, fallback=lambda: load_embedding_model(SIDECAR_BACKEND, onnx_model_dir)
+        )
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {EMBEDDING_BACKENDS}")
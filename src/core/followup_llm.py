@@ -1,17 +1,19 @@
 # followup_llm.py
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
 from dotenv import load_dotenv
+from src.utils.tracing import tracer
 
 load_dotenv()  # Add this at the top
 
 class FollowUpModel:
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.async_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-    def generate_follow_up_question(self, user_input: str, peer_response: str, expert_response: str, conversation_history: str = "") -> str:
-        prompt = f"""
+    def _build_prompt(self, user_input: str, peer_response: str, expert_response: str, conversation_history: str = "") -> str:
+        return f"""
         Create ONE gentle, open-ended follow-up question based on this conversation.
 
         USER: {user_input}
@@ -36,15 +38,73 @@ class FollowUpModel:
         Question:
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=30,
-            temperature=0.8,
-            timeout=10
-        )
+    def generate_follow_up_question(self, user_input: str, peer_response: str, expert_response: str, conversation_history: str = "") -> str:
+        prompt = self._build_prompt(user_input, peer_response, expert_response, conversation_history)
+
+        with tracer.span("followup.llm"):
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=30,
+                temperature=0.8,
+                timeout=10
+            )
+
+        return response.choices[0].message.content.strip().replace('"', '').replace('?', '') + '?'
+
+    async def agenerate_follow_up_question(self, user_input: str, peer_response: str, expert_response: str, conversation_history: str = "") -> str:
+        """Async version of generate_follow_up_question for the turn engine."""
+        prompt = self._build_prompt(user_input, peer_response, expert_response, conversation_history)
+
+        with tracer.span("followup.llm"):
+            response = await self.async_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=30,
+                temperature=0.8,
+                timeout=10
+            )
 
         return response.choices[0].message.content.strip().replace('"', '').replace('?', '') + '?'
+
+    async def astream_follow_up_question(self, user_input: str, peer_response: str, expert_response: str, conversation_history: str = ""):
+        """Streams the follow-up question token by token (stream=True).
+
+        Applies the same cleanup as generate_follow_up_question on the fly:
+        quotes and question marks are dropped, outer whitespace is trimmed and
+        a single '?' closes the question.
+        """
+        prompt = self._build_prompt(user_input, peer_response, expert_response, conversation_history)
+
+        with tracer.span("followup.llm", streaming=True):
+            stream = await self.async_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=30,
+                temperature=0.8,
+                timeout=10,
+                stream=True
+            )
+
+            started = False
+            pending_space = ""  # held back so trailing whitespace never reaches the UI
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                delta = delta.replace('"', '').replace('?', '')
+                if not started:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                    started = True
+                text = pending_space + delta
+                visible = text.rstrip()
+                pending_space = text[len(visible):]
+                if visible:
+                    yield visible
+
+        yield '?'
     
 
 # Global instance
@@ -0,0 +1,399 @@
+# src/core/kb_snapshot.py
+"""
+Single-file, versioned knowledge-base snapshots with atomic hot-swap.
+
+A snapshot (`kb-<version>.kbsnap`, written by the KB build) holds
+everything the expert searches: embeddings (float16, or int8 with
+per-row scales), chunk texts and metadata, plus a SHA-256 checksum. The
+layout:
+
+    magic (padded to 64 bytes)
+    sections, each 64-byte aligned: embeddings, [scales], text_offsets, texts, metadata
+    header JSON               format, version, dtype, dim, count, section offsets, sha256
+    header length (uint64 little-endian), magic
+
+The checksum covers everything before the header. Sections are
+np.memmap'ed straight out of the file, so every process serving a
+snapshot shares one copy through the page cache.
+
+A snapshot directory publishes its live snapshot through a `CURRENT`
+file naming it. The file is replaced atomically, so readers never see a
+half-written snapshot. HotSwapVectorIndex polls `CURRENT` and swaps in
+new snapshots under live traffic.
+
+    python -m src.core.kb_snapshot --verify data/outputs/psychology_books_snapshots
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from typing import List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from src.core.vector_index import ChunkStore, MemmapVectorIndex
+from src.utils.tracing import tracer
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+SNAPSHOT_MAGIC = b"EMPKBSNP"
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = ".kbsnap"
+CURRENT_FILE = "CURRENT"
+ALIGNMENT = 64
+KEEP_SNAPSHOTS = 3  # published snapshots kept on disk (older ones are deleted)
+# Where the KB build publishes snapshots and where the app watches for them
+SNAPSHOT_DIR = os.getenv("EMPATHIA_KB_SNAPSHOT_DIR", os.path.join(PROJECT_ROOT, "data", "outputs", "psychology_books_snapshots"))
+SNAPSHOT_POLL_SECONDS = float(os.getenv("EMPATHIA_KB_SNAPSHOT_POLL_SECONDS", 10))
+_FOOTER = struct.Struct("<Q8s")
+
+
+class SnapshotWriter:
+    """Streams chunks into a new snapshot in `snapshot_dir`; close() finishes it and returns its path.
+
+    Vectors and texts are spooled to temporary files next to the snapshot,
+    so memory stays flat however many chunks are added.
+    """
+
+    def __init__(self, snapshot_dir: str, dtype: str = "float16", embedding_model: str = None):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"dtype must be float16 or int8, got {dtype}")
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self.snapshot_dir = snapshot_dir
+        self.dtype = dtype
+        self.embedding_model = embedding_model
+        self.dim = None
+        self.count = 0
+        self.text_offsets = [0]
+        self._spool = tempfile.mkdtemp(prefix=".kbsnap-", dir=snapshot_dir)
+        self._files = {name: open(os.path.join(self._spool, name), "w+b")
+                       for name in ("embeddings", "scales", "texts", "metadata")}
+
+    def add_batch(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors):
+        from src.data_processing.export_vector_index import quantize_int8
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Snapshot vectors have dim {self.dim}, got {vectors.shape[1]}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        if self.dtype == "int8":
+            quantized, scales = quantize_int8(vectors)
+            self._files["embeddings"].write(quantized.tobytes())
+            self._files["scales"].write(scales.tobytes())
+        else:
+            self._files["embeddings"].write(vectors.astype(np.float16).tobytes())
+
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            encoded = (text or "").encode("utf-8")
+            self._files["texts"].write(encoded)
+            self.text_offsets.append(self.text_offsets[-1] + len(encoded))
+            self._files["metadata"].write((json.dumps({"id": chunk_id, "metadata": metadata or {}}) + "\n").encode("utf-8"))
+        self.count += len(ids)
+
+    def close(self) -> str:
+        dim = self.dim or 0
+        self._files["text_offsets"] = open(os.path.join(self._spool, "text_offsets"), "w+b")
+        self._files["text_offsets"].write(np.asarray(self.text_offsets, dtype=np.int64).tobytes())
+        layout = [("embeddings", self.dtype, [self.count, dim]), ("text_offsets", "int64", [self.count + 1]),
+                  ("texts", "uint8", None), ("metadata", "uint8", None)]
+        if self.dtype == "int8":
+            layout.insert(1, ("scales", "float32", [self.count]))
+
+        tmp_path = os.path.join(self._spool, "snapshot" + SNAPSHOT_SUFFIX)
+        digest = hashlib.sha256()
+        sections = {}
+        try:
+            with open(tmp_path, "wb") as out:
+                def emit(data: bytes):
+                    out.write(data)
+                    digest.update(data)
+
+                emit(SNAPSHOT_MAGIC.ljust(ALIGNMENT, b"\0"))
+                for name, dtype, shape in layout:
+                    emit(b"\0" * (-out.tell() % ALIGNMENT))
+                    spool = self._files[name]
+                    spool.flush()
+                    spool.seek(0)
+                    offset = out.tell()
+                    while block := spool.read(1 << 20):
+                        emit(block)
+                    nbytes = out.tell() - offset
+                    sections[name] = {"offset": offset, "nbytes": nbytes, "dtype": dtype,
+                                      "shape": shape if shape is not None else [nbytes]}
+
+                checksum = digest.hexdigest()
+                version = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{checksum[:8]}"
+                header = json.dumps({
+                    "format_version": SNAPSHOT_FORMAT_VERSION,
+                    "version": version,
+                    "created_at": time.time(),
+                    "embedding_model": self.embedding_model,
+                    "dtype": self.dtype,
+                    "dim": dim,
+                    "count": self.count,
+                    "sections": sections,
+                    "sha256": checksum,
+                }).encode("utf-8")
+                out.write(header)
+                out.write(_FOOTER.pack(len(header), SNAPSHOT_MAGIC))
+                out.flush()
+                os.fsync(out.fileno())
+            path = os.path.join(self.snapshot_dir, f"kb-{version}{SNAPSHOT_SUFFIX}")
+            os.replace(tmp_path, path)
+        finally:
+            for spool in self._files.values():
+                spool.close()
+            shutil.rmtree(self._spool, ignore_errors=True)
+        return path
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size < ALIGNMENT + _FOOTER.size:
+            raise ValueError(f"{path} is too small to be a KB snapshot")
+        f.seek(size - _FOOTER.size)
+        header_length, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a KB snapshot (or was truncated)")
+        header_start = size - _FOOTER.size - header_length
+        f.seek(header_start)
+        header = json.loads(f.read(header_length))
+    if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported KB snapshot format in {path}: {header.get('format_version')}")
+    header["header_start"] = header_start
+    return header
+
+
+def verify_snapshot(path: str, header: dict = None) -> dict:
+    """Check the payload against the header's SHA-256; returns the header or raises ValueError"""
+    header = header or read_header(path)
+    digest = hashlib.sha256()
+    remaining = header["header_start"]
+    with open(path, "rb") as f:
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    if digest.hexdigest() != header["sha256"]:
+        raise ValueError(f"KB snapshot {path} failed its checksum")
+    return header
+
+
+class SnapshotChunkStore(ChunkStore):
+    """ChunkStore over the text_offsets / texts / metadata sections of a snapshot"""
+
+    def __init__(self, offsets: np.ndarray, texts: np.ndarray, metadata: np.ndarray):
+        self.offsets = offsets
+        self.texts = texts
+        self.ids = []
+        self.metadatas = []
+        for line in metadata.tobytes().decode("utf-8").splitlines():
+            record = json.loads(line)
+            self.ids.append(record["id"])
+            self.metadatas.append(record["metadata"])
+
+
+class SnapshotVectorIndex(MemmapVectorIndex):
+    """MemmapVectorIndex served from a single snapshot file"""
+
+    def __init__(self, path: str, embedding_function=None, block_rows: int = 16384, verify: bool = True):
+        self.index_dir = path
+        self.path = path
+        self.embedding_function = embedding_function
+        self.block_rows = block_rows
+        header = read_header(path)
+        self.manifest = verify_snapshot(path, header) if verify else header
+
+        self.embeddings = self._section("embeddings")
+        self.scales = self._section("scales") if "scales" in self.manifest["sections"] else None
+        self.chunks = SnapshotChunkStore(self._section("text_offsets"), self._section("texts"),
+                                         self._section("metadata"))
+        self.ids = self.chunks.ids
+        self.metadatas = self.chunks.metadatas
+        self.id_set = frozenset(self.ids)
+
+    def _section(self, name: str) -> np.ndarray:
+        section = self.manifest["sections"][name]
+        dtype, shape = np.dtype(section["dtype"]), tuple(section["shape"])
+        if section["nbytes"] == 0:
+            return np.zeros(shape, dtype=dtype)  # np.memmap refuses empty mappings
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=section["offset"], shape=shape)
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def current_snapshot(snapshot_dir: str) -> Optional[str]:
+    """Path of the published snapshot of `snapshot_dir`, if any"""
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(snapshot_dir, name) if name else None
+
+
+def publish_snapshot(path: str, keep: int = KEEP_SNAPSHOTS) -> str:
+    """Point CURRENT at `path` (atomically) and delete all but the newest `keep` snapshots"""
+    snapshot_dir = os.path.dirname(path)
+    pointer = os.path.join(snapshot_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + ".tmp", pointer)
+
+    # Oldest first by creation time: version names only have one-second resolution, and two
+    # snapshots from the same second would sort by checksum. Deleting a file that a running
+    # process still has mapped is safe: its pages stay valid until that process unmaps them.
+    snapshots = sorted((name for name in os.listdir(snapshot_dir) if name.endswith(SNAPSHOT_SUFFIX)),
+                       key=lambda name: _created_at(os.path.join(snapshot_dir, name)))
+    for name in snapshots[:-keep] if keep else []:
+        if name != os.path.basename(path):
+            os.remove(os.path.join(snapshot_dir, name))
+    return path
+
+
+def _created_at(path: str) -> float:
+    """When a snapshot was written: its header's created_at, else the file's mtime"""
+    try:
+        return float(read_header(path)["created_at"])
+    except (OSError, ValueError, KeyError):
+        return os.path.getmtime(path)
+
+
+class HotSwapVectorIndex:
+    """Serves the published snapshot of a directory and swaps in newer ones as they appear.
+
+    At most every `poll_seconds`, a search checks CURRENT (one small
+    read). When it names a new snapshot, a background thread maps and
+    verifies it, then replaces `self.current` with one assignment. A
+    search reads `self.current` once, so in-flight searches finish on the
+    snapshot they started with. The old snapshot is unmapped once the last
+    of them lets go of it, so at most two are mapped at a time, and only
+    briefly.
+    """
+
+    def __init__(self, snapshot_dir: str = SNAPSHOT_DIR, embedding_function=None,
+                 poll_seconds: float = SNAPSHOT_POLL_SECONDS):
+        self.snapshot_dir = snapshot_dir
+        self.embedding_function = embedding_function
+        self.poll_seconds = poll_seconds
+        path = current_snapshot(snapshot_dir)
+        if path is None:
+            raise FileNotFoundError(f"No published KB snapshot in {snapshot_dir}; build the knowledge base first")
+        self.current = SnapshotVectorIndex(path, embedding_function=embedding_function)
+        self._lock = threading.Lock()
+        self._next_poll = time.monotonic() + poll_seconds
+        self._loading = None  # path being loaded in the background
+        self._failed = None  # (path, mtime) of a snapshot that failed to load, not retried until replaced
+        self.swaps = 0
+        self.last_error = None
+
+    def _poll(self):
+        now = time.monotonic()
+        if now < self._next_poll or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = now + self.poll_seconds
+            path = current_snapshot(self.snapshot_dir)
+            if path and path != self.current.path and path != self._loading:
+                if self._failed is not None and self._failed == (path, _mtime(path)):
+                    return  # verified and rejected already; wait for CURRENT to name another snapshot
+                self._loading = path
+                threading.Thread(target=self._swap, args=(path,), name="empathia-kb-swap", daemon=True).start()
+        finally:
+            self._lock.release()
+
+    def _swap(self, path: str):
+        try:
+            with tracer.span("kb_snapshot.swap"):
+                index = SnapshotVectorIndex(path, embedding_function=self.embedding_function)
+            previous, self.current = self.current, index
+            self.swaps += 1
+            self.last_error = None
+            self._failed = None
+            print(f"🔄 Swapped KB snapshot {previous.version} → {index.version} ({len(index)} chunks)")
+        except Exception as e:  # keep serving the current snapshot
+            self.last_error = f"{os.path.basename(path)}: {type(e).__name__}: {e}"
+            self._failed = (path, _mtime(path))
+            print(f"❌ KB snapshot swap failed: {self.last_error}")
+        finally:
+            self._loading = None
+
+    def __len__(self) -> int:
+        return len(self.current)
+
+    @property
+    def manifest(self) -> dict:
+        return self.current.manifest
+
+    def has_chunk(self, chunk_id: str) -> bool:
+        """Whether the live snapshot holds the chunk (hybrid retrieval drops BM25 hits it doesn't)"""
+        return chunk_id in self.current.id_set
+
+    def top_k(self, vector, k: int = 4):
+        self._poll()
+        return self.current.top_k(vector, k)
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4):
+        self._poll()
+        return self.current.similarity_search_by_vector_with_score(embedding, k)
+
+    def similarity_search_by_vector_with_vectors(self, embedding, k: int = 4):
+        self._poll()
+        return self.current.similarity_search_by_vector_with_vectors(embedding, k)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        self._poll()
+        return self.current.similarity_search_by_vector(embedding, k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        self._poll()
+        return self.current.similarity_search(query, k, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.current.version,
+            "chunks": len(self.current),
+            "dtype": self.current.manifest["dtype"],
+            "swaps": self.swaps,
+            **({"last_error": self.last_error} if self.last_error else {}),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and verify KB snapshots")
+    parser.add_argument("--verify", default=SNAPSHOT_DIR, help="snapshot file, or directory (checks CURRENT)")
+    args = parser.parse_args()
+    path = current_snapshot(args.verify) if os.path.isdir(args.verify) else args.verify
+    if path is None:
+        raise SystemExit(f"❌ No published snapshot in {args.verify}")
+    header = verify_snapshot(path)
+    print(f"✅ {path}: version {header['version']}, {header['count']} chunks × {header['dim']} ({header['dtype']}), "
+          f"model {header['embedding_model']}, checksum OK")
+
+
+if __name__ == "__main__":
+    main()
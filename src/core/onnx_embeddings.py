@@ -0,0 +1,87 @@
+# src/core/onnx_embeddings.py
+"""
+all-MiniLM-L6-v2 on ONNX Runtime, without torch.
+
+Reproduces the sentence-transformers pipeline (WordPiece tokenization,
+transformer, mean pooling over the attention mask, L2 normalization) with
+the `tokenizers` library and an ONNX export of the transformer (fp32, or
+dynamically quantized to int8). Export it once with
+src.data_processing.export_onnx_embedder.
+
+onnxruntime and tokenizers are optional; only this backend needs them.
+"""
+import os
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:  # optional: only the ONNX backend needs them
+    onnxruntime = None
+    Tokenizer = None
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's sentence-transformers max_seq_length
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """Drop-in replacement for HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")"""
+
+    def __init__(self, model_dir: str, quantized: bool = True, batch_size: int = 32, threads: int = None):
+        if onnxruntime is None:
+            raise ImportError("The ONNX embedding backend needs onnxruntime and tokenizers: "
+                              "pip install onnxruntime tokenizers")
+        self.model_dir = model_dir
+        self.quantized = quantized
+        self.batch_size = batch_size
+        # Identifies the vectors this backend produces, e.g. for the query-embedding cache
+        self.model_name = f"all-MiniLM-L6-v2-onnx{'-int8' if quantized else ''}"
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()  # pad each batch to its longest text
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]  # (batch, tokens, dim)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Sorting by length keeps padding (and wasted compute) per batch small
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch = self._embed_batch([texts[i] for i in rows])
+            if vectors.shape[1] == 0:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[rows] = batch
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
@@ -1,7 +1,8 @@
 # reddit_peer_llm.py
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from src.utils.conversation_memory import conversation_memory
+from src.utils.tracing import tracer
 import os
 from dotenv import load_dotenv
 
@@ -10,16 +11,18 @@ load_dotenv()  # Add this at the top
 class PeerSupportModel:
     def __init__(self, model_id="ft:gpt-3.5-turbo-0125:personal:empathia-peer:CBmcBHZ7"):
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.async_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.model_id = model_id
 
-    def generate_response(self, user_input: str, session_id: str = "default") -> str:
-        """Generates a peer response using the fine-tuned model."""
-        
-        # Get conversation history
-        history = conversation_memory.get_formatted_history(session_id)
+    def _build_prompt(self, user_input: str, session_id: str, history: str = None) -> str:
+        """Builds the peer prompt including conversation history."""
+
+        # Get conversation history (async callers fetch it off the event loop and pass it in)
+        if history is None:
+            history = conversation_memory.get_formatted_history(session_id)
 
         # Update the prompt to include history
-        prompt = f"""You are a compassionate grief counselor.
+        return f"""You are a compassionate grief counselor.
 
             CONVERSATION HISTORY:
             {history}
@@ -29,30 +32,92 @@ class PeerSupportModel:
 
             Respond with warmth, validation, and understanding. Keep your response under 50 words. Focus on emotional support rather than advice."""
 
+    def generate_response(self, user_input: str, session_id: str = "default") -> str:
+        """Generates a peer response using the fine-tuned model."""
+        prompt = self._build_prompt(user_input, session_id)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_id,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                max_tokens=60,
-                timeout=10
-            )
+            with tracer.span("peer.llm"):
+                response = self.client.chat.completions.create(
+                    model=self.model_id,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,
+                    max_tokens=60,
+                    timeout=10
+                )
 
             response_text = response.choices[0].message.content.strip()
-        
-            # Add to conversation memory
-            conversation_memory.add_message(session_id, "user", user_input)
-            conversation_memory.add_message(session_id, "assistant", response_text)
-        
+
+            # Turn messages are added to conversation memory by the app, once per turn
+            return response_text
+
+        except Exception as e:
+            print(f"Error generating peer response: {e}")
+            return "I'm so sorry you're going through this. I'm here to listen..."
+
+    async def agenerate_response(self, user_input: str, session_id: str = "default") -> str:
+        """Async version of generate_response for the turn engine."""
+        prompt = self._build_prompt(user_input, session_id, await conversation_memory.aget_formatted_history(session_id))
+
+        try:
+            with tracer.span("peer.llm"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model_id,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,
+                    max_tokens=60,
+                    timeout=10
+                )
+
+            response_text = response.choices[0].message.content.strip()
+
+            # Turn messages are added to conversation memory by the app, once per turn
             return response_text
 
         except Exception as e:
             print(f"Error generating peer response: {e}")
             return "I'm so sorry you're going through this. I'm here to listen..."
 
+    async def astream_response(self, user_input: str, session_id: str = "default"):
+        """Streams the peer response token by token (stream=True)."""
+        prompt = self._build_prompt(user_input, session_id, await conversation_memory.aget_formatted_history(session_id))
+        tokens = []
+
+        try:
+            with tracer.span("peer.llm", streaming=True):
+                stream = await self.async_client.chat.completions.create(
+                    model=self.model_id,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.8,
+                    max_tokens=60,
+                    timeout=10,
+                    stream=True
+                )
+
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if not tokens:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    tokens.append(delta)
+                    yield delta
+
+        except Exception as e:
+            print(f"Error streaming peer response: {e}")
+            if not tokens:
+                yield "I'm so sorry you're going through this. I'm here to listen..."
+            return
+        # Turn messages are added to conversation memory by the app, once per turn
+
 # Global instance
 # peer_support_model = PeerSupportModel()
 
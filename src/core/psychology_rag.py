@@ -1,40 +1,281 @@
 # psychology_rag.py
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
+from langchain_core.documents import Document
 from src.utils.conversation_memory import conversation_memory
+from src.utils.embedding_cache import CachedQueryEmbeddings
+from src.core.embeddings import load_embedding_model
+from src.core.vector_index import MemmapVectorIndex
+from src.core.ann_index import AnnVectorIndex
+from src.core.kb_snapshot import HotSwapVectorIndex, SNAPSHOT_DIR
+from src.core.bm25_index import BM25Index, HybridRetriever, BM25_INDEX_DIR
+from src.core.context_packing import mmr, pack_sentences, RETRIEVAL_CANDIDATES, MMR_K
+from src.utils.triggers import is_crisis
+from src.utils.tracing import tracer
 import streamlit as st
+import numpy as np
+import asyncio
+import hashlib
+import threading
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Vector store backend: "chroma", "memmap" (export it first with src.data_processing.export_vector_index),
+# "ann" (then also build it with src.data_processing.build_ann_index) or "snapshot" (the single-file
+# snapshots the KB build publishes to EMPATHIA_KB_SNAPSHOT_DIR, hot-swapped when a new one appears)
+VECTOR_BACKEND = os.getenv("EMPATHIA_VECTOR_BACKEND", "chroma")
+CHROMA_DIR = "./outputs/psychology_books_db_clean"
+VECTOR_INDEX_DIR = os.getenv("EMPATHIA_VECTOR_INDEX_DIR", "./outputs/psychology_books_index")
+# "dense" (vector search only) or "hybrid" (fused with the BM25 index the KB build writes to BM25_INDEX_DIR)
+RETRIEVAL_MODE = os.getenv("EMPATHIA_RETRIEVAL_MODE", "dense")
+
+# Semantic answer cache: reuse an expert answer for a near-identical question
+ANSWER_CACHE_SIZE = int(os.getenv("EMPATHIA_ANSWER_CACHE_SIZE", 512))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("EMPATHIA_ANSWER_CACHE_THRESHOLD", 0.92))  # cosine similarity
+
+# Retrieval gate: skip the expert LLM call when the best chunk is a weak match
+EXPERT_SCORE_FLOOR = float(os.getenv("EMPATHIA_EXPERT_SCORE_FLOOR", 0.3))  # cosine similarity
+
+# Share of the session vector (the conversation so far) in the dense query; the rest is the current message
+SESSION_QUERY_WEIGHT = float(os.getenv("EMPATHIA_SESSION_QUERY_WEIGHT", 0.3))
+
+
+def _chunk_id(doc) -> str:
+    """Stable id of a retrieved chunk"""
+    if getattr(doc, "id", None):
+        return doc.id
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def _search_with_vectors(vector_store, query_vector, k: int):
+    """(docs, cosine similarities, unit-length stored vectors) of the k best matches, best first"""
+    if hasattr(vector_store, "similarity_search_by_vector_with_vectors"):
+        return vector_store.similarity_search_by_vector_with_vectors(query_vector, k=k)
+    # Chroma: the same query returns the stored embeddings, so nothing is re-embedded
+    result = vector_store._collection.query(query_embeddings=[list(query_vector)], n_results=k,
+                                            include=["documents", "metadatas", "embeddings"])
+    ids = result["ids"][0]
+    docs = [Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+            for chunk_id, text, metadata in zip(ids, result["documents"][0], result["metadatas"][0])]
+    vectors = np.asarray(result["embeddings"][0], dtype=np.float32).reshape(len(ids), -1)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    return docs, vectors @ query, vectors
+
+
+class RetrievalGate:
+    """Decides from the retrieval score whether an expert answer is worth an LLM call.
+
+    Retrieval runs every turn. When the advice priority asks for the
+    expert, generation only runs if the best chunk's cosine similarity
+    reaches the floor. Crisis inputs always get an answer. Every skip is an
+    LLM call saved.
+    """
+
+    def __init__(self, floor: float = EXPERT_SCORE_FLOOR):
+        self.floor = floor
+        self.lock = threading.Lock()
+        self.retrievals = 0
+        self.score_total = 0.0
+        self.requested = 0         # turns whose advice priority asked for the expert
+        self.passed = 0
+        self.below_floor = 0       # skipped generations, i.e. LLM calls saved
+        self.crisis_overrides = 0  # below the floor, generated anyway
+
+    def record_retrieval(self, score):
+        with self.lock:
+            self.retrievals += 1
+            self.score_total += score or 0.0
+
+    def allows(self, user_input: str, score) -> bool:
+        """Whether to generate an answer grounded on a chunk with this score"""
+        if score is not None and score >= self.floor:
+            verdict = "pass"
+        elif is_crisis(user_input):
+            verdict = "crisis"
+        else:
+            verdict = "below_floor"
+        with self.lock:
+            self.requested += 1
+            if verdict == "below_floor":
+                self.below_floor += 1
+            else:
+                self.passed += 1
+                self.crisis_overrides += verdict == "crisis"
+        tracer.set_turn_attribute("expert_gate", verdict)
+        return verdict != "below_floor"
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "floor": self.floor,
+                "retrievals": self.retrievals,
+                "mean_score": round(self.score_total / self.retrievals, 3) if self.retrievals else None,
+                "expert_requested": self.requested,
+                "generated": self.passed,
+                "crisis_overrides": self.crisis_overrides,
+                "llm_calls_saved": self.below_floor,
+                "saved_rate": round(self.below_floor / self.requested, 3) if self.requested else 0.0,
+            }
+
+
+class SemanticAnswerCache:
+    """Expert answers keyed by question embedding and retrieved chunks.
+
+    A lookup is one matrix-vector product over every cached question
+    (unit-normalized rows, so the dot product is the cosine similarity).
+    A hit needs similarity >= threshold and the same retrieved chunks the
+    answer was grounded on. Those are the only inputs of a cached answer:
+    cacheable answers are generated without the conversation history, so
+    sharing them across sessions shares nothing personal. Full caches
+    evict the least recently used entry.
+    """
+
+    def __init__(self, max_size: int = ANSWER_CACHE_SIZE, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.vectors = None  # (max_size, dim) float32, allocated on first store
+        self.chunk_ids = np.empty(max_size, dtype=object)
+        self.answers = [None] * max_size
+        self.last_used = np.zeros(max_size, dtype=np.int64)
+        self.size = 0
+        self.clock = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, chunk_id: str):
+        """Cached answer for this question and chunk, or None"""
+        query = self._normalize(vector)
+        with self.lock:
+            self.clock += 1
+            if self.size == 0:
+                self.misses += 1
+                return None
+            similarity = self.vectors[:self.size] @ query
+            similarity[self.chunk_ids[:self.size] != chunk_id] = -1.0
+            best = int(np.argmax(similarity))
+            if similarity[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.last_used[best] = self.clock
+            self.hits += 1
+            return self.answers[best]
+
+    def store(self, vector, chunk_id: str, answer: str):
+        query = self._normalize(vector)
+        with self.lock:
+            self.clock += 1
+            if self.vectors is None:
+                self.vectors = np.zeros((self.max_size, query.shape[0]), dtype=np.float32)
+            if self.size < self.max_size:
+                slot = self.size
+                self.size += 1
+            else:
+                slot = int(np.argmin(self.last_used))
+                self.evictions += 1
+            self.vectors[slot] = query
+            self.chunk_ids[slot] = chunk_id
+            self.answers[slot] = answer
+            self.last_used[slot] = self.clock
+
+    def record_bypass(self):
+        with self.lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self.lock:
+            self.vectors = None
+            self.chunk_ids = np.empty(self.max_size, dtype=object)
+            self.answers = [None] * self.max_size
+            self.last_used = np.zeros(self.max_size, dtype=np.int64)
+            self.size = 0
+            self.clock = 0
+            self.hits = self.misses = self.bypassed = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_answers": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "crisis_bypassed": self.bypassed,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "threshold": self.threshold,
+            }
+
+
 class PsychologyBookExpert:
     _instance = None  # Singleton instance
     _initialized = False  # Track initialization
+    _init_lock = threading.Lock()
     
     def __new__(cls):
         """Singleton pattern - only one instance exists"""
-        if cls._instance is None:
-            cls._instance = super(PsychologyBookExpert, cls).__new__(cls)
+        with cls._init_lock:
+            if cls._instance is None:
+                cls._instance = super(PsychologyBookExpert, cls).__new__(cls)
         return cls._instance
 
     def __init__(self):
         """Initialize only once"""
-        if not self._initialized:
-            # Load the pre-built vector database (ONCE)
-            self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-            self.vector_store = Chroma(
-                persist_directory="./outputs/psychology_books_db_clean",
-                embedding_function=self.embeddings
-            )
-            self.llm = None # Will be initialized later
-            self.prompt_template = None # Will be initialized later
-            self.initialize_llm() # Will be initialized later
-            self._initialized = True # Mark as initialized
-            print("✅ Psychology expert initialized successfully!")
-        # Else: Already initialized, do nothing
+        with self._init_lock:  # the prewarm thread and a first turn can race here
+            if not self._initialized:
+                # Load the pre-built vector database (ONCE)
+                # Repeated queries are served from the cache instead of re-running MiniLM
+                # Backend (PyTorch or ONNX Runtime) per EMPATHIA_EMBEDDING_BACKEND
+                self.embeddings = CachedQueryEmbeddings(load_embedding_model())
+                # Messages are embedded once, as they are added, into per-session vectors. They bypass the
+                # query cache: it persists text to disk, and conversations must not outlive their session
+                model = self.embeddings.embeddings
+                conversation_memory.set_message_embedder(model.embed_documents,
+                                                         getattr(model, "model_name", type(model).__name__))
+                self.vector_store = self._load_vector_store()
+                self.hybrid = None
+                if RETRIEVAL_MODE == "hybrid":
+                    self.hybrid = HybridRetriever(self.vector_store, BM25Index(BM25_INDEX_DIR))
+                self.answer_cache = SemanticAnswerCache()
+                self.gate = RetrievalGate()
+                self.llm = None # Will be initialized later
+                self.prompt_template = None # Will be initialized later
+                self.initialize_llm() # Will be initialized later
+                self._initialized = True # Mark as initialized
+                print("✅ Psychology expert initialized successfully!")
+            # Else: Already initialized, do nothing
+
+    def _load_vector_store(self):
+        """Chroma by default; the memory-mapped exact, ANN or snapshot index per EMPATHIA_VECTOR_BACKEND"""
+        if VECTOR_BACKEND == "snapshot":
+            index = HotSwapVectorIndex(SNAPSHOT_DIR, embedding_function=self.embeddings)
+            print(f"📦 Using KB snapshot {index.current.version} ({len(index)} chunks, {index.manifest['dtype']})")
+            return index
+        if VECTOR_BACKEND == "ann":
+            index = AnnVectorIndex(VECTOR_INDEX_DIR, embedding_function=self.embeddings)
+            print(f"📦 Using ANN vector index ({len(index)} chunks, {index.params['kind']})")
+            return index
+        if VECTOR_BACKEND == "memmap":
+            index = MemmapVectorIndex(VECTOR_INDEX_DIR, embedding_function=self.embeddings)
+            print(f"📦 Using memory-mapped vector index ({len(index)} chunks, {index.manifest['dtype']})")
+            return index
+        return Chroma(
+            persist_directory=CHROMA_DIR,
+            embedding_function=self.embeddings
+        )
 
     def initialize_llm(self):
         """Initialize LLM components (only once)"""
@@ -105,44 +346,169 @@ class PsychologyBookExpert:
 
 
 
-    def get_expert_response(self, user_input, session_id="default"):
-        """The main function to get an expert response."""
-        if not self._initialized or self.llm is None or self.prompt_template is None:
-            return "Expert system not available. Please check configuration."
+    def retrieve(self, user_input, session_id="default"):
+        """Retrieval stage: relevant context from psychology books.
 
-        try:
+        The top RETRIEVAL_CANDIDATES chunks are fetched with their stored
+        vectors and MMR re-ranked down to MMR_K. Whole sentences from those
+        chunks are then packed into the context token budget. Returns
+        (context, chunk_ids, score). chunk_ids keys the answer cache. The
+        score is the best chunk's cosine similarity to the query, or None
+        if nothing was found.
 
-            # Get conversation history for context
-            history = conversation_memory.get_formatted_history(session_id)
+        The dense query blends the current message's embedding with the
+        session vector of the turns before it, so only the message itself is
+        embedded here (and cached: the answer cache and the session vector
+        reuse it).
+        """
+        with tracer.span("expert.embedding"):
+            query_vector = np.asarray(self.embeddings.embed_query(user_input), dtype=np.float32)
+            query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+            session_vector = conversation_memory.get_session_vector(session_id, exclude=user_input)
+            if session_vector is not None and SESSION_QUERY_WEIGHT > 0:
+                query_vector = (1 - SESSION_QUERY_WEIGHT) * query_vector + SESSION_QUERY_WEIGHT * session_vector
+                query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+            query_vector = query_vector.tolist()
+        with tracer.span("expert.similarity_search"):
+            docs, scores, vectors = _search_with_vectors(self.vector_store, query_vector, RETRIEVAL_CANDIDATES)
+        score = float(scores[0]) if len(docs) else None
+        first, lexical_first = None, None
+        if self.hybrid is not None:
+            # The fused top chunk leads; MMR picks the rest from the dense candidates
+            # BM25 still matches on the recent conversation's words
+            history_tail = conversation_memory.get_query_tail(session_id)
+            search_query = f"{user_input} {history_tail}" if history_tail else user_input
+            with tracer.span("expert.hybrid_search"):
+                fused = self.hybrid.search(search_query, query_vector, k=1, dense_docs=docs)
+            if fused:
+                ids = [_chunk_id(doc) for doc in docs]
+                if _chunk_id(fused[0]) in ids:
+                    first = ids.index(_chunk_id(fused[0]))
+                else:
+                    lexical_first = fused[0]  # BM25-only match, no stored vector at hand
+        with tracer.span("expert.mmr", candidates=len(docs)):
+            picked = [docs[i] for i in mmr(scores, vectors, MMR_K - (lexical_first is not None), first=first)]
+        if lexical_first is not None:
+            picked.insert(0, lexical_first)
+        self.gate.record_retrieval(score)
 
+        if not picked:
+            # Fallback: respond without context if search fails
+            return "Pet loss grief and coping strategies", None, score
+        with tracer.span("expert.context_packing", chunks=len(picked)):
+            context = pack_sentences([doc.page_content for doc in picked])
+        return context, ",".join(_chunk_id(doc) for doc in picked), score
 
-            # Retrieve relevant context from psychology books
-            # Search with both current input and recent history for better context
-            search_query = f"{user_input} {history[-200:]}" if history else user_input
-            relevant_docs = self.vector_store.similarity_search(search_query, k=1)
+    def _cached_answer(self, user_input, chunk_id):
+        """Look up a semantically cached answer. Returns (answer or None, question vector or None).
 
-            if not relevant_docs:
-                # Fallback: respond without context if search fails
-                context = "Pet loss grief and coping strategies"
-            else:
-                context = "\n".join([doc.page_content[:200] for doc in relevant_docs])  # Very short context
-        
+        A question vector means the answer is cacheable: generate it without
+        the conversation history, since the cache is shared by all sessions.
+        Crisis inputs always get a fresh answer, with history, and are never cached.
+        """
+        if chunk_id is None:
+            return None, None
+        if is_crisis(user_input):
+            self.answer_cache.record_bypass()
+            tracer.set_turn_attribute("expert_cache", "bypass")
+            return None, None
+        with tracer.span("expert.answer_cache"):
+            question_vector = self.embeddings.embed_query(user_input)
+            answer = self.answer_cache.lookup(question_vector, chunk_id)
+        tracer.set_turn_attribute("expert_cache", "miss" if answer is None else "hit")
+        return answer, question_vector
+
+    def _build_prompt(self, user_input, context, history=None):
+        """Create the prompt with variables (history None: a history-free, cacheable prompt)"""
+        return self.prompt_template.invoke({
+            "context": context if history is None else f"{context}\n\nConversation Context: {history}",
+            "question": user_input
+        }).to_string()
+
+    def get_expert_response(self, user_input, session_id="default", retrieval=None):
+        """The main function to get an expert response (pass `retrieval` if retrieve() already ran)."""
+        if not self._initialized or self.llm is None or self.prompt_template is None:
+            return "Expert system not available. Please check configuration."
+
+        try:
+            context, chunk_id, _ = retrieval or self.retrieve(user_input, session_id)
+            cached, question_vector = self._cached_answer(user_input, chunk_id)
+            if cached is not None:
+                return cached
+
+            # Get conversation history for context, unless the answer is going into the shared cache
+            history = conversation_memory.get_formatted_history(session_id) if question_vector is None else None
         
             # MODERN SYNTAX: Use invoke pattern
             # 1. Create the prompt with variables
-            prompt_value = self.prompt_template.invoke({
-                "context": f"{context}\n\nConversation Context: {history}",
-                "question": user_input
-            })
+            prompt = self._build_prompt(user_input, context, history)
         
             # 2. Send the prompt to the LLM
-            result = self.llm.invoke(prompt_value.to_string())
+            with tracer.span("expert.llm"):
+                result = self.llm.invoke(prompt)
         
             # 3. Extract the text content from the LLM response
-            return result.content.strip()
+            answer = result.content.strip()
+            if question_vector is not None:
+                self.answer_cache.store(question_vector, chunk_id, answer)
+            return answer
         
         except Exception as e:
             return f"Error consulting psychology resources: {e}"
+
+    async def aget_expert_response(self, user_input, session_id="default", retrieval=None):
+        """Async version of get_expert_response for the turn engine."""
+        if not self._initialized or self.llm is None or self.prompt_template is None:
+            return "Expert system not available. Please check configuration."
+
+        try:
+            # Embedding + vector search are CPU-bound, keep them off the event loop
+            context, chunk_id, _ = retrieval or await asyncio.to_thread(self.retrieve, user_input, session_id)
+            cached, question_vector = await asyncio.to_thread(self._cached_answer, user_input, chunk_id)
+            if cached is not None:
+                return cached
+            history = await conversation_memory.aget_formatted_history(session_id) if question_vector is None else None
+
+            prompt = self._build_prompt(user_input, context, history)
+            with tracer.span("expert.llm"):
+                result = await self.llm.ainvoke(prompt)
+            answer = result.content.strip()
+            if question_vector is not None:
+                self.answer_cache.store(question_vector, chunk_id, answer)
+            return answer
+
+        except Exception as e:
+            return f"Error consulting psychology resources: {e}"
+
+    async def astream_expert_response(self, user_input, session_id="default", retrieval=None):
+        """Streams the expert answer token by token. Errors propagate to the caller."""
+        if not self._initialized or self.llm is None or self.prompt_template is None:
+            raise RuntimeError("Expert system not available. Please check configuration.")
+
+        context, chunk_id, _ = retrieval or await asyncio.to_thread(self.retrieve, user_input, session_id)
+        cached, question_vector = await asyncio.to_thread(self._cached_answer, user_input, chunk_id)
+        if cached is not None:
+            yield cached
+            return
+        history = await conversation_memory.aget_formatted_history(session_id) if question_vector is None else None
+        prompt = self._build_prompt(user_input, context, history)
+
+        started = False
+        parts = []
+        with tracer.span("expert.llm", streaming=True):
+            async for chunk in self.llm.astream(prompt):
+                delta = chunk.content
+                if not delta:
+                    continue
+                if not started:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                    started = True
+                parts.append(delta)
+                yield delta
+        if question_vector is not None and parts:
+            self.answer_cache.store(question_vector, chunk_id, "".join(parts).strip())
         
 
 def get_psychology_expert():
@@ -0,0 +1,168 @@
+# src/core/vector_index.py
+"""
+Read-only, memory-mapped vector index for the psychology knowledge base.
+
+Layout of an index directory (written by src.data_processing.export_vector_index):
+
+    manifest.json     dtype, dim, count, embedding model, source collection
+    embeddings.npy    (count, dim) unit-normalized rows, float16 or int8
+    scales.npy        (count,) float32 per-row scales (int8 only)
+    texts.bin         every chunk's text, UTF-8, back to back
+    offsets.npy       (count + 1,) int64 byte offsets into texts.bin
+    metadata.jsonl    one {"id": ..., "metadata": {...}} line per chunk
+
+The arrays are np.load'ed with mmap_mode="r", so processes serving the same
+index share one copy through the page cache instead of each holding its own.
+"""
+import json
+import os
+from typing import List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+SCALES_FILE = "scales.npy"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+METADATA_FILE = "metadata.jsonl"
+
+INDEX_FORMAT_VERSION = 1
+
+
+class ChunkStore:
+    """Chunk texts, ids and metadata of an index directory (texts.bin, offsets.npy, metadata.jsonl)"""
+
+    def __init__(self, index_dir: str):
+        self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        self.texts = np.memmap(os.path.join(index_dir, TEXTS_FILE), dtype=np.uint8, mode="r") \
+            if self.offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)  # np.memmap refuses empty files
+
+        self.ids = []
+        self.metadatas = []
+        with open(os.path.join(index_dir, METADATA_FILE), 'r') as f:
+            for line in f:
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.metadatas.append(record["metadata"])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def text(self, row: int) -> str:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.texts[start:end].tobytes().decode("utf-8")
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.text(row), metadata=self.metadatas[row], id=self.ids[row])
+
+
+class ChunkStoreWriter:
+    """Streams chunks into the ChunkStore files; close() writes the offsets"""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.offsets = [0]
+        self._texts = open(os.path.join(output_dir, TEXTS_FILE), 'wb')
+        self._metadata = open(os.path.join(output_dir, METADATA_FILE), 'w')
+
+    def add(self, chunk_id: str, text: str, metadata: dict = None):
+        encoded = (text or "").encode("utf-8")
+        self._texts.write(encoded)
+        self.offsets.append(self.offsets[-1] + len(encoded))
+        self._metadata.write(json.dumps({"id": chunk_id, "metadata": metadata or {}}) + "\n")
+
+    def close(self) -> int:
+        """Finish the files, return the number of chunks written"""
+        self._texts.close()
+        self._metadata.close()
+        np.save(os.path.join(self.output_dir, OFFSETS_FILE), np.asarray(self.offsets, dtype=np.int64))
+        return len(self.offsets) - 1
+
+
+class MemmapVectorIndex:
+    """Exact top-k cosine search over a memory-mapped embedding matrix.
+
+    Implements the slice of the Chroma vector store API the expert uses
+    (`similarity_search_by_vector`, `similarity_search`), so it can stand in
+    for Chroma.
+    """
+
+    def __init__(self, index_dir: str, embedding_function=None, block_rows: int = 16384):
+        self.index_dir = index_dir
+        self.embedding_function = embedding_function
+        self.block_rows = block_rows
+
+        with open(os.path.join(index_dir, MANIFEST_FILE), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format in {index_dir}: {self.manifest.get('format_version')}")
+
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        self.scales = None
+        if self.manifest["dtype"] == "int8":
+            self.scales = np.load(os.path.join(index_dir, SCALES_FILE), mmap_mode="r")
+        self.chunks = ChunkStore(index_dir)
+        self.ids = self.chunks.ids
+        self.metadatas = self.chunks.metadatas
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def _document(self, row: int) -> Document:
+        return self.chunks.document(row)
+
+    def scores(self, vector) -> np.ndarray:
+        """Cosine similarity of `vector` to every stored chunk.
+
+        Rows are upcast to float32 a block at a time, so the temporary copy
+        stays bounded however large the index is; a typical KB is one block,
+        i.e. a single matrix-vector product.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            block = self.embeddings[start:start + self.block_rows]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def top_k(self, vector, k: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, scores) of the k best matches, best first"""
+        scores = self.scores(vector)
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.argpartition(-scores, k - 1)[:k]
+        rows = rows[np.argsort(-scores[rows])]
+        return rows, scores[rows]
+
+    def vectors(self, rows) -> np.ndarray:
+        """Stored unit-length vectors of `rows` as float32, dequantized for int8 indexes"""
+        rows = np.asarray(rows, dtype=np.int64)
+        vectors = np.asarray(self.embeddings[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= np.asarray(self.scales[rows])[:, None]
+        return vectors
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        rows, scores = self.top_k(embedding, k)
+        return [(self._document(int(row)), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vector_with_vectors(self, embedding: List[float], k: int = 4):
+        """(documents, scores, stored vectors) of the k best matches, for re-ranking without re-embedding"""
+        rows, scores = self.top_k(embedding, k)
+        return [self._document(int(row)) for row in rows], scores, self.vectors(rows)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        rows, _ = self.top_k(embedding, k)
+        return [self._document(int(row)) for row in rows]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        if self.embedding_function is None:
+            raise ValueError("similarity_search needs an embedding_function; use similarity_search_by_vector")
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
@@ -0,0 +1,83 @@
+# build_ann_index.py
+"""
+Build the ANN tier (src/core/ann_index.py) for an exported vector index.
+
+    python -m src.data_processing.export_vector_index --dtype int8
+    python -m src.data_processing.build_ann_index --kind ivfpq
+    python -m src.data_processing.build_ann_index --kind hnsw --hnsw-m 32
+"""
+import argparse
+import json
+import os
+import numpy as np
+from src.core.vector_index import MemmapVectorIndex
+from src.core.ann_index import faiss, ANN_INDEX_FILE, ANN_PARAMS_FILE, require_faiss
+
+DEFAULT_INDEX_DIR = "./outputs/psychology_books_index"
+
+
+def _blocks(index: MemmapVectorIndex, block_rows: int):
+    """Exact-index rows as float32 blocks (de-quantized for int8)"""
+    for start in range(0, len(index), block_rows):
+        block = np.asarray(index.embeddings[start:start + block_rows], dtype=np.float32)
+        if index.scales is not None:
+            block *= np.asarray(index.scales[start:start + block_rows])[:, None]
+        yield start, np.ascontiguousarray(block)
+
+
+def build_ann_index(index_dir: str, kind: str = "ivfpq", nlist: int = None, pq_m: int = 48, pq_bits: int = 8,
+                    hnsw_m: int = 32, ef_construction: int = 200, block_rows: int = 65536, seed: int = 0) -> dict:
+    """Build and save an ANN index for the exact index in `index_dir`, return its parameters"""
+    require_faiss()
+    base = MemmapVectorIndex(index_dir)
+    count, dim = len(base), base.embeddings.shape[1]
+
+    if kind == "hnsw":
+        ann = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        ann.hnsw.efConstruction = ef_construction
+        params = {"kind": kind, "hnsw_m": hnsw_m, "ef_construction": ef_construction}
+    elif kind == "ivfpq":
+        if dim % pq_m:
+            raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}")
+        nlist = nlist or max(1, min(65536, int(4 * np.sqrt(count))))  # usual 4*sqrt(N) rule of thumb
+        quantizer = faiss.IndexFlatIP(dim)
+        ann = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+        # Train on a sample: ~256 points per list is plenty for k-means
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, size=min(count, 256 * nlist), replace=False))
+        sample = np.asarray(base.embeddings[sample_rows], dtype=np.float32)
+        if base.scales is not None:
+            sample *= np.asarray(base.scales[sample_rows])[:, None]
+        print(f"Training IVF-PQ (nlist={nlist}, m={pq_m}, bits={pq_bits}) on {len(sample)} vectors...")
+        ann.train(np.ascontiguousarray(sample))
+        params = {"kind": kind, "nlist": nlist, "pq_m": pq_m, "pq_bits": pq_bits}
+    else:
+        raise ValueError(f"kind must be ivfpq or hnsw, got {kind}")
+
+    for start, block in _blocks(base, block_rows):
+        ann.add(block)
+        print(f"  added {start + len(block)}/{count} vectors")
+
+    params.update({"count": count, "dim": dim})
+    faiss.write_index(ann, os.path.join(index_dir, ANN_INDEX_FILE))
+    with open(os.path.join(index_dir, ANN_PARAMS_FILE), 'w') as f:
+        json.dump(params, f, indent=2)
+    print(f"✅ {kind} index saved to {index_dir}")
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an IVF-PQ or HNSW index next to an exported vector index")
+    parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--kind", choices=["ivfpq", "hnsw"], default="ivfpq")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default 4*sqrt(N))")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers (must divide the dimension)")
+    parser.add_argument("--pq-bits", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    args = parser.parse_args()
+    build_ann_index(args.index_dir, args.kind, args.nlist, args.pq_m, args.pq_bits, args.hnsw_m, args.ef_construction)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# build_bm25_index.py
+"""
+Build the BM25 keyword index (src/core/bm25_index.py) from an existing Chroma
+store, for knowledge bases built before the KB build emitted it.
+
+    python -m src.data_processing.build_bm25_index
+"""
+import argparse
+from langchain_chroma import Chroma
+from src.core.bm25_index import build_bm25_index, BM25_INDEX_DIR
+
+DEFAULT_CHROMA_DIR = "./outputs/psychology_books_db_clean"
+DEFAULT_BM25_DIR = BM25_INDEX_DIR
+PAGE_SIZE = 1000  # rows fetched from Chroma per call
+
+
+def iter_chroma_chunks(chroma_dir: str):
+    """(chunk_id, text, metadata) for every chunk of the Chroma collection"""
+    collection = Chroma(persist_directory=chroma_dir)._collection
+    for offset in range(0, collection.count(), PAGE_SIZE):
+        page = collection.get(limit=PAGE_SIZE, offset=offset, include=["documents", "metadatas"])
+        yield from zip(page["ids"], page["documents"], page["metadatas"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 index from an existing Chroma store")
+    parser.add_argument("--chroma-dir", default=DEFAULT_CHROMA_DIR)
+    parser.add_argument("--output", default=DEFAULT_BM25_DIR)
+    parser.add_argument("--k1", type=float, default=1.5)
+    parser.add_argument("--b", type=float, default=0.75)
+    args = parser.parse_args()
+    build_bm25_index(args.output, iter_chroma_chunks(args.chroma_dir), k1=args.k1, b=args.b)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# src/data_processing/build_cache.py
+"""
+Manifest and per-stage artifact cache for incremental knowledge-base builds.
+
+Every stage artifact (extracted pages, cleaned pages, chunks, embeddings)
+is stored under a key that hashes its input key together with the stage's
+configuration:
+
+    pages      = H(file sha256, path, extractor)
+    cleaned    = H(pages, cleaner fingerprint)
+    chunks     = H(cleaned, splitter config)
+    signatures = H(chunks, dedup config)         (MinHash, for near-duplicate detection)
+    embeddings = H(chunks, embedding model)
+
+Changing the cleaner, splitter or embedding model changes the keys
+downstream of it, so those stages rerun and the earlier ones stay cached.
+The manifest records, per PDF, its content hash, stage keys and the chunk
+ids it contributed to the vector store.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+STAGES = ("pages", "cleaned", "chunks", "signatures", "embeddings")
+ARRAY_STAGES = ("signatures", "embeddings")
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(*parts) -> str:
+    """Stable key for a stage: hash of its input key and configuration"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)  # readers never see a half-written artifact
+
+
+class ArtifactCache:
+    """Content-addressed stage artifacts: documents as JSON, signatures and embeddings as .npy"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        for stage in STAGES:
+            os.makedirs(os.path.join(cache_dir, stage), exist_ok=True)
+
+    def _path(self, stage: str, key: str) -> str:
+        extension = "npy" if stage in ARRAY_STAGES else "json"
+        return os.path.join(self.cache_dir, stage, f"{key}.{extension}")
+
+    def load_documents(self, stage: str, key: str) -> Optional[List[Document]]:
+        try:
+            with open(self._path(stage, key), encoding="utf-8") as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return None
+        return [Document(page_content=record["page_content"], metadata=record["metadata"]) for record in records]
+
+    def save_documents(self, stage: str, key: str, documents: List[Document]):
+        records = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+        _atomic_write(self._path(stage, key), json.dumps(records, ensure_ascii=False).encode("utf-8"))
+
+    def load_vectors(self, key: str, stage: str = "embeddings") -> Optional[np.ndarray]:
+        try:
+            return np.load(self._path(stage, key))
+        except FileNotFoundError:
+            return None
+
+    def save_vectors(self, key: str, vectors: np.ndarray, stage: str = "embeddings"):
+        tmp_path = self._path(stage, key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(vectors))
+        os.replace(tmp_path, self._path(stage, key))
+
+    def prune(self, live_keys: Dict[str, set]) -> int:
+        """Delete artifacts no longer referenced by the manifest; returns how many"""
+        removed = 0
+        for stage in STAGES:
+            stage_dir = os.path.join(self.cache_dir, stage)
+            for name in os.listdir(stage_dir):
+                if name.split(".", 1)[0] not in live_keys.get(stage, ()):
+                    os.remove(os.path.join(stage_dir, name))
+                    removed += 1
+        return removed
+
+
+def load_manifest(path: str) -> dict:
+    """{"version", "files": {relative path: {"sha256", "size", "mtime_ns", "keys", "chunk_ids", ...}}}"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "files": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"⚠️ Build manifest {path} has an unknown version, rebuilding from scratch")
+        return {"version": MANIFEST_VERSION, "files": {}}
+    return manifest
+
+
+def save_manifest(path: str, manifest: dict):
+    _atomic_write(path, json.dumps(manifest, indent=2).encode("utf-8"))
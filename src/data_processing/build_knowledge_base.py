@@ -1,28 +1,75 @@
 # build_knowledge_base.py
-from langchain.document_loaders import PyPDFLoader, DirectoryLoader
+from langchain.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import Chroma
+from src.core.bm25_index import build_bm25_index, BM25_INDEX_DIR
+from src.core.embeddings import load_embedding_model, EMBEDDING_BACKEND
+from src.data_processing.streaming_upsert import StreamingUpserter, EMBED_BATCH_SIZE
+from src.data_processing.dedup import MinHasher, NearDuplicateIndex, dedup_config, DEDUP_THRESHOLD
+from src.core.kb_snapshot import SnapshotWriter, current_snapshot, publish_snapshot, SNAPSHOT_DIR
+from src.data_processing.build_cache import (
+    ArtifactCache, cache_key, file_sha256, load_manifest, save_manifest, MANIFEST_FILE, MANIFEST_VERSION, STAGES
+)
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import argparse
+import glob
+import itertools
+import multiprocessing
+import hashlib
+import inspect
 import re
 import os
+import uuid
+import numpy as np
 
 # Go two levels up from this file → project root
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 # Build the correct absolute path to your PDFs
 DATA_DIR = os.path.join(PROJECT_ROOT, "data", "raw", "psychology_books")
+CHECKPOINT_EVERY = 2048  # chunks between manifest checkpoints
+SPLITTER_CONFIG = {
+    "chunk_size": 1000,
+    "chunk_overlap": 200,
+    "separators": ["\n\n", "\n", " ", ""],  # Preserve paragraph boundaries
+}
+DEFAULT_WORKERS = os.cpu_count() or 1
 
-print("Looking for PDFs in:", DATA_DIR)
-
-loader = DirectoryLoader(
-    DATA_DIR,
-    glob="*.pdf",
-    loader_cls=PyPDFLoader
-)
+# Cleaning rules, compiled once. clean_text applies them in the original order:
+# several overlap (a URL inside an e-mail address, "see Figure 3" inside parentheses,
+# nested citation brackets), so fusing them into one alternation would change the output.
+_URL = re.compile(r'https?://\S+|www\.\S+')
+_MARKDOWN_LINK = re.compile(r'\[.*?\]\(.*?\)')
+_FIGURE_REF = re.compile(r'\[?\b(Figure|Fig\.?|Table|Chart)\s+[A-Za-z0-9\.]+\]?')
+_SEE_FIGURE = re.compile(r'\(?[Ss]ee\s+[Ff]ig(?:ure)?\.?\s+[A-Za-z0-9\.]+\)?')
+_EMAIL = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_ET_AL_PARENS = re.compile(r'\([^)]*et al\.[^)]*\)')
+_ET_AL_BRACKETS = re.compile(r'\[[^\]]*et al\.[^\]]*\]')
+_BULLET = re.compile(r'\s*[•▪♦▶●]\s*')
+_BULLET_CHARS = frozenset('•▪♦▶●')
+_HYPHEN_BREAK = re.compile(r'-\n(\w)')
+_DIGITS = re.compile(r'\d+')
+_SECTION_KEYWORD = re.compile('abstract|introduction|method|result|discussion|conclusion')
+_CLEANING_PATTERNS = (_URL, _MARKDOWN_LINK, _FIGURE_REF, _SEE_FIGURE, _EMAIL, _ET_AL_PARENS, _ET_AL_BRACKETS,
+                      _BULLET, _HYPHEN_BREAK, _DIGITS, _SECTION_KEYWORD)
 
 class AcademicPDFCleaner:
     """Cleans professional/academic PDFs while preserving content integrity"""
     
+    edge_lines = 3  # lines at the top and bottom of a page where running headers/footers live
+
+    def fingerprint(self) -> str:
+        """Build-cache key for the cleaning rules: changes whenever this class's code or patterns do"""
+        rules = inspect.getsource(type(self)) + "".join(pattern.pattern for pattern in _CLEANING_PATTERNS)
+        return hashlib.sha256(rules.encode("utf-8")).hexdigest()[:16]
+
+    def clean_pages(self, pages: List[str]) -> List[str]:
+        """Clean every page of one document, dropping headers/footers that repeat across its pages"""
+        boilerplate = self.find_boilerplate(pages)
+        return [self.clean_text(self._strip_boilerplate(page, boilerplate)) for page in pages]
+
     def clean_text(self, text: str) -> str:
         """
         Clean academic PDF text while preserving professional content
@@ -30,59 +77,89 @@ class AcademicPDFCleaner:
         """
         if not text:
             return ""
-            
+        # Every pass is skipped when its pattern can't occur in the page (the common case)
+
         # 1. Remove URLs and hyperlinks
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
-        text = re.sub(r'\[.*?\]\(.*?\)', '', text)  # Markdown links
+        if 'http' in text or 'www.' in text:
+            text = _URL.sub('', text)
+        if '](' in text:
+            text = _MARKDOWN_LINK.sub('', text)  # Markdown links
         
         # 2. Remove image and figure references
-        text = re.sub(r'\[?\b(Figure|Fig\.?|Table|Chart)\s+[A-Za-z0-9\.]+\]?', '', text)
-        text = re.sub(r'\(?[Ss]ee\s+[Ff]ig(?:ure)?\.?\s+[A-Za-z0-9\.]+\)?', '', text)
+        if 'Fig' in text or 'Table' in text or 'Chart' in text:
+            text = _FIGURE_REF.sub('', text)
+        if 'ee' in text and ('fig' in text or 'Fig' in text):
+            text = _SEE_FIGURE.sub('', text)
         
         # 3. Remove email addresses
-        text = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', text)
+        if '@' in text:
+            text = _EMAIL.sub('', text)
         
         # 4. Remove citation clusters (keep individual citations)
-        text = re.sub(r'\([^)]*et al\.[^)]*\)', '', text)  # (Smith et al., 2020; Jones et al., 2021)
-        text = re.sub(r'\[[^\]]*et al\.[^\]]*\]', '', text)  # [1-5, 7, 9]
+        if 'et al.' in text:
+            text = _ET_AL_PARENS.sub('', text)  # (Smith et al., 2020; Jones et al., 2021)
+            text = _ET_AL_BRACKETS.sub('', text)  # [1-5, 7, 9]
         
-        # 5. Clean page headers/footers (common in academic PDFs)
+        # 5. Clean headers/footers repeated within the text (see clean_pages for whole documents)
         text = self._remove_repeating_headers(text)
         
         # 6. Remove orphaned characters from PDF extraction
-        text = re.sub(r'\s*[•▪♦▶●]\s*', ' ', text)  # Bullet points
-        text = re.sub(r'\f', '\n', text)  # Form feeds to newlines
-        text = re.sub(r'-\n(\w)', r'\1', text)  # Join hyphenated words across lines
-        
-        # 7. Normalize whitespace and preserve paragraph structure
-        text = re.sub(r'([.!?])\s+', r'\1\n\n', text)  # Sentence endings get double newlines
-        text = re.sub(r'\s+', ' ', text)  # Collapse multiple spaces
-        text = re.sub(r'\n\s*\n', '\n\n', text)  # Clean paragraph breaks
+        if not _BULLET_CHARS.isdisjoint(text):
+            text = _BULLET.sub(' ', text)  # Bullet points
+        text = text.replace('\f', '\n')  # Form feeds to newlines
+        if '-\n' in text:
+            text = _HYPHEN_BREAK.sub(r'\1', text)  # Join hyphenated words across lines
         
-        return text.strip()
+        # 7. Normalize whitespace. This used to add paragraph breaks after sentences, but
+        #    collapsing all whitespace right after undid them, so one collapse does it all
+        #    (str.split() splits on exactly the characters \s matches, and trims both ends)
+        return ' '.join(text.split())
     
+    def _is_exempt(self, clean_line: str) -> bool:
+        """Long lines and section headings are content, however often they repeat"""
+        return len(clean_line) > 60 or _SECTION_KEYWORD.search(clean_line.lower()) is not None
+
     def _remove_repeating_headers(self, text: str) -> str:
-        """Remove page headers and footers that repeat across pages"""
+        """Remove lines that repeat within one text (at least max(3, lines/20) times)"""
         lines = text.split('\n')
-        cleaned_lines = []
-        line_frequency = {}
-        
-        # Count line frequency
-        for line in lines:
-            clean_line = line.strip()
-            if len(clean_line) > 3:  # Ignore very short lines
-                line_frequency[clean_line] = line_frequency.get(clean_line, 0) + 1
-        
-        # Remove lines that appear too frequently (likely headers/footers)
+        line_frequency = Counter(line.strip() for line in lines)
         threshold = max(3, len(lines) // 20)  # Dynamic threshold
-        for line in lines:
-            clean_line = line.strip()
-            if (line_frequency.get(clean_line, 0) < threshold or 
-                len(clean_line) > 60 or  # Long lines are probably content
-                any(keyword in clean_line.lower() for keyword in ['abstract', 'introduction', 'method', 'result', 'discussion', 'conclusion'])):
-                cleaned_lines.append(line)
-        
-        return '\n'.join(cleaned_lines)
+        repeated = {line for line, count in line_frequency.items()
+                    if count >= threshold and len(line) > 3 and not self._is_exempt(line)}
+        if not repeated:
+            return text
+        return '\n'.join(line for line in lines if line.strip() not in repeated)
+
+    def _edge_rows(self, lines: List[str]) -> List[int]:
+        """Indexes of the first and last `edge_lines` non-blank lines of a page"""
+        rows = [i for i, line in enumerate(lines) if line.strip()]
+        if len(rows) <= 2 * self.edge_lines:
+            return rows
+        return rows[:self.edge_lines] + rows[-self.edge_lines:]
+
+    def _boilerplate_key(self, line: str) -> str:
+        return _DIGITS.sub('#', line.strip())  # "Page 12" and "Page 13" are the same footer
+
+    def find_boilerplate(self, pages: List[str]) -> set:
+        """Header/footer lines of a document: page-edge lines recurring on at least max(3, pages/20) pages"""
+        page_frequency = Counter()
+        for page in pages:
+            lines = page.split('\n')
+            page_frequency.update({
+                self._boilerplate_key(lines[i]) for i in self._edge_rows(lines)
+                if len(lines[i].strip()) > 3 and not self._is_exempt(lines[i].strip())
+            })
+        threshold = max(3, len(pages) // 20)
+        return {key for key, count in page_frequency.items() if count >= threshold}
+
+    def _strip_boilerplate(self, page: str, boilerplate: set) -> str:
+        if not boilerplate:
+            return page
+        lines = page.split('\n')
+        drop = {i for i in self._edge_rows(lines) if self._boilerplate_key(lines[i]) in boilerplate}
+        if not drop:
+            return page
+        return '\n'.join(line for i, line in enumerate(lines) if i not in drop)
     
     def _preserve_citations(self, text: str) -> str:
         """
@@ -95,25 +172,58 @@ class AcademicPDFCleaner:
 class KnowledgeBaseBuilder:
     def __init__(self,
                  pdf_directory=DATA_DIR, 
-                 persist_directory=os.path.join(PROJECT_ROOT, "data", "outputs", "psychology_books_db_clean")):  # UPDATED PATHS
+                 persist_directory=os.path.join(PROJECT_ROOT, "data", "outputs", "psychology_books_db_clean"),  # UPDATED PATHS
+                 bm25_directory=BM25_INDEX_DIR,
+                 build_directory=os.path.join(PROJECT_ROOT, "data", "outputs", "psychology_books_build"),
+                 snapshot_directory=SNAPSHOT_DIR,
+                 snapshot_dtype="float16",  # or "int8"; None skips the snapshot
+                 embedding_backend=EMBEDDING_BACKEND,  # "torch", "onnx" or "onnx-int8"
+                 splitter_config=SPLITTER_CONFIG,
+                 dedup_threshold=DEDUP_THRESHOLD):  # None or 0 keeps near-duplicate chunks
         self.pdf_directory = pdf_directory
         self.persist_directory = persist_directory
+        self.bm25_directory = bm25_directory
+        self.build_directory = build_directory  # manifest + stage artifact cache
+        self.snapshot_directory = snapshot_directory
+        self.snapshot_dtype = snapshot_dtype
+        self.embedding_backend = embedding_backend
         self.cleaner = AcademicPDFCleaner()
+        self.splitter_config = splitter_config
+        self.dedup_config = dedup_config(dedup_threshold) if dedup_threshold else None
+        self.minhasher = MinHasher()
+        self.text_splitter = RecursiveCharacterTextSplitter(length_function=len, **self.splitter_config)
+        self.cache = ArtifactCache(os.path.join(build_directory, "cache"))
+        self.manifest_path = os.path.join(build_directory, MANIFEST_FILE)
 
-    def build(self):
-        print("Step 1: Loading PDFs...")
-        loader = DirectoryLoader(self.pdf_directory, glob="**/*.pdf", loader_cls=PyPDFLoader)
-        raw_documents = loader.load()
-        print(f"Loaded {len(raw_documents)} documents")
-    
-        print("Step 2: Cleaning academic formatting...")
+    def _stage_keys(self, relpath: str, sha256: str, model_name: str) -> dict:
+        pages = cache_key("pages", sha256, relpath, "PyPDFLoader")
+        cleaned = cache_key("cleaned", pages, self.cleaner.fingerprint())
+        chunks = cache_key("chunks", cleaned, self.splitter_config)
+        return {"pages": pages, "cleaned": cleaned, "chunks": chunks,
+                "signatures": cache_key("signatures", chunks, self.dedup_config),
+                "embeddings": cache_key("embeddings", chunks, model_name)}
+
+    def _pages(self, path: str, keys: dict):
+        pages = self.cache.load_documents("pages", keys["pages"])
+        if pages is None:
+            pages = PyPDFLoader(path).load()
+            self.cache.save_documents("pages", keys["pages"], pages)
+        return pages
+
+    def _cleaned(self, path: str, keys: dict):
+        cleaned_documents = self.cache.load_documents("cleaned", keys["cleaned"])
+        if cleaned_documents is not None:
+            return cleaned_documents
         cleaned_documents = []
-        for i, doc in enumerate(raw_documents):
+        pages = self._pages(path, keys)
+        # Whole document at once, so headers/footers repeating across pages are found
+        cleaned_texts = self.cleaner.clean_pages([doc.page_content for doc in pages])
+        for doc, cleaned_text in zip(pages, cleaned_texts):
             cleaned_doc = doc.model_copy()
             original_length = len(cleaned_doc.page_content)
-            cleaned_doc.page_content = self.cleaner.clean_text(doc.page_content)
+            cleaned_doc.page_content = cleaned_text
             cleaned_length = len(cleaned_doc.page_content)
-        
+
             # Add metadata about cleaning
             cleaned_doc.metadata = {
                 **doc.metadata,
@@ -122,41 +232,273 @@ class KnowledgeBaseBuilder:
                 "cleaned_chars": cleaned_length,
                 "reduction_pct": round((1 - cleaned_length/original_length) * 100, 1) if original_length > 0 else 0
             }
-        
             cleaned_documents.append(cleaned_doc)
-            print(f"Document {i+1}: {original_length} → {cleaned_length} chars")
-    
-        print("Step 3: Splitting text into chunks...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]  # Preserve paragraph boundaries
-        )
-        texts = text_splitter.split_documents(cleaned_documents)
-        print(f"Created {len(texts)} text chunks")
-    
-        print("Step 4: Creating embeddings...")
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    
-        vector_store = Chroma.from_documents(
-            documents=texts,
-            embedding=embeddings,
-            persist_directory=self.persist_directory
+        self.cache.save_documents("cleaned", keys["cleaned"], cleaned_documents)
+        return cleaned_documents
+
+    def _chunks(self, path: str, keys: dict):
+        chunks = self.cache.load_documents("chunks", keys["chunks"])
+        if chunks is None:
+            chunks = self.text_splitter.split_documents(self._cleaned(path, keys))
+            self.cache.save_documents("chunks", keys["chunks"], chunks)
+        return chunks
+
+    def _signatures(self, path: str, keys: dict, chunks=None):
+        signatures = self.cache.load_vectors(keys["signatures"], stage="signatures")
+        if signatures is None:
+            chunks = self._chunks(path, keys) if chunks is None else chunks
+            signatures = self.minhasher.signatures([doc.page_content for doc in chunks])
+            self.cache.save_vectors(keys["signatures"], signatures, stage="signatures")
+        return signatures
+
+    def _kept(self, entry: dict, chunks):
+        """The chunks of a PDF that weren't dropped as near-duplicates"""
+        dropped = set(entry.get("dropped", ()))
+        return [doc for position, doc in enumerate(chunks) if position not in dropped]
+
+    def _vectors_key(self, entry: dict) -> str:
+        """Cache key of the vectors of a PDF's kept chunks"""
+        if not entry.get("dropped"):
+            return entry["keys"]["embeddings"]
+        return cache_key("embeddings", entry["keys"]["embeddings"], entry["dropped"])
+
+    def _write_snapshot(self, manifest: dict, collection, model_name: str) -> str:
+        """Write every kept chunk, with its vector, into a new snapshot and publish it; returns its path"""
+        writer = SnapshotWriter(self.snapshot_directory, dtype=self.snapshot_dtype, embedding_model=model_name)
+        for relpath, entry in manifest["files"].items():
+            chunks = self._kept(entry, self._chunks(os.path.join(self.pdf_directory, relpath), entry["keys"]))
+            if not chunks:
+                continue
+            vectors = self.cache.load_vectors(self._vectors_key(entry))
+            if vectors is None:
+                # Cached when the PDF was embedded, so only missing if the cache was cleared
+                stored = collection.get(ids=entry["chunk_ids"], include=["embeddings"])
+                by_id = dict(zip(stored["ids"], stored["embeddings"]))
+                vectors = np.asarray([by_id[chunk_id] for chunk_id in entry["chunk_ids"]], dtype=np.float32)
+            writer.add_batch(entry["chunk_ids"], [doc.page_content for doc in chunks],
+                             [doc.metadata for doc in chunks], vectors)
+        return publish_snapshot(writer.close())
+
+    def iter_chunks(self, todo, workers: int = 1):
+        """Extract, clean and split PDFs; yields (relpath, chunks) in `todo` order.
+
+        `todo` holds (relpath, path, stage keys). With workers > 1 each PDF is
+        processed in a process pool, with at most two PDFs per worker in
+        flight, so peak memory is bounded by a few PDFs, not the library.
+        Results finished early wait for the ones before them: near-duplicate
+        detection keeps the first copy it sees, so the order must not depend
+        on the worker count or on timing.
+        """
+        if workers <= 1:
+            for relpath, path, keys in todo:
+                yield relpath, self._chunks(path, keys)
+            return
+        todo = iter(todo)
+        pending = deque()  # in submission order
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_ingest_worker,
+                                 initargs=(self.pdf_directory, self.build_directory, self.splitter_config,
+                                           self.dedup_config and self.dedup_config["threshold"])) as pool:
+            while True:
+                for relpath, path, keys in itertools.islice(todo, 2 * workers - len(pending)):
+                    pending.append(pool.submit(_ingest_pdf, relpath, path, keys))
+                if not pending:
+                    return
+                yield pending.popleft().result()
+
+    def build(self, rebuild: bool = False, workers: int = 1, batch_size: int = EMBED_BATCH_SIZE,
+              checkpoint_every: int = CHECKPOINT_EVERY):
+        print("Step 1: Scanning PDFs in", self.pdf_directory)
+        os.makedirs(self.build_directory, exist_ok=True)
+        previous = {"files": {}} if rebuild else load_manifest(self.manifest_path)
+        embeddings = load_embedding_model(self.embedding_backend)
+        model_name = getattr(embeddings, "model_name", self.embedding_backend)
+
+        manifest = {"version": MANIFEST_VERSION, "files": {}}
+        changed = []
+        for path in sorted(glob.glob(os.path.join(self.pdf_directory, "**", "*.pdf"), recursive=True)):
+            relpath = os.path.relpath(path, self.pdf_directory)
+            stat = os.stat(path)
+            entry = previous["files"].get(relpath)
+            if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                sha256 = entry["sha256"]  # untouched since the last build: skip re-hashing
+            else:
+                sha256 = file_sha256(path)
+            keys = self._stage_keys(relpath, sha256, model_name)
+            if entry and entry["keys"] == keys and entry.get("complete", True):
+                manifest["files"][relpath] = {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            else:
+                # Incomplete entries come from an interrupted build: their chunks are redone
+                manifest["files"][relpath] = {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                              "keys": keys, "chunk_ids": [], "complete": False}
+                changed.append((relpath, path))
+        removed = [relpath for relpath in previous["files"] if relpath not in manifest["files"]]
+        print(f"Found {len(manifest['files'])} PDFs: {len(manifest['files']) - len(changed)} unchanged, "
+              f"{len(changed)} new or changed, {len(removed)} removed")
+
+        # A PDF whose chunks were dropped as near-duplicates of a changed or removed PDF is
+        # redone too: the chunks it lost may be unique now
+        redo = {relpath for relpath, _ in changed} | set(removed)
+        dependents = 0
+        while True:
+            affected = [relpath for relpath, entry in manifest["files"].items()
+                        if relpath not in redo and redo.intersection(entry.get("duplicate_of", ()))]
+            if not affected:
+                break
+            for relpath in affected:
+                entry = manifest["files"][relpath]
+                manifest["files"][relpath] = {**{field: entry[field] for field in ("sha256", "size", "mtime_ns", "keys")},
+                                              "chunk_ids": [], "complete": False}
+                changed.append((relpath, os.path.join(self.pdf_directory, relpath)))
+                redo.add(relpath)
+            dependents += len(affected)
+        if dependents:
+            print(f"Redoing {dependents} PDFs whose near-duplicate chunks pointed at changed or removed PDFs")
+
+        vector_store = Chroma(persist_directory=self.persist_directory, embedding_function=embeddings)
+        if not previous["files"] and vector_store._collection.count():
+            # Built without a manifest (or --rebuild): its chunk ids are unknown, so start over
+            print("Existing vector store has no build manifest, recreating it")
+            vector_store.delete_collection()
+            vector_store = Chroma(persist_directory=self.persist_directory, embedding_function=embeddings)
+        collection = vector_store._collection
+
+        stale_ids = [chunk_id for relpath in removed for chunk_id in previous["files"][relpath]["chunk_ids"]]
+        stale_ids += [chunk_id for relpath, _ in changed
+                      for chunk_id in previous["files"].get(relpath, {}).get("chunk_ids", [])]
+        if stale_ids:
+            collection.delete(ids=stale_ids)
+            print(f"Removed {len(stale_ids)} chunks of changed or deleted PDFs")
+
+        def checkpoint():
+            # The manifest lists every chunk id in the store (incomplete PDFs included), so a
+            # build interrupted after this point resumes by redoing only the unfinished PDFs
+            vector_store.persist()
+            save_manifest(self.manifest_path, manifest)
+            progress["since_checkpoint"] = 0
+
+        def on_complete(relpath, vectors):
+            entry = manifest["files"][relpath]
+            if vectors is not None:
+                self.cache.save_vectors(self._vectors_key(entry), vectors)
+            entry["complete"] = True
+            progress["pdfs"] += 1
+            progress["since_checkpoint"] += len(entry["chunk_ids"])
+            if progress["since_checkpoint"] >= checkpoint_every:
+                checkpoint()
+                print(f"  {progress['pdfs']}/{len(changed)} PDFs, {upserter.chunks:,} chunks upserted "
+                      f"({upserter.chunks_per_second:.0f} chunks/s)")
+
+        progress = {"pdfs": 0, "since_checkpoint": 0}
+        checkpoint()
+
+        # Near-duplicate index over the kept chunks of the unchanged PDFs; changed PDFs are checked against it
+        index = NearDuplicateIndex(self.dedup_config["threshold"]) if self.dedup_config else None
+        if index is not None:
+            for relpath, entry in manifest["files"].items():
+                if entry.get("complete", True):
+                    signatures = self._signatures(os.path.join(self.pdf_directory, relpath), entry["keys"])
+                    dropped = set(entry.get("dropped", ()))
+                    for position, signature in enumerate(signatures):
+                        if position not in dropped:
+                            index.add(signature, relpath)
+        run_chunks = run_dropped = 0
+        print(f"Steps 2-4: Cleaning, splitting ({workers} workers) and embedding ({self.embedding_backend}, "
+              f"batches of {batch_size}) {len(changed)} PDFs...")
+        upserter = StreamingUpserter(collection, embeddings, batch_size, on_complete=on_complete)
+        todo = [(relpath, path, manifest["files"][relpath]["keys"]) for relpath, path in changed]
+        for relpath, chunks in self.iter_chunks(todo, workers):
+            entry = manifest["files"][relpath]
+            if index is not None:
+                signatures = self._signatures(os.path.join(self.pdf_directory, relpath), entry["keys"], chunks)
+                entry["dropped"], entry["duplicate_of"] = index.deduplicate(relpath, signatures)
+            dropped = set(entry.get("dropped", ()))
+            run_chunks += len(chunks)
+            run_dropped += len(dropped)
+            # Deterministic ids, shared with the BM25 index so hybrid retrieval can fuse both rankings
+            entry["chunk_ids"] = [str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry['keys']['chunks']}:{n}"))
+                                  for n in range(len(chunks)) if n not in dropped]
+            upserter.add(relpath, entry["chunk_ids"], self._kept(entry, chunks),
+                         self.cache.load_vectors(self._vectors_key(entry)))
+        upserter.flush()
+        checkpoint()
+        if changed:
+            print(f"Upserted {upserter.chunks:,} chunks ({upserter.embedded:,} embedded, the rest from cache) "
+                  f"at {upserter.chunks_per_second:.0f} chunks/s")
+
+        print("Step 5: Building BM25 keyword index...")
+        build_bm25_index(
+            self.bm25_directory,
+            ((chunk_id, doc.page_content, doc.metadata)
+             for relpath, entry in manifest["files"].items()
+             for chunk_id, doc in zip(entry["chunk_ids"],
+                                      self._kept(entry, self._chunks(os.path.join(self.pdf_directory, relpath),
+                                                                     entry["keys"]))))
         )
-        vector_store.persist()
-    
+
+        snapshot = None
+        if self.snapshot_dtype and (changed or removed or current_snapshot(self.snapshot_directory) is None):
+            print("Step 6: Writing knowledge-base snapshot...")
+            snapshot = self._write_snapshot(manifest, collection, model_name)
+
+        live_keys = {stage: {entry["keys"][stage] for entry in manifest["files"].values()} for stage in STAGES}
+        live_keys["embeddings"] = {self._vectors_key(entry) for entry in manifest["files"].values()}
+        pruned = self.cache.prune(live_keys)
+
+        total_chunks = sum(len(entry["chunk_ids"]) for entry in manifest["files"].values())
         print("✅ Professional knowledge base built successfully!")
         print(f"📍 Saved to: {self.persist_directory}")
-        print(f"📊 Total chunks: {len(texts)}")
-    
-        # Show cleaning summary
-        total_original = sum(doc.metadata.get('original_chars', 0) for doc in cleaned_documents)
-        total_cleaned = sum(doc.metadata.get('cleaned_chars', 0) for doc in cleaned_documents)
-        avg_reduction = sum(doc.metadata.get('reduction_pct', 0) for doc in cleaned_documents) / len(cleaned_documents)
-    
-        print(f"🧹 Cleaning summary: {total_original:,} → {total_cleaned:,} chars ({avg_reduction:.1f}% reduction)")
+        if snapshot:
+            print(f"📦 Published snapshot: {snapshot}")
+        print(f"📊 Total chunks: {total_chunks} ({upserter.chunks} added, {len(stale_ids)} removed, "
+              f"{pruned} stale cache artifacts pruned)")
+        if index is not None:
+            total_dropped = sum(len(entry.get("dropped", ())) for entry in manifest["files"].values())
+            print(f"🧬 Near-duplicates: dropped {run_dropped} of {run_chunks} new chunks; the index holds "
+                  f"{total_chunks:,} chunks instead of {total_chunks + total_dropped:,} "
+                  f"({100 * total_dropped / max(total_chunks + total_dropped, 1):.1f}% smaller)")
+
+        # Show cleaning summary (one PDF in memory at a time)
+        total_original = total_cleaned = total_reduction = pages = 0
+        for relpath, entry in manifest["files"].items():
+            for doc in self._cleaned(os.path.join(self.pdf_directory, relpath), entry["keys"]):
+                total_original += doc.metadata.get('original_chars', 0)
+                total_cleaned += doc.metadata.get('cleaned_chars', 0)
+                total_reduction += doc.metadata.get('reduction_pct', 0)
+                pages += 1
+        if pages:
+            print(f"🧹 Cleaning summary: {total_original:,} → {total_cleaned:,} chars "
+                  f"({total_reduction / pages:.1f}% reduction)")
+
+_worker_builder = None  # per-process builder in the ingestion pool
+
+
+def _init_ingest_worker(pdf_directory, build_directory, splitter_config, dedup_threshold):
+    global _worker_builder
+    _worker_builder = KnowledgeBaseBuilder(pdf_directory=pdf_directory, build_directory=build_directory,
+                                           splitter_config=splitter_config, dedup_threshold=dedup_threshold)
+
+
+def _ingest_pdf(relpath, path, keys):
+    """Pool task: extract, clean, split and MinHash one PDF (stage artifacts are cached by the worker)"""
+    chunks = _worker_builder._chunks(path, keys)
+    if _worker_builder.dedup_config:
+        _worker_builder._signatures(path, keys, chunks)
+    return relpath, chunks
+
 
 if __name__ == "__main__":
-    builder = KnowledgeBaseBuilder()
-    builder.build()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build (or incrementally update) the psychology knowledge base")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="ignore the build manifest and recreate the vector store (stage caches are still used)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="processes extracting, cleaning and splitting PDFs (1 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding/upsert batch")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help="chunks between vector store commits and manifest checkpoints")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="estimated Jaccard similarity at which a chunk counts as a near-duplicate (0 keeps them all)")
+    args = parser.parse_args()
+    builder = KnowledgeBaseBuilder(dedup_threshold=args.dedup_threshold)
+    builder.build(rebuild=args.rebuild, workers=args.workers, batch_size=args.batch_size,
+                  checkpoint_every=args.checkpoint_every)
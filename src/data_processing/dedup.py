@@ -0,0 +1,105 @@
+# src/data_processing/dedup.py
+"""
+Near-duplicate chunk detection for the KB build: MinHash over word
+shingles, with LSH banding to find candidates.
+
+Each chunk becomes a MinHash signature whose agreement rate with another
+signature estimates the Jaccard similarity of their word-shingle sets.
+LSH banding (bands of `rows` values hashed into buckets) finds the
+candidates that might reach the threshold. Each candidate is then checked
+against the full signature, so the banding only has to keep recall high.
+"""
+import re
+import zlib
+from typing import List, Optional, Tuple
+import numpy as np
+
+DEDUP_THRESHOLD = 0.8  # estimated Jaccard similarity above which a chunk is a near-duplicate
+SHINGLE_SIZE = 5       # words per shingle
+NUM_PERM = 128         # MinHash permutations (signature length)
+LSH_BANDS = 16         # 16 bands × 8 rows: ~95% of pairs at Jaccard 0.8 become candidates, ~99.9% at 0.9
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def dedup_config(threshold: float = DEDUP_THRESHOLD) -> dict:
+    """Everything that affects dedup decisions, for the build cache key"""
+    return {"threshold": threshold, "shingle_size": SHINGLE_SIZE, "num_perm": NUM_PERM, "bands": LSH_BANDS}
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2**32 and shingle hashes < 2**32, so a * x + b can't overflow uint64
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)[:, None]
+        self.shingle_size = shingle_size
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        # crc32 rather than hash(): signatures are cached, so they must be stable across processes
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingle_hashes(text)[None, :]
+        return ((self.a * hashes + self.b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, len(self.a)), dtype=np.uint32)
+        return np.stack([self.signature(text) for text in texts])
+
+
+class NearDuplicateIndex:
+    """Signatures of the chunks kept so far, bucketed by LSH band; each chunk is tagged with its owner (PDF)"""
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = []
+        self.owners = []
+
+    def _band_keys(self, signature: np.ndarray):
+        rows = len(signature) // self.bands
+        return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(self.bands)]
+
+    def find(self, signature: np.ndarray) -> Optional[str]:
+        """Owner of the most similar indexed chunk at or above the threshold, if any"""
+        candidates = set()
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        if not candidates:
+            return None
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (np.stack([self.signatures[row] for row in rows]) == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return self.owners[rows[best]] if similarity[best] >= self.threshold else None
+
+    def add(self, signature: np.ndarray, owner: str):
+        row = len(self.signatures)
+        self.signatures.append(signature)
+        self.owners.append(owner)
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(row)
+
+    def deduplicate(self, owner: str, signatures: np.ndarray) -> Tuple[List[int], List[str]]:
+        """Index one document's chunks; returns (dropped positions, other owners they duplicated)"""
+        dropped, duplicate_of = [], set()
+        for position, signature in enumerate(signatures):
+            match = self.find(signature)
+            if match is None:
+                self.add(signature, owner)
+            else:
+                dropped.append(position)
+                if match != owner:
+                    duplicate_of.add(match)
+        return dropped, sorted(duplicate_of)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
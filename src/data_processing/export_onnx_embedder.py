@@ -0,0 +1,65 @@
+# export_onnx_embedder.py
+"""
+Export all-MiniLM-L6-v2 to ONNX (and a dynamically quantized int8 copy) for
+the ONNX Runtime embedding backend (src/core/onnx_embeddings.py).
+
+Needs torch and transformers, at export time only:
+
+    python -m src.data_processing.export_onnx_embedder
+    EMPATHIA_EMBEDDING_BACKEND=onnx-int8 streamlit run app.py
+"""
+import argparse
+import os
+from src.core.embeddings import ONNX_MODEL_DIR
+from src.core.onnx_embeddings import ONNX_MODEL_FILE, ONNX_INT8_MODEL_FILE
+
+HF_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, quantize: bool = True, opset: int = 14):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(HF_MODEL)
+    model = AutoModel.from_pretrained(HF_MODEL).eval()
+    tokenizer.save_pretrained(output_dir)  # writes tokenizer.json for the runtime
+
+    print(f"Step 1: Exporting {HF_MODEL} to ONNX...")
+    sample = tokenizer(["How do I cope with the loss of my dog?"], return_tensors="pt")
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in INPUT_NAMES),
+            model_path,
+            input_names=INPUT_NAMES,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "tokens"} for name in INPUT_NAMES + ["last_hidden_state"]},
+            opset_version=opset,
+        )
+    print(f"  {model_path} ({os.path.getsize(model_path) / 1e6:.1f} MB)")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print("Step 2: Quantizing weights to int8...")
+        int8_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"  {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+
+    print(f"✅ ONNX embedder saved to {output_dir}")
+    print("   Check parity and speed with: python -m src.benchmarks.embedding_backends")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 to ONNX for the ONNX Runtime backend")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 copy")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export_onnx(args.output, quantize=not args.no_quantize, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# export_vector_index.py
+"""
+Export the Chroma knowledge base into a memory-mapped vector index
+(see src/core/vector_index.py for the layout).
+
+    python -m src.data_processing.export_vector_index --dtype float16
+    python -m src.data_processing.export_vector_index --dtype int8 --output ./outputs/psychology_books_index_int8
+"""
+import argparse
+import json
+import os
+import numpy as np
+from langchain_chroma import Chroma
+from src.core.vector_index import ChunkStoreWriter, MANIFEST_FILE, EMBEDDINGS_FILE, SCALES_FILE, INDEX_FORMAT_VERSION
+
+DEFAULT_CHROMA_DIR = "./outputs/psychology_books_db_clean"
+DEFAULT_INDEX_DIR = "./outputs/psychology_books_index"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+PAGE_SIZE = 1000  # rows fetched from Chroma per call
+
+
+def quantize_int8(rows: np.ndarray):
+    """Symmetric per-row int8 quantization: row ≈ q * scale"""
+    scales = np.abs(rows).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def export_index(chroma_dir: str = DEFAULT_CHROMA_DIR, output_dir: str = DEFAULT_INDEX_DIR, dtype: str = "float16") -> dict:
+    """Dump every chunk of the Chroma collection into `output_dir`, return the manifest"""
+    if dtype not in ("float16", "int8"):
+        raise ValueError(f"dtype must be float16 or int8, got {dtype}")
+
+    collection = Chroma(persist_directory=chroma_dir)._collection
+    count = collection.count()
+    print(f"Exporting {count} chunks from {chroma_dir} ({dtype})...")
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # readers must not pick up a half-rewritten index
+    matrix = None
+    scales = np.ones(count, dtype=np.float32)
+
+    chunks = ChunkStoreWriter(output_dir)
+    row = 0
+    try:
+        for page_start in range(0, count, PAGE_SIZE):
+            page = collection.get(
+                limit=PAGE_SIZE, offset=page_start, include=["embeddings", "documents", "metadatas"]
+            )
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors.size == 0:
+                break
+            # MiniLM already emits unit vectors; normalizing again makes any model safe
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    os.path.join(output_dir, EMBEDDINGS_FILE), mode="w+",
+                    dtype=np.dtype(dtype), shape=(count, vectors.shape[1])
+                )
+            end = row + len(vectors)
+            if dtype == "int8":
+                matrix[row:end], scales[row:end] = quantize_int8(vectors)
+            else:
+                matrix[row:end] = vectors.astype(np.float16)
+
+            for chunk_id, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                chunks.add(chunk_id, text, meta)
+            row = end
+            print(f"  {row}/{count} chunks")
+    finally:
+        chunks.close()
+
+    dim = matrix.shape[1] if matrix is not None else 0
+    if matrix is None:
+        np.save(os.path.join(output_dir, EMBEDDINGS_FILE), np.zeros((0, 0), dtype=np.dtype(dtype)))
+    else:
+        matrix.flush()
+        del matrix
+    if dtype == "int8":
+        np.save(os.path.join(output_dir, SCALES_FILE), scales)
+
+    manifest = {
+        "format_version": INDEX_FORMAT_VERSION,
+        "dtype": dtype,
+        "dim": dim,
+        "count": row,
+        "embedding_model": EMBEDDING_MODEL,
+        "source": os.path.abspath(chroma_dir),
+    }
+    # Written last: an index without a manifest is incomplete and never loaded
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+    print(f"✅ Vector index exported to {output_dir} ({row} chunks, {size / 1e6:.1f} MB)")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Chroma knowledge base to a memory-mapped vector index")
+    parser.add_argument("--chroma-dir", default=DEFAULT_CHROMA_DIR)
+    parser.add_argument("--output", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--dtype", choices=["float16", "int8"], default="float16")
+    args = parser.parse_args()
+    export_index(args.chroma_dir, args.output, args.dtype)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# src/data_processing/streaming_upsert.py
+"""
+Streaming embed-and-upsert stage of the KB build.
+
+Chunks arrive one document (PDF) at a time and are buffered into
+fixed-size batches across documents; each full batch is embedded and
+upserted right away, so memory holds one batch plus the vectors of the
+documents still in flight, whatever the corpus size. Documents whose
+vectors are already cached skip the model. When every chunk of a
+document has been upserted, `on_complete(key, vectors)` fires: the
+builder uses it to cache the vectors and checkpoint its manifest.
+"""
+import time
+from typing import Callable, List, Optional
+import numpy as np
+
+EMBED_BATCH_SIZE = 256  # chunks per forward pass and per upsert (below Chroma's max batch size)
+
+
+class StreamingUpserter:
+    def __init__(self, collection, embeddings, batch_size: int = EMBED_BATCH_SIZE,
+                 on_complete: Optional[Callable[[str, Optional[np.ndarray]], None]] = None):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.on_complete = on_complete
+        self._buffer = []  # (key, position, chunk id, document, cached vector or None)
+        self._open = {}    # key -> {"remaining": chunks not yet upserted, "vectors": computed vectors or None}
+        self.chunks = 0    # upserted so far
+        self.embedded = 0  # of which ran through the model
+        self.started = time.perf_counter()
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / max(time.perf_counter() - self.started, 1e-9)
+
+    def add(self, key: str, chunk_ids: List[str], chunks, vectors: Optional[np.ndarray] = None):
+        """Queue one document's chunks; `vectors` are its cached embeddings, if any"""
+        if not chunks:
+            if self.on_complete:
+                self.on_complete(key, None)
+            return
+        self._open[key] = {"remaining": len(chunks), "vectors": None if vectors is not None else [None] * len(chunks)}
+        for position, (chunk_id, doc) in enumerate(zip(chunk_ids, chunks)):
+            self._buffer.append((key, position, chunk_id, doc, None if vectors is None else vectors[position]))
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Embed and upsert whatever is buffered"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        vectors = [item[4] for item in batch]
+        missing = [n for n, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embeddings.embed_documents([batch[n][3].page_content for n in missing])
+            for n, vector in zip(missing, computed):
+                vectors[n] = vector
+            self.embedded += len(missing)
+        self.collection.upsert(
+            ids=[item[2] for item in batch],
+            embeddings=[np.asarray(vector, dtype=np.float32).tolist() for vector in vectors],
+            documents=[item[3].page_content for item in batch],
+            metadatas=[item[3].metadata for item in batch],
+        )
+        self.chunks += len(batch)
+
+        for (key, position, _, _, _), vector in zip(batch, vectors):
+            state = self._open[key]
+            if state["vectors"] is not None:
+                state["vectors"][position] = vector
+            state["remaining"] -= 1
+            if state["remaining"] == 0:
+                del self._open[key]
+                if self.on_complete:
+                    computed = None if state["vectors"] is None else np.asarray(state["vectors"], dtype=np.float32)
+                    self.on_complete(key, computed)
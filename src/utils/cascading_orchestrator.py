@@ -1,53 +1,125 @@
 # src/utils/cascading_orchestrator.py
-import threading
+import asyncio
 import queue
-import streamlit as st
-from openai import OpenAI
-import os
-from dotenv import load_dotenv
 from src.core.psychology_rag import get_psychology_expert
 from src.core.peer_support_llm import get_peer_support_model
 from src.core.followup_llm import get_follow_up_model
 from src.utils.triggers import calculate_advice_priority
 from src.utils.conversation_memory import conversation_memory
+from src.utils.turn_engine import turn_engine
+from src.utils.tracing import tracer
+from src.utils.prewarm import expert_prewarmer, READY, FAILED
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Turn settings
+EXPERT_THRESHOLD = 0.2  # advice priority above which the expert is consulted
+EXPERT_GRACE_SECONDS = 2.0  # how long to wait for the expert once the peer reply is ready
+EXPERT_COLD_GRACE_SECONDS = 10.0  # same, while the expert is still warming up
+TURN_DEADLINE_SECONDS = 30.0  # hard deadline for a whole turn
 
-# Thread-safe queues
-#peer_queue = queue.Queue()
-#expert_queue = queue.Queue()
-#followup_queue = queue.Queue()
+_background_retrievals = set()  # keeps detached retrieval tasks referenced until they finish
 
-def generate_peer_response_async(user_input: str, session_id: str, debug: bool = False, output_queue: queue.Queue = None):
-    """Generate peer support in background thread."""
+
+async def generate_peer_response_async(user_input: str, session_id: str, debug: bool = False) -> str:
+    """Generate peer support on the turn engine loop."""
     try:
-        response = get_peer_support_model().generate_response(user_input, session_id)
-        output_queue.put(("success", response))
+        response = await get_peer_support_model().agenerate_response(user_input, session_id)
         if debug:
             print(f"DEBUG: Peer response ready")
+        return response
     except Exception as e:
-        output_queue.put(("error", f"Peer support error: {e}"))
+        if debug:
+            print(f"DEBUG: Peer support error: {e}")
+        return "I'm here to listen to you."
+
+def _plan_expert(needs_expert: bool, debug: bool = False):
+    """Whether to consult the expert this turn, and how long to wait for it after the peer reply.
+
+    A ready expert gets the normal grace period; one still warming up gets a
+    longer one instead of being dropped on the first turn; a failed one is skipped.
+    """
+    if not needs_expert:
+        tracer.set_turn_attribute("expert_gate", "not_requested")
+        return False, EXPERT_GRACE_SECONDS
+    expert_prewarmer.start()  # no-op unless prewarm was disabled at startup
+    state = expert_prewarmer.state
+    tracer.set_turn_attribute("expert_state", state)
+    if debug:
+        print(f"🔍 DEBUG: Expert state: {state}")
+    if state == FAILED:
+        return False, EXPERT_GRACE_SECONDS
+    return True, EXPERT_GRACE_SECONDS if state == READY else EXPERT_COLD_GRACE_SECONDS
+
+async def retrieve_expert_context_async(user_input: str, session_id: str, needs_expert: bool, debug: bool = False):
+    """Retrieval stage, run on every turn alongside the peer.
 
-def generate_expert_response_async(user_input: str, session_id: str, debug: bool = False, output_queue: queue.Queue = None):
-    """Generate expert advice in background thread."""
+    Returns (expert, (context, chunk_id, score)), or None when retrieval
+    fails or the expert isn't ready. A turn that didn't ask for the expert
+    never waits for a cold one.
+    """
     try:
-        psychology_expert = get_psychology_expert()
-        response = psychology_expert.get_expert_response(user_input, session_id)
-        output_queue.put(("success", response))
+        if needs_expert:
+            if not await expert_prewarmer.await_ready(TURN_DEADLINE_SECONDS):
+                return None
+        elif not expert_prewarmer.is_ready:
+            return None
+        psychology_expert = await asyncio.to_thread(get_psychology_expert)
+        retrieval = await asyncio.to_thread(psychology_expert.retrieve, user_input, session_id)
+        score = retrieval[2]
+        tracer.set_turn_attribute("retrieval_score", None if score is None else round(score, 3))
+        if debug:
+            print(f"DEBUG: Expert retrieval ready (score {score})")
+        return psychology_expert, retrieval
+    except Exception as e:
+        if debug:
+            print(f"DEBUG: Expert retrieval error: {e}")
+        return None
+
+def _retrieve_in_background(user_input: str, session_id: str, debug: bool = False):
+    """Retrieval for a turn that didn't ask for the expert.
+
+    It still runs alongside the peer (keeping the retrieval stats and the
+    session vector current) but outside the turn's TaskGroup, so the
+    follow-up never waits on a result nobody uses.
+    """
+    task = asyncio.create_task(retrieve_expert_context_async(user_input, session_id, False, debug))
+    _background_retrievals.add(task)
+    task.add_done_callback(_background_retrievals.discard)
+
+def _gate_expert(retrieved, user_input: str, needs_expert: bool, debug: bool = False) -> bool:
+    """Generation stage gate: the turn asked for the expert and retrieval found a strong enough chunk."""
+    if retrieved is None or not needs_expert:
+        return False
+    psychology_expert, (_, _, score) = retrieved
+    if psychology_expert.gate.allows(user_input, score):
+        return True
+    if debug:
+        print(f"DEBUG: Expert skipped, retrieval score {score} below {psychology_expert.gate.floor}")
+    return False
+
+async def generate_expert_response_async(user_input: str, session_id: str, debug: bool = False) -> str:
+    """Retrieve, then generate expert advice only if the gate lets it through."""
+    retrieved = await retrieve_expert_context_async(user_input, session_id, True, debug)
+    if not _gate_expert(retrieved, user_input, True, debug):
+        return None
+    psychology_expert, retrieval = retrieved
+    try:
+        response = await psychology_expert.aget_expert_response(user_input, session_id, retrieval)
         if debug:
             print(f"DEBUG: Expert response ready")
+        return response
     except Exception as e:
-        output_queue.put(("error", f"Expert error: {e}"))
+        if debug:
+            print(f"DEBUG: Expert error: {e}")
+        return None
 
-def generate_followup_question_async(user_input: str, peer_response: str, expert_response: str, session_id: str, debug: bool = False, output_queue: queue.Queue = None):
-    """Generate follow-up question in background thread."""
+async def generate_followup_question_async(user_input: str, peer_response: str, expert_response: str, session_id: str, debug: bool = False) -> str:
+    """Generate follow-up question on the turn engine loop."""
     try:
 
         # Get conversation history for context-aware follow-up questions
-        history = conversation_memory.get_formatted_history(session_id)
+        history = await conversation_memory.aget_formatted_history(session_id)
 
-        response = get_follow_up_model().generate_follow_up_question(
+        response = await get_follow_up_model().agenerate_follow_up_question(
             user_input=user_input, 
             peer_response=peer_response, 
             expert_response=expert_response,
@@ -55,91 +127,227 @@ def generate_followup_question_async(user_input: str, peer_response: str, expert
         )
 
         question = response.strip().replace('"', '').replace('?', '') + '?'
-        output_queue.put(("success", question))
         if debug:
             print(f"DEBUG: Follow-up question ready: {question}")
+        return question
             
     except Exception as e:
-        output_queue.put(("error", "What's coming up for you as you share this?"))
+        if debug:
+            print(f"DEBUG: Follow-up error: {e}")
+        return "How are you feeling now?"
+
+async def _wait_for_expert(expert_task: asyncio.Task, grace: float = EXPERT_GRACE_SECONDS, debug: bool = False):
+    """Give the expert a grace period after the peer reply, then give up on it."""
+    done, _ = await asyncio.wait({expert_task}, timeout=grace)
+    if not done:
+        # Expert timed out, proceed without it
+        expert_task.cancel()
+        if debug:
+            print("DEBUG: Expert response timed out")
+        return None
+
+    if debug:
+        print("DEBUG: Expert response received")
+    return expert_task.result()
 
 
 
 # Main orchestrator function
 
+async def orchestrate_cascading_response_async(user_input: str, session_id: str = "default", debug: bool = False) -> dict:
+    """
+    Runs the peer -> expert -> follow-up cascade as coroutines.
+    Returns: {'peer': response, 'expert': response, 'followup': question}
+    """
+    results = {'peer': None, 'expert': None, 'followup': None}
+
+    with tracer.turn(tracer.current_turn(), session_id=session_id):
+        # 1. Check if expert is needed
+        advice_priority = calculate_advice_priority(user_input, "")
+        needs_expert = advice_priority > EXPERT_THRESHOLD
+    
+        tracer.set_turn_attribute("advice_priority", advice_priority)
+        needs_expert, expert_grace = _plan_expert(needs_expert, debug)
+
+        if debug:
+            print(f"🔍 DEBUG: User input: '{user_input}'")
+            print(f"🔍 DEBUG: Advice priority: {advice_priority}")
+            print(f"🔍 DEBUG: Needs expert? {needs_expert}")
+
+        async with asyncio.timeout(TURN_DEADLINE_SECONDS):
+            async with asyncio.TaskGroup() as tg:
+                # 2. Start peer support immediately, and expert retrieval (+ gated generation) alongside it
+                peer_task = tg.create_task(generate_peer_response_async(user_input, session_id, debug))
+                if needs_expert:
+                    expert_task = tg.create_task(generate_expert_response_async(user_input, session_id, debug))
+                else:
+                    _retrieve_in_background(user_input, session_id, debug)
+
+                # 3. Wait for peer response
+                results['peer'] = await peer_task
+
+                # 4. Wait for expert response if needed BEFORE starting follow-up
+                if needs_expert:
+                    results['expert'] = await _wait_for_expert(expert_task, expert_grace, debug)
+
+            # 5. Follow-up question with actual expert response (if available)
+            results['followup'] = await generate_followup_question_async(
+                user_input, results['peer'], results['expert'] or "", session_id, debug
+            )
+
+    return results
+
+
 def orchestrate_cascading_response(user_input: str, session_id: str = "default", debug: bool = False) -> dict:
     """
-    Orchestrates the cascading async response generation.
+    Sync shim for app.py: runs the cascade on the shared turn engine loop.
     Returns: {'peer': response, 'expert': response, 'followup': question}
     """
-    # Thread-safe queues
-    peer_queue = queue.Queue()
-    expert_queue = queue.Queue()
-    followup_queue = queue.Queue()
+    turn = tracer.current_turn()  # carry the caller's turn attributes onto the engine loop
 
+    async def run_turn():
+        with tracer.turn(turn, session_id=session_id):
+            return await orchestrate_cascading_response_async(user_input, session_id, debug)
 
-    results = {'peer': None, 'expert': None, 'followup': None}
-    
-    # 1. Start peer support immediately
-    peer_thread = threading.Thread(
-        target=generate_peer_response_async, 
-        args=(user_input, session_id, debug, peer_queue),
-        daemon=True
-    )
-    peer_thread.start()
-    
-    # 2. Check if expert is needed and start it
-    advice_priority = calculate_advice_priority(user_input, "")
-    needs_expert = advice_priority > 0.2
-    
-    print(f"🔍 DEBUG: User input: '{user_input}'")
-    print(f"🔍 DEBUG: Advice priority: {advice_priority}")
-    print(f"🔍 DEBUG: Needs expert? {needs_expert}")
+    return turn_engine.run(run_turn(), timeout=TURN_DEADLINE_SECONDS + 1)
 
 
-    if needs_expert:
-        expert_thread = threading.Thread(
-            target=generate_expert_response_async,
-            args=(user_input, session_id, debug, expert_queue),
-            daemon=True
-        )
-        expert_thread.start()
-    
-    # 3. Wait for peer response (blocks until ready)
-    peer_status, peer_response = peer_queue.get()
-    results['peer'] = peer_response if peer_status == "success" else "I'm here to listen to you."
-    
+# Streaming mode
+
+_STREAM_DONE = object()  # end-of-turn marker for the sync bridge
+
+async def _stream_peer(user_input: str, session_id: str, debug: bool = False):
+    """Peer deltas, falling back to a fixed reply if the stream can't start."""
+    started = False
+    try:
+        async for delta in get_peer_support_model().astream_response(user_input, session_id):
+            started = True
+            yield delta
+        if debug:
+            print(f"DEBUG: Peer stream finished")
+    except Exception as e:
+        if debug:
+            print(f"DEBUG: Peer support error: {e}")
+        if not started:
+            yield "I'm here to listen to you."
+
+async def _pump_expert(user_input: str, session_id: str, deltas: asyncio.Queue, debug: bool = False):
+    """Retrieve, then buffer gated expert deltas while the peer is still streaming. Ends with None."""
+    try:
+        retrieved = await retrieve_expert_context_async(user_input, session_id, True, debug)
+        if not _gate_expert(retrieved, user_input, True, debug):
+            return
+        psychology_expert, retrieval = retrieved
+        async for delta in psychology_expert.astream_expert_response(user_input, session_id, retrieval):
+            deltas.put_nowait(delta)
+    except Exception as e:
+        if debug:
+            print(f"DEBUG: Expert error: {e}")
+    finally:
+        deltas.put_nowait(None)
+
+async def _drain_expert(expert_task: asyncio.Task, deltas: asyncio.Queue, grace: float = EXPERT_GRACE_SECONDS, debug: bool = False):
+    """Yield buffered and live expert deltas, giving up if none arrive within the grace period."""
+    try:
+        delta = await asyncio.wait_for(deltas.get(), timeout=grace)
+    except TimeoutError:
+        expert_task.cancel()
+        if debug:
+            print("DEBUG: Expert response timed out")
+        return
+
+    while delta is not None:
+        yield delta
+        delta = await deltas.get()
+
+async def _stream_followup(user_input: str, peer_response: str, expert_response: str, session_id: str, debug: bool = False):
+    """Follow-up deltas, falling back to a fixed question if the stream can't start."""
+    started = False
+    try:
+        history = await conversation_memory.aget_formatted_history(session_id)
+        async for delta in get_follow_up_model().astream_follow_up_question(
+            user_input=user_input,
+            peer_response=peer_response,
+            expert_response=expert_response,
+            conversation_history=history
+        ):
+            started = True
+            yield delta
+    except Exception as e:
+        if debug:
+            print(f"DEBUG: Follow-up error: {e}")
+        if not started:
+            yield "How are you feeling now?"
+
+async def astream_cascading_response(user_input: str, session_id: str = "default", debug: bool = False):
+    """
+    Streams the cascade as ordered (section, delta) pairs, section being
+    'peer', 'expert' or 'followup'. The expert runs alongside the peer and
+    its tokens are buffered until the peer section is complete.
+    """
+    with tracer.turn(tracer.current_turn(), session_id=session_id):
+        advice_priority = calculate_advice_priority(user_input, "")
+        needs_expert = advice_priority > EXPERT_THRESHOLD
+        tracer.set_turn_attribute("advice_priority", advice_priority)
+        needs_expert, expert_grace = _plan_expert(needs_expert, debug)
+
+        if debug:
+            print(f"🔍 DEBUG: User input: '{user_input}'")
+            print(f"🔍 DEBUG: Advice priority: {advice_priority}")
+            print(f"🔍 DEBUG: Needs expert? {needs_expert}")
+
+        peer_tokens, expert_tokens = [], []
+        async with asyncio.timeout(TURN_DEADLINE_SECONDS):
+            async with asyncio.TaskGroup() as tg:
+                expert_deltas = asyncio.Queue()
+                if needs_expert:
+                    expert_task = tg.create_task(_pump_expert(user_input, session_id, expert_deltas, debug))
+                else:
+                    _retrieve_in_background(user_input, session_id, debug)
+
+                async for delta in _stream_peer(user_input, session_id, debug):
+                    peer_tokens.append(delta)
+                    yield ('peer', delta)
+
+                if needs_expert:
+                    async for delta in _drain_expert(expert_task, expert_deltas, expert_grace, debug):
+                        expert_tokens.append(delta)
+                        yield ('expert', delta)
+
+            async for delta in _stream_followup(
+                user_input, "".join(peer_tokens), "".join(expert_tokens), session_id, debug
+            ):
+                yield ('followup', delta)
 
-    # 4. Wait for expert response if needed BEFORE starting follow-up
-    expert_response = ""
-    if needs_expert:
+
+def stream_cascading_response(user_input: str, session_id: str = "default", debug: bool = False):
+    """
+    Sync iterator for app.py over the same (section, delta) pairs as
+    astream_cascading_response. The turn runs on the shared engine loop and
+    hands deltas over as soon as they arrive.
+    """
+    deltas = queue.Queue()
+    turn = tracer.current_turn()  # carry the caller's turn attributes onto the engine loop
+
+    async def pump():
         try:
-            # Give expert more time to complete
-            expert_status, expert_response = expert_queue.get(timeout=2.0)
-            if expert_status == "success":
-                results['expert'] = expert_response
-                if debug:
-                    print("DEBUG: Expert response received")
-            else:
-                results['expert'] = None
-        except queue.Empty:
-            # Expert timed out, proceed without it
-            results['expert'] = None
-            if debug:
-                print("DEBUG: Expert response timed out")
-
-
-    # 5. Start follow-up question generation with actual expert response (if available)
-    followup_thread = threading.Thread(
-        target=generate_followup_question_async,
-        args=(user_input, results['peer'], results['expert'] or "", session_id, debug, followup_queue),
-        daemon=True
-    )
-    followup_thread.start()
-    
-    
-    # 6. Wait for follow-up question (blocks until ready)
-    followup_status, followup_question = followup_queue.get()
-    results['followup'] = followup_question if followup_status == "success" else "How are you feeling now?"
-    
-    
-    return results
\ No newline at end of file
+            with tracer.turn(turn, session_id=session_id):
+                async for item in astream_cascading_response(user_input, session_id, debug):
+                    deltas.put(item)
+        except Exception as e:
+            deltas.put(e)
+        finally:
+            deltas.put(_STREAM_DONE)
+
+    future = turn_engine.submit(pump())
+    try:
+        while True:
+            item = deltas.get(timeout=TURN_DEADLINE_SECONDS + 1)
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stops the turn if the UI stops reading early
+        future.cancel()
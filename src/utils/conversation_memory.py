@@ -1,70 +1,543 @@
 # src/utils/conversation_memory.py
-from typing import List, Dict
-import json
+from collections import OrderedDict, deque
+import asyncio
+from typing import List, Dict, Optional
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from src.utils.tracing import tracer
+from src.utils.session_store import SQLiteSessionStore
+from src.utils.tokens import count_tokens, truncate_to_tokens
+from src.utils.history_compactor import HistorySummarizer
+
+load_dotenv()
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, "data", "outputs", "conversation_memory.sqlite3")
+LEGACY_MEMORY_FILE = os.path.join(PROJECT_ROOT, "data", "outputs", "conversation_memory.json")
+
+# Eviction settings
+SESSION_TTL_SECONDS = float(os.getenv("EMPATHIA_SESSION_TTL_SECONDS", 24 * 3600))  # idle time before a session expires
+MAX_RESIDENT_SESSIONS = int(os.getenv("EMPATHIA_MAX_RESIDENT_SESSIONS", 1000))  # LRU cap on sessions held in RAM
+COMPACTION_INTERVAL_SECONDS = float(os.getenv("EMPATHIA_COMPACTION_INTERVAL_SECONDS", 300))
+# How long a resident session is trusted before re-checking the store for writes from other processes
+REVALIDATE_SECONDS = float(os.getenv("EMPATHIA_MEMORY_REVALIDATE_SECONDS", 5))
+
+# History block handed to prompts: rolling summary + newest messages within this many tokens
+HISTORY_TOKEN_BUDGET = int(os.getenv("EMPATHIA_HISTORY_TOKEN_BUDGET", 400))
+SUMMARY_BATCH = 4  # fold older messages into the summary once this many are waiting
+SUMMARY_MAX_MESSAGES = 20  # most messages folded in per summarization call
+QUERY_TAIL_CHARS = 200  # history characters appended to the expert's BM25 query
+
+# Session vector: running embedding of a session's messages, each message embedded once
+SESSION_VECTOR_DECAY = float(os.getenv("EMPATHIA_SESSION_VECTOR_DECAY", 0.7))  # weight older messages keep per new one
+ASSISTANT_VECTOR_WEIGHT = 0.5  # assistant replies count half as much as what the user said
+EMBED_BATCH = 32  # most messages read from the store per fold step
+VECTOR_CHECKPOINTS = 4  # recent (through id, vector) states kept to leave out the current turn
+
+
+def format_message(msg) -> str:
+    speaker = "User" if msg.role == "user" else "Assistant"
+    return f"{speaker}: {msg.message}"
+
+
+class Message:
+    """Compact message record: slotted, with interned role strings"""
+    __slots__ = ("id", "role", "message")
+
+    def __init__(self, id: int, role: str, message: str):
+        self.id = id
+        self.role = sys.intern(role)
+        self.message = message
+
+    def as_dict(self) -> Dict:
+        return {"role": self.role, "message": self.message}
+
+
+class SessionHistory:
+    """Resident window of a session's most recent messages plus its rolling summary.
+
+    Also keeps the rendered forms prompts need (token-budgeted history block,
+    search-query tail, token count). Each is built at most once per version;
+    per-line text and token counts are maintained incrementally as messages
+    are appended.
+    """
+    __slots__ = ("messages", "lines", "message_count", "last_id", "last_access", "validated_at",
+                 "summary", "summary_through", "summarized_count", "token_budget",
+                 "vector", "vector_model", "vector_through", "vector_count", "vector_history",
+                 "_formatted", "_token_count")
+
+    def __init__(self, messages, max_length: int, message_count: int, last_id: int,
+                 summary: str = "", summary_through: int = 0, summarized_count: int = 0,
+                 token_budget: int = None):
+        self.messages = deque(messages, maxlen=max_length)
+        self.lines = deque(([format_message(msg), None] for msg in self.messages), maxlen=max_length)  # [text, tokens]
+        self.message_count = message_count  # store-wide count, used to spot other writers
+        self.last_id = last_id
+        self.last_access = time.time()
+        self.validated_at = self.last_access
+        self.summary = summary
+        self.summary_through = summary_through  # id of the newest summarized message
+        self.summarized_count = summarized_count
+        self.token_budget = token_budget if token_budget is not None else HISTORY_TOKEN_BUDGET
+        # Decayed sum of message embeddings through message id vector_through (vector_count messages),
+        # loaded from the store on first use, and its last few states
+        self.vector_model, self.vector, self.vector_through, self.vector_count = None, None, 0, 0
+        self.vector_history = deque(maxlen=VECTOR_CHECKPOINTS)
+        self._formatted = None
+        self._token_count = None
+
+    @property
+    def version(self):
+        """Changes whenever the session's messages or summary change"""
+        return (self.last_id, self.summary_through)
+
+    @property
+    def pending_summary(self) -> int:
+        """Messages that left the window but are not yet in the summary"""
+        return self.message_count - len(self.messages) - self.summarized_count
+
+    def _invalidate(self) -> bool:
+        invalidated = self._formatted is not None
+        self._formatted = None
+        self._token_count = None
+        return invalidated
+
+    def append(self, msg: Message, message_count: int) -> bool:
+        """Add a message, returns True if cached renders were invalidated"""
+        self.messages.append(msg)
+        self.lines.append([format_message(msg), None])
+        self.message_count, self.last_id = message_count, msg.id
+        return self._invalidate()
+
+    def set_summary(self, summary: str, through_id: int, summarized_count: int) -> bool:
+        """Swap in a newer summary, returns True if cached renders were invalidated"""
+        self.summary, self.summary_through, self.summarized_count = summary, through_id, summarized_count
+        return self._invalidate()
+
+    @property
+    def rendered(self) -> bool:
+        """Whether the history block for the current version is cached"""
+        return self._formatted is not None
+
+    def formatted(self) -> str:
+        if self._formatted is None:
+            self._formatted = self._render()
+        return self._formatted
+
+    def _render(self) -> str:
+        """Summary + as many of the newest messages as fit the token budget"""
+        budget = self.token_budget
+        header = []
+        if self.summary:
+            summary_line = f"Summary of earlier conversation: {self.summary}"
+            summary_tokens = count_tokens(summary_line) + 1
+            if summary_tokens <= budget // 2:  # never let the summary crowd out recent messages
+                header.append(summary_line)
+                budget -= summary_tokens
+
+        recent = []
+        for line in reversed(self.lines):
+            if line[1] is None:
+                line[1] = count_tokens(line[0]) + 1  # +1 for the newline
+            if line[1] > budget:
+                if not recent:
+                    # The newest message alone is over budget: keep its end
+                    recent.append(truncate_to_tokens(line[0], budget - 1, keep_end=True))
+                break
+            recent.append(line[0])
+            budget -= line[1]
+
+        block = header + recent[::-1]
+        return "\n".join(block) if block else "No previous conversation."
+
+    def token_count(self) -> int:
+        if self._token_count is None:
+            self._token_count = count_tokens(self.formatted())
+        return self._token_count
+
+    def size_bytes(self) -> int:
+        """Approximate resident size (records + message text)"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.messages) + sys.getsizeof(self.lines)
+        size += sys.getsizeof(self.summary)
+        if self.vector is not None:
+            size += self.vector.nbytes
+        for msg in self.messages:
+            size += sys.getsizeof(msg) + sys.getsizeof(msg.message)
+        for line in self.lines:
+            size += sys.getsizeof(line) + sys.getsizeof(line[0])
+        return size
+
 
 class ConversationMemory:
-    def __init__(self, max_history_length=6):
+    def __init__(self, max_history_length=6, db_path=DEFAULT_DB_PATH, lock_stripes=64, legacy_memory_file=LEGACY_MEMORY_FILE,
+                 session_ttl=SESSION_TTL_SECONDS, max_resident_sessions=MAX_RESIDENT_SESSIONS,
+                 compaction_interval=COMPACTION_INTERVAL_SECONDS, revalidate_seconds=REVALIDATE_SECONDS,
+                 history_token_budget=HISTORY_TOKEN_BUDGET, summarizer=None):
         self.max_history_length = max_history_length
-        self.memory_file = os.path.join(PROJECT_ROOT, "data", "outputs", "conversation_memory.json")
-        self.conversations = self._load_memory()
-    
-    def _load_memory(self):
-        """Load conversation memory from file"""
-        if os.path.exists(self.memory_file):
-            try:
-                with open(self.memory_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-    
-    def _save_memory(self):
-        """Save conversation memory to file"""
-        os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
-        with open(self.memory_file, 'w') as f:
-            json.dump(self.conversations, f, indent=2)
-    
+        self.history_token_budget = history_token_budget
+        # Rolling summaries of messages older than the window (None keeps only the window)
+        self.summarizer = summarizer
+        self._summarizing = set()
+        # Embeds messages for the session vectors as they are added (set_message_embedder; None disables them)
+        self.message_embedder = None
+        self.embedder_model = None
+        self._embedder_pool = None
+        self._embed_locks = [threading.Lock() for _ in range(lock_stripes)]  # one fold per session at a time
+        self.revalidate_seconds = revalidate_seconds
+        self.session_ttl = session_ttl
+        self.max_resident_sessions = max_resident_sessions
+        self.compaction_interval = compaction_interval
+        # Per-session lock striping: sessions on different stripes never contend
+        self._locks = [threading.RLock() for _ in range(lock_stripes)]
+        self.db_path = db_path
+        self.store = SQLiteSessionStore(self.db_path)
+        # Legacy whole-file JSON store, imported once into SQLite
+        self.memory_file = legacy_memory_file
+        if self.memory_file:
+            self.store.migrate_from_json(self.memory_file)
+
+        # Resident sessions, least recently used first
+        self.conversations = OrderedDict()
+        self._index_lock = threading.Lock()  # guards the OrderedDict and metrics only
+        self.metrics = {"evictions_lru": 0, "evictions_ttl": 0, "compacted_sessions": 0, "reloads": 0,
+                        "history_renders": 0, "history_invalidations": 0, "summaries": 0, "summary_failures": 0,
+                        "message_embeddings": 0, "embedding_failures": 0}
+
+        self._compactor = None
+        self._stop_compaction = threading.Event()
+        if self.compaction_interval:
+            self.start_compaction()
+
+    def _session_lock(self, session_id: str) -> threading.RLock:
+        return self._locks[hash(session_id) % len(self._locks)]
+
+    def _load_session(self, session_id: str) -> SessionHistory:
+        message_count, last_id = self.store.session_info(session_id)
+        rows = self.store.recent(session_id, self.max_history_length) if message_count else []
+        summary = self.store.get_summary(session_id) if message_count > len(rows) else ("", 0, 0)
+        state = SessionHistory((Message(*row) for row in rows), self.max_history_length, message_count, last_id,
+                               *summary, token_budget=self.history_token_budget)
+        self._maybe_summarize(session_id, state)
+        return state
+
+    def _resident(self, session_id: str):
+        with self._index_lock:
+            state = self.conversations.get(session_id)
+            if state is not None:
+                self.conversations.move_to_end(session_id)
+        return state
+
+    def _admit(self, session_id: str, state: SessionHistory):
+        with self._index_lock:
+            self.conversations[session_id] = state
+            self.conversations.move_to_end(session_id)
+            while len(self.conversations) > self.max_resident_sessions:
+                self.conversations.popitem(last=False)
+                self.metrics["evictions_lru"] += 1
+
+    def _count(self, metric: str):
+        with self._index_lock:
+            self.metrics[metric] += 1
+
+    def _session(self, session_id: str) -> SessionHistory:
+        """Resident history for a session, reloaded if another process wrote to it.
+        Call with the session lock held."""
+        now = time.time()
+        state = self._resident(session_id)
+        if state is not None and now - state.validated_at >= self.revalidate_seconds:
+            if self.store.session_info(session_id) != (state.message_count, state.last_id):
+                self._count("reloads")
+                if state.rendered:
+                    self._count("history_invalidations")
+                state = None
+            else:
+                state.validated_at = now
+        if state is None:
+            state = self._load_session(session_id)
+            self._admit(session_id, state)
+        state.last_access = now
+        return state
+
     def add_message(self, session_id: str, role: str, message: str):
-        """Add a message to conversation history"""
-        if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        
-        self.conversations[session_id].append({
-            "role": role,
-            "message": message
-        })
-        
-        # Keep only the most recent messages
-        if len(self.conversations[session_id]) > self.max_history_length:
-            self.conversations[session_id] = self.conversations[session_id][-self.max_history_length:]
-        
-        self._save_memory()
-    
+        """Add a message to conversation history (single append, no file rewrite)"""
+        with self._session_lock(session_id):
+            with tracer.span("memory.persist"):
+                message_count, last_id = self.store.append(session_id, role, message)
+            self._maybe_embed(session_id)
+
+            state = self._resident(session_id)
+            if state is None:
+                return  # loaded lazily on the next read
+            if message_count == state.message_count + 1:
+                if state.append(Message(last_id, role, message), message_count):
+                    self._count("history_invalidations")
+                state.last_access = time.time()
+                self._maybe_summarize(session_id, state)
+            else:
+                # Someone else appended in between, rebuild from the store
+                self._count("reloads")
+                if state.rendered:
+                    self._count("history_invalidations")
+                self._admit(session_id, self._load_session(session_id))
+
     def get_history(self, session_id: str) -> List[Dict]:
-        """Get conversation history for a session"""
-        return self.conversations.get(session_id, [])
-    
+        """Get the most recent messages of a session"""
+        with self._session_lock(session_id):
+            return [msg.as_dict() for msg in self._session(session_id).messages]
+
     def get_formatted_history(self, session_id: str) -> str:
-        """Get conversation history as formatted text"""
-        history = self.get_history(session_id)
-        if not history:
-            return "No previous conversation."
-        
-        formatted = []
-        for i, msg in enumerate(history):
-            speaker = "User" if msg["role"] == "user" else "Assistant"
-            formatted.append(f"{speaker}: {msg['message']}")
-        
-        return "\n".join(formatted[-4:])  # Last 4 messages
-    
+        """Get conversation history as formatted text: rolling summary plus the newest
+        messages that fit the token budget (memoized per version)"""
+        with self._session_lock(session_id):
+            state = self._session(session_id)
+            if not state.rendered:
+                self._count("history_renders")
+            return state.formatted()
+
+    async def aget_formatted_history(self, session_id: str) -> str:
+        """get_formatted_history for the turn engine loop. It can wait on SQLite's busy timeout,
+        count tokens or queue a summary, so it runs in a worker thread: a slow read only delays
+        the calling turn, never every session sharing the loop."""
+        return await asyncio.to_thread(self.get_formatted_history, session_id)
+
+    def get_query_tail(self, session_id: str) -> str:
+        """Tail of the formatted history used to enrich the expert search query"""
+        return self.get_formatted_history(session_id)[-QUERY_TAIL_CHARS:]
+
+    def set_message_embedder(self, embed, model_name: str, workers: int = 2):
+        """Embed messages with `embed(texts) -> vectors` into session vectors (the expert registers its
+        embedding model, uncached, so message text is never written anywhere but the session store)"""
+        self.message_embedder, self.embedder_model = embed, model_name
+        if self._embedder_pool is None:
+            # Messages are embedded in the background as they are added, never on a user's turn
+            self._embedder_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="empathia-message-embedder")
+
+    def get_session_vector(self, session_id: str, exclude: str = None) -> Optional[np.ndarray]:
+        """Unit-length, decay-weighted embedding of the session's messages (None if there are none).
+
+        Any message the background embedder hasn't reached yet is folded in
+        first. `exclude` is the current user message: if it was already
+        added (and possibly answered), the vector from just before it is
+        returned, so a query blending it with this vector counts it once.
+        """
+        if self.message_embedder is None:
+            return None
+        state = self._fold_pending(session_id)
+        with self._session_lock(session_id):
+            vector = state.vector
+            if exclude is not None:
+                for msg in reversed(list(state.messages)[-2:]):  # the current turn is at most user + reply
+                    if msg.role != "user":
+                        continue
+                    if msg.message == exclude:
+                        earlier = [v for through, v in state.vector_history if through < msg.id]
+                        if earlier:
+                            vector = earlier[-1]
+                    break
+        if vector is None:
+            return None
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    # --- Session vectors ---
+
+    def _maybe_embed(self, session_id: str):
+        """Queue folding a newly added message into the session vector"""
+        if self._embedder_pool is not None:
+            self._embedder_pool.submit(self._embed_session, session_id)
+
+    def _embed_session(self, session_id: str):
+        """Background fold of a session's new messages (embedder thread)"""
+        try:
+            self._fold_pending(session_id)
+        except Exception as e:
+            self._count("embedding_failures")
+            print(f"⚠️ Could not update session vector: {e}")
+
+    def _fold_pending(self, session_id: str) -> SessionHistory:
+        """Embed every stored message newer than the session vector and fold it in:
+        vector = decay * vector + weight * embedding.
+
+        Folds are serialized per session and advance through the message ids,
+        so each message is embedded exactly once; the running sum is persisted,
+        so reloads never re-embed. Returns the session's resident state.
+        """
+        with self._embed_locks[hash(session_id) % len(self._embed_locks)]:
+            with self._session_lock(session_id):
+                state = self._session(session_id)
+                if state.vector_model != self.embedder_model:
+                    stored = self.store.get_session_vector(session_id)
+                    if stored is not None and stored[0] == self.embedder_model:
+                        state.vector, state.vector_through, state.vector_count = (np.frombuffer(stored[1], dtype=np.float32),
+                                                                                  stored[2], stored[3])
+                    else:  # new session, or embedded with another model
+                        state.vector, state.vector_through, state.vector_count = None, 0, 0
+                    state.vector_model = self.embedder_model
+                    state.vector_history.clear()
+                    state.vector_history.append((state.vector_through, state.vector))
+                vector, through, count = state.vector, state.vector_through, state.vector_count
+
+            while True:
+                rows = self.store.messages_between(session_id, through, sys.maxsize, EMBED_BATCH)
+                if not rows:
+                    return state
+                messages = [Message(*row) for row in rows]
+                with tracer.span("memory.embed_messages", messages=len(messages)):
+                    texts = [msg.message for msg in messages if msg.message.strip()]
+                    vectors = iter(np.asarray(self.message_embedder(texts), dtype=np.float32) if texts else ())
+                    embedded = [next(vectors) if msg.message.strip() else None for msg in messages]
+                checkpoints = []
+                for msg, embedding in zip(messages, embedded):
+                    if embedding is None:
+                        vector = None if vector is None else vector * SESSION_VECTOR_DECAY
+                    else:
+                        weight = ASSISTANT_VECTOR_WEIGHT if msg.role == "assistant" else 1.0
+                        embedding = embedding * (weight / max(float(np.linalg.norm(embedding)), 1e-12))
+                        vector = embedding if vector is None else SESSION_VECTOR_DECAY * vector + embedding
+                    checkpoints.append((msg.id, vector))
+                through, count = messages[-1].id, count + len(messages)
+
+                with self._session_lock(session_id):
+                    with self._index_lock:
+                        self.metrics["message_embeddings"] += sum(embedding is not None for embedding in embedded)
+                    resident = self._resident(session_id)
+                    if resident is None and not self.store.session_info(session_id)[0]:
+                        return state  # cleared meanwhile
+                    if resident is not None:
+                        if resident is not state:  # reloaded meanwhile; this fold is still the newest
+                            state = resident
+                            state.vector_model = self.embedder_model
+                            state.vector_history.clear()
+                        state.vector, state.vector_through, state.vector_count = vector, through, count
+                        state.vector_history.extend(checkpoints)
+                    if vector is not None:
+                        self.store.save_session_vector(session_id, self.embedder_model,
+                                                       vector.astype(np.float32).tobytes(), through, count)
+
+    def get_token_count(self, session_id: str) -> int:
+        """Prompt tokens of the formatted history (memoized per version)"""
+        with self._session_lock(session_id):
+            state = self._session(session_id)
+            if not state.rendered:
+                self._count("history_renders")
+            return state.token_count()
+
+    def get_history_version(self, session_id: str):
+        """Changes whenever the session's history or summary changes"""
+        with self._session_lock(session_id):
+            return self._session(session_id).version
+
     def clear_history(self, session_id: str):
         """Clear conversation history for a session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
-            self._save_memory()
+        with self._session_lock(session_id):
+            self.store.delete_session(session_id)
+            with self._index_lock:
+                self.conversations.pop(session_id, None)
+
+    # --- Rolling summary ---
+
+    def _maybe_summarize(self, session_id: str, state: SessionHistory):
+        """Queue a background summary update once enough messages left the window"""
+        if self.summarizer is None or state.pending_summary < SUMMARY_BATCH:
+            return
+        with self._index_lock:
+            if session_id in self._summarizing:
+                return
+            self._summarizing.add(session_id)
+        self.summarizer.submit(self._summarize_session, session_id)
+
+    def _summarize_session(self, session_id: str):
+        """Fold older, unsummarized messages into the session summary (summarizer thread)"""
+        through_id = None
+        try:
+            with self._session_lock(session_id):
+                state = self._resident(session_id)
+                if state is None or not state.messages:
+                    return
+                summary, through_id, summarized_count = state.summary, state.summary_through, state.summarized_count
+                window_start = state.messages[0].id
+
+            rows = self.store.messages_between(session_id, through_id, window_start, SUMMARY_MAX_MESSAGES)
+            if not rows:
+                return
+            new_summary = self.summarizer.summarize(summary, [Message(*row) for row in rows])
+            new_through, new_count = rows[-1][0], summarized_count + len(rows)
+            self.store.save_summary(session_id, new_summary, new_through, new_count)
+            self._count("summaries")
+
+            with self._session_lock(session_id):
+                state = self._resident(session_id)
+                if state is not None and state.summary_through == through_id:
+                    if state.set_summary(new_summary, new_through, new_count):
+                        self._count("history_invalidations")
+        except Exception as e:
+            self._count("summary_failures")
+            print(f"⚠️ Could not update conversation summary: {e}")
+        finally:
+            with self._index_lock:
+                self._summarizing.discard(session_id)
+
+        # More than one batch may have piled up (e.g. right after a migration)
+        with self._session_lock(session_id):
+            state = self._resident(session_id)
+            if state is not None and state.summary_through != through_id:
+                self._maybe_summarize(session_id, state)
+
+    # --- Eviction ---
+
+    def compact(self) -> int:
+        """Evict idle sessions from RAM and delete expired sessions from the store"""
+        cutoff = time.time() - self.session_ttl
+
+        with self._index_lock:
+            # LRU order means idle sessions sit at the front
+            idle = []
+            for session_id, state in self.conversations.items():
+                if state.last_access >= cutoff:
+                    break
+                idle.append(session_id)
+            for session_id in idle:
+                del self.conversations[session_id]
+            self.metrics["evictions_ttl"] += len(idle)
+
+        removed = self.store.expire_sessions(cutoff)
+        with self._index_lock:
+            self.metrics["compacted_sessions"] += removed
+        return removed
+
+    def start_compaction(self):
+        """Run compact() every compaction_interval seconds in a daemon thread"""
+        if self._compactor is not None:
+            return
+        self._compactor = threading.Thread(target=self._compaction_loop, name="empathia-memory-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self):
+        self._stop_compaction.set()
+
+    def _compaction_loop(self):
+        while not self._stop_compaction.wait(self.compaction_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"⚠️ Conversation memory compaction failed: {e}")
+
+    def stats(self) -> Dict:
+        """Eviction counters and resident footprint"""
+        with self._index_lock:
+            states = list(self.conversations.values())
+            metrics = dict(self.metrics)
+        return {
+            "resident_sessions": len(states),
+            "resident_messages": sum(len(state.messages) for state in states),
+            "resident_bytes": sum(state.size_bytes() for state in states),
+            **metrics,
+        }
 
 # Global memory instance
-conversation_memory = ConversationMemory()
\ No newline at end of file
+conversation_memory = ConversationMemory(summarizer=HistorySummarizer())
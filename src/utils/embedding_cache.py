@@ -0,0 +1,182 @@
+# src/utils/embedding_cache.py
+from collections import OrderedDict
+from typing import List
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_CACHE_FILE = os.path.join(PROJECT_ROOT, "data", "outputs", "embedding_cache.sqlite3")
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMPATHIA_EMBEDDING_CACHE_SIZE", 2048))  # query vectors held in RAM
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMPATHIA_EMBEDDING_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+# Set to an empty string to keep the cache in memory only
+EMBEDDING_CACHE_FILE = os.getenv("EMPATHIA_EMBEDDING_CACHE_FILE", DEFAULT_CACHE_FILE)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lowercased, whitespace collapsed.
+
+    all-MiniLM-L6-v2 uses an uncased tokenizer that ignores whitespace runs,
+    so this never changes the vector the model would return.
+    """
+    return " ".join(text.lower().split())
+
+
+class _DiskCache:
+    """Query vectors persisted in SQLite so restarts start warm"""
+
+    def __init__(self, path: str, namespace: str, ttl_seconds: float):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.namespace = namespace  # embedding model, so switching models never serves stale vectors
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                namespace TEXT NOT NULL,
+                query TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (namespace, query)
+            )
+            """
+        )
+        self.conn.execute("DELETE FROM query_embeddings WHERE created_at < ?", (time.time() - ttl_seconds,))
+
+    def get(self, query: str):
+        """(vector, created_at) or None if missing or expired"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE namespace = ? AND query = ?",
+                (self.namespace, query)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32), row[1]
+
+    def put(self, query: str, vector: np.ndarray, created_at: float):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (namespace, query, vector, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, query, vector.tobytes(), created_at)
+            )
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM query_embeddings WHERE namespace = ?", (self.namespace,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embedding function with an LRU + TTL cache of query vectors.
+
+    Drop-in wrapper for the embeddings handed to Chroma: a repeated query
+    (after normalization) is answered from the cache without running the
+    transformer. Document embedding is passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings,
+                 max_size: int = EMBEDDING_CACHE_SIZE,
+                 ttl_seconds: float = EMBEDDING_CACHE_TTL_SECONDS,
+                 persist_path: str = EMBEDDING_CACHE_FILE):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # normalized query -> (float32 vector, created_at), LRU order
+        self.lock = threading.Lock()
+
+        self.disk = None
+        if persist_path:
+            namespace = getattr(embeddings, "model_name", type(embeddings).__name__)
+            try:
+                self.disk = _DiskCache(persist_path, namespace, ttl_seconds)
+            except sqlite3.Error as e:
+                print(f"⚠️ Embedding cache not persisted ({persist_path}): {e}")
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl_seconds:
+                del self.entries[key]
+                self.evictions += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _admit(self, key: str, vector: np.ndarray, created_at: float):
+        with self.lock:
+            self.entries[key] = (vector, created_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector.tolist()
+
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                with self.lock:
+                    self.disk_hits += 1
+                self._admit(key, *stored)
+                return stored[0].tolist()
+
+        # Concurrent misses on the same key may both compute; the result is identical
+        vector = np.asarray(self.embeddings.embed_query(key), dtype=np.float32)
+        created_at = time.time()
+        with self.lock:
+            self.misses += 1
+        self._admit(key, vector, created_at)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, vector, created_at)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not persist query embedding: {e}")
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "cached_queries": len(self.entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "persisted": self.disk is not None,
+            }
@@ -0,0 +1,58 @@
+# src/utils/history_compactor.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
+from dotenv import load_dotenv
+from src.utils.tracing import tracer
+
+load_dotenv()
+
+
+class HistorySummarizer:
+    """Folds messages that left the recent-history window into a rolling summary"""
+
+    def __init__(self, model: str = "gpt-3.5-turbo", max_summary_tokens: int = 150, workers: int = 2):
+        self.model = model
+        self.max_summary_tokens = max_summary_tokens
+        self.client = None  # created on first use, so importing this never needs an API key
+        # Summaries are refreshed in the background, never on a user's turn
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="empathia-summarizer")
+
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+    def summarize(self, previous_summary: str, messages) -> str:
+        """Return `previous_summary` updated with `messages` (oldest first)"""
+        if self.client is None:
+            self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+
+        transcript = "\n".join(
+            f"{'User' if msg.role == 'user' else 'Assistant'}: {msg.message}" for msg in messages
+        )
+        prompt = f"""
+        You maintain a running summary of a pet-loss support conversation.
+
+        CURRENT SUMMARY:
+        {previous_summary or "(none yet)"}
+
+        NEW MESSAGES:
+        {transcript}
+
+        Rewrite the summary so it also covers the new messages.
+        - Keep the pet's name, what happened, the user's main feelings and concerns
+        - Keep anything the user shared about their life or support network
+        - Third person, plain sentences, under 100 words
+
+        Updated summary:
+        """
+
+        with tracer.span("memory.summarize", messages=len(messages)):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.max_summary_tokens,
+                temperature=0.2,
+                timeout=30
+            )
+
+        return response.choices[0].message.content.strip()
@@ -0,0 +1,133 @@
+# src/utils/prewarm.py
+import asyncio
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from src.core.psychology_rag import PsychologyBookExpert
+from src.utils.tracing import tracer
+
+load_dotenv()
+
+PREWARM_ENABLED = os.getenv("EMPATHIA_PREWARM", "1") != "0"
+
+# Readiness states
+COLD = "cold"          # nothing loaded, prewarm not started
+WARMING = "warming"    # loading in the background
+READY = "ready"        # model, vector store and LLM client loaded and exercised once
+FAILED = "failed"      # loading raised; the expert is unavailable in this process
+
+
+class ExpertPrewarmer:
+    """Loads the psychology expert in a background thread at process start.
+
+    Covers the embedding model, the vector store and the LLM client, then
+    runs one embedding + vector search so the first real turn finds
+    everything hot. The orchestrator reads `state` to decide whether to
+    consult the expert on a turn, or how long to wait for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._waiters = []  # (loop, future) of coroutines awaiting warm-up, resolved from the prewarm thread
+        self._thread = None
+        self.state = COLD
+        self.error = None
+        self.timings_ms = {}
+
+    def start(self) -> bool:
+        """Start warming up (once per process). Returns True if this call started it."""
+        with self._lock:
+            if self.state != COLD:
+                return False
+            self.state = WARMING
+            self._thread = threading.Thread(target=self._run, name="empathia-prewarm", daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            with tracer.span("prewarm.expert_init"):
+                expert = PsychologyBookExpert()  # embedding model, vector store, LLM client
+            self.timings_ms["expert_init"] = (time.perf_counter() - start) * 1000
+
+            warmup_start = time.perf_counter()
+            with tracer.span("prewarm.warmup_inference"):
+                # Straight to the model: warm-up text shouldn't land in the query cache
+                model = getattr(expert.embeddings, "embeddings", expert.embeddings)
+                vector = model.embed_query("How do I cope with the loss of my dog?")
+                expert.vector_store.similarity_search_by_vector(vector, k=1)
+            self.timings_ms["warmup_inference"] = (time.perf_counter() - warmup_start) * 1000
+
+            if expert.llm is None:
+                raise RuntimeError("LLM client failed to initialize")
+            self.state = READY
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = FAILED
+            print(f"❌ Psychology expert prewarm failed: {self.error}")
+        finally:
+            self.timings_ms["total"] = (time.perf_counter() - start) * 1000
+            tracer.record("prewarm.total", self.timings_ms["total"], state=self.state)
+            self._ready.set()
+            self._wake_waiters()
+        if self.state == READY:
+            print(f"✅ Psychology expert warm in {self.timings_ms['total'] / 1000:.1f}s")
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == READY
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until warm-up finishes (or `timeout`); True if the expert is ready"""
+        self._ready.wait(timeout)
+        return self.is_ready
+
+    async def await_ready(self, timeout: float = None) -> bool:
+        """Async wait_ready for the turn engine loop.
+
+        Waits on a future the prewarm thread resolves, so a waiting turn
+        holds no executor thread, and cancelling it frees everything.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._ready.is_set():
+                return self.is_ready
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter[1]
+        except TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        return self.is_ready
+
+    def _wake_waiters(self):
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # that loop has closed
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            **{f"{name}_ms": round(value, 1) for name, value in self.timings_ms.items()},
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+expert_prewarmer = ExpertPrewarmer()
@@ -0,0 +1,330 @@
+# src/utils/session_store.py
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        role TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)",
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+    # Per-session bookkeeping, kept up to date by the trigger below so every
+    # writer (any thread, any process) maintains it
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        last_active REAL NOT NULL,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        last_id INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions (last_active)",
+    # Rolling summary of each session's older messages (everything up to through_id)
+    """
+    CREATE TABLE IF NOT EXISTS summaries (
+        session_id TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        through_id INTEGER NOT NULL,
+        summarized_count INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    # Running, decay-weighted embedding of each session's messages (everything up to through_id)
+    """
+    CREATE TABLE IF NOT EXISTS session_vectors (
+        session_id TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        through_id INTEGER NOT NULL,
+        folded_count INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_messages_session_stats AFTER INSERT ON messages
+    BEGIN
+        INSERT INTO sessions (session_id, last_active, message_count, last_id)
+        VALUES (NEW.session_id, NEW.created_at, 1, NEW.id)
+        ON CONFLICT (session_id) DO UPDATE SET
+            last_active = max(last_active, excluded.last_active),
+            message_count = message_count + 1,
+            last_id = excluded.last_id;
+    END
+    """,
+]
+
+
+class SQLiteSessionStore:
+    """Append-only conversation log in SQLite (WAL mode).
+
+    Each message is one INSERT, and reading a session is an index range scan
+    on (session_id, id), so neither cost grows with the number of sessions.
+
+    Safe to share between threads (each operation borrows a connection from a
+    small pool) and between processes (SQLite's WAL locking; writers wait up
+    to `busy_timeout` seconds for each other instead of failing).
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 8, busy_timeout: float = 10.0):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._pool = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._created = 0
+
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,  # pooled connections move between threads, never shared at once
+            isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints, no fsync per append
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection (opens a new one while under pool_size)"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            conn = self._connect() if can_create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _create_schema(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                # Stores created before the sessions table existed: backfill it once
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'sessions_backfilled'").fetchone() is None:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO sessions (session_id, last_active, message_count, last_id) "
+                        "SELECT session_id, MAX(created_at), COUNT(*), MAX(id) FROM messages GROUP BY session_id"
+                    )
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('sessions_backfilled', '1')")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def append(self, session_id: str, role: str, message: str) -> Tuple[int, int]:
+        """Append one message (O(1), no rewrite of other sessions).
+
+        Returns the session's (message_count, last_id) right after the insert,
+        which lets callers detect appends made by other processes.
+        """
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO messages (session_id, role, message, created_at) VALUES (?, ?, ?, ?)",
+                    (session_id, role, message, time.time())
+                )
+                info = conn.execute(
+                    "SELECT message_count, last_id FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return info
+
+    def session_info(self, session_id: str) -> Tuple[int, int]:
+        """(message_count, last_id) of a session, (0, 0) if it has no messages"""
+        with self._connection() as conn:
+            info = conn.execute(
+                "SELECT message_count, last_id FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return info or (0, 0)
+
+    def recent(self, session_id: str, limit: int) -> List[Tuple[int, str, str]]:
+        """The `limit` most recent (id, role, message) rows of a session, oldest first"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, role, message FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        return rows[::-1]
+
+    def messages_between(self, session_id: str, after_id: int, before_id: int, limit: int) -> List[Tuple[int, str, str]]:
+        """Up to `limit` (id, role, message) rows with after_id < id < before_id, oldest first"""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT id, role, message FROM messages WHERE session_id = ? AND id > ? AND id < ? ORDER BY id LIMIT ?",
+                (session_id, after_id, before_id, limit)
+            ).fetchall()
+
+    def get_summary(self, session_id: str) -> Tuple[str, int, int]:
+        """(summary, through_id, summarized_count) of a session, ("", 0, 0) if none yet"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT summary, through_id, summarized_count FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row or ("", 0, 0)
+
+    def save_summary(self, session_id: str, summary: str, through_id: int, summarized_count: int) -> bool:
+        """Store a newer summary. Returns False if one covering more messages already exists."""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO summaries (session_id, summary, through_id, summarized_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET summary = excluded.summary, through_id = excluded.through_id, "
+                "summarized_count = excluded.summarized_count, updated_at = excluded.updated_at "
+                "WHERE excluded.through_id > summaries.through_id",
+                (session_id, summary, through_id, summarized_count, time.time())
+            )
+            return cursor.rowcount > 0
+
+    def get_session_vector(self, session_id: str) -> Optional[Tuple[str, bytes, int, int]]:
+        """(model, float32 vector bytes, through_id, folded_count) of a session, None if none yet"""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT model, vector, through_id, folded_count FROM session_vectors WHERE session_id = ?", (session_id,)
+            ).fetchone()
+
+    def save_session_vector(self, session_id: str, model: str, vector: bytes, through_id: int, folded_count: int) -> bool:
+        """Store a newer session vector. Returns False if one covering more messages (same model) already exists."""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO session_vectors (session_id, model, vector, through_id, folded_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET model = excluded.model, vector = excluded.vector, "
+                "through_id = excluded.through_id, folded_count = excluded.folded_count, updated_at = excluded.updated_at "
+                "WHERE excluded.through_id > session_vectors.through_id OR excluded.model != session_vectors.model",
+                (session_id, model, vector, through_id, folded_count, time.time())
+            )
+            return cursor.rowcount > 0
+
+    def count(self, session_id: str = None) -> int:
+        """Number of stored messages, for one session or overall"""
+        with self._connection() as conn:
+            if session_id is None:
+                return conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def delete_session(self, session_id: str):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM session_vectors WHERE session_id = ?", (session_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def expire_sessions(self, idle_before: float) -> int:
+        """Delete every session whose last message is older than `idle_before` (epoch seconds)"""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = [row[0] for row in conn.execute(
+                    "SELECT session_id FROM sessions WHERE last_active < ?", (idle_before,)
+                )]
+                conn.executemany("DELETE FROM messages WHERE session_id = ?", [(sid,) for sid in expired])
+                conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(sid,) for sid in expired])
+                conn.executemany("DELETE FROM summaries WHERE session_id = ?", [(sid,) for sid in expired])
+                conn.executemany("DELETE FROM session_vectors WHERE session_id = ?", [(sid,) for sid in expired])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(expired)
+
+    @staticmethod
+    def _migrated(conn: sqlite3.Connection) -> bool:
+        return conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone() is not None
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """One-time import of the legacy conversation_memory.json file.
+
+        Returns the number of imported messages (0 if already migrated or
+        there is nothing to import). The JSON file itself is left untouched.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with self._connection() as conn:
+            if self._migrated(conn):
+                return 0
+
+        try:
+            with open(json_path, 'r') as f:
+                conversations = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read legacy conversation memory {json_path}: {e}")
+            conversations = {}
+
+        now = time.time()
+        rows = [
+            (session_id, msg.get("role", "user"), msg.get("message", ""), now)
+            for session_id, history in conversations.items()
+            for msg in history
+        ]
+
+        with self._connection() as conn:
+            # The marker check runs inside the write transaction so only one process imports
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._migrated(conn):
+                    conn.execute("ROLLBACK")
+                    return 0
+                conn.executemany(
+                    "INSERT INTO messages (session_id, role, message, created_at) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('migrated_json', ?)",
+                    (json.dumps({"path": json_path, "messages": len(rows), "at": now}),)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if rows:
+            print(f"✅ Migrated {len(rows)} messages from {json_path}")
+        return len(rows)
+
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._pool_lock:
+            self._created = 0
@@ -0,0 +1,175 @@
+# src/utils/tracing.py
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Attributes of the turn being traced (session id, trigger score, ...)
+_current_turn = contextvars.ContextVar("empathia_current_turn", default=None)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: O(1) record, bounded memory, ~5% percentile error"""
+
+    GROWTH = 1.1
+    MIN_MS = 0.05
+
+    def __init__(self, max_ms: float = 600_000):
+        self.bounds = []
+        bound = self.MIN_MS
+        while bound < max_ms:
+            self.bounds.append(bound)
+            bound *= self.GROWTH
+        self.bounds.append(max_ms)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket catches overflow
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, duration_ms: float):
+        index = bisect.bisect_left(self.bounds, duration_ms)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_ms += duration_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (q in 0..1)"""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    bound = self.bounds[index] if index < len(self.bounds) else self.max_ms
+                    return min(bound, self.max_ms)
+            return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50), 2),
+            "p95_ms": round(self.percentile(0.95), 2),
+            "p99_ms": round(self.percentile(0.99), 2),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSON-lines file (one span per line)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, span: dict):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Records timed spans for each stage of a conversational turn"""
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def current_turn(self):
+        """Attributes of the turn active in this context (or None)"""
+        return _current_turn.get()
+
+    @contextmanager
+    def turn(self, attributes: dict = None, **extra):
+        """Attach turn attributes to every span opened inside this block.
+
+        Pass an existing attributes dict to continue a turn that started in
+        another thread (e.g. from app.py onto the turn engine loop).
+        """
+        turn = attributes if attributes is not None else {"turn_id": uuid.uuid4().hex[:12]}
+        turn.update(extra)
+        token = _current_turn.set(turn)
+        try:
+            yield turn
+        finally:
+            _current_turn.reset(token)
+
+    def set_turn_attribute(self, key: str, value):
+        """Add an attribute (e.g. the trigger score) to the current turn"""
+        turn = _current_turn.get()
+        if turn is not None:
+            turn[key] = value
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block of work and record it under `name`"""
+        start_wall = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attributes
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if error:
+                attributes["error"] = error
+            self.record(name, duration_ms, start_time=start_wall, **attributes)
+
+    def record(self, name: str, duration_ms: float, start_time: float = None, **attributes):
+        """Record an already-measured span"""
+        self._histogram(name).record(duration_ms)
+
+        if self.exporter is not None:
+            span = {
+                "name": name,
+                "start_time": start_time if start_time is not None else time.time() - duration_ms / 1000,
+                "duration_ms": round(duration_ms, 3),
+                "attributes": {**(_current_turn.get() or {}), **attributes},
+            }
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                print(f"Error exporting span {name}: {e}")
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def summary(self) -> dict:
+        """p50/p95/p99 per span name"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+
+def _default_exporter():
+    """Export spans to a JSONL file when EMPATHIA_TRACE_FILE is set"""
+    path = os.getenv("EMPATHIA_TRACE_FILE")
+    return JsonlSpanExporter(path) if path else None
+
+
+# Global tracer instance
+tracer = Tracer(exporter=_default_exporter())
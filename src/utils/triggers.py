@@ -3,6 +3,19 @@ import re
 from typing import Tuple
 import numpy as np
 
+# 🔥 CRISIS INDICATORS (IMMEDIATE EXPERT HELP)
+CRISIS_PATTERNS = [
+    r'\b(suicide|self harm|end it all|can\'t go on|want to die|not want to live)\b',
+    r'\b(panic attack|anxiety attack|can\'t breathe|hyperventilat|chest pain)\b',
+    r'\b(emergency|crisis|help me|desperate|hopeless|overwhelmed)\b',
+    r'\b(can\'t function|can\'t get out of bed|can\'t stop crying)\b'
+]
+
+def is_crisis(user_input: str) -> bool:
+    """True if the input matches any crisis indicator"""
+    user_input_lower = user_input.lower()
+    return any(re.search(pattern, user_input_lower) for pattern in CRISIS_PATTERNS)
+
 def calculate_advice_priority(user_input: str, peer_response: str) -> float:
     """
     Calculate a priority score (0-1) for expert advice.
@@ -11,14 +24,6 @@ def calculate_advice_priority(user_input: str, peer_response: str) -> float:
     user_input_lower = user_input.lower()
     peer_response_lower = peer_response.lower()
     
-    # 🔥 CRISIS INDICATORS (IMMEDIATE EXPERT HELP)
-    crisis_keywords = [
-        r'\b(suicide|self harm|end it all|can\'t go on|want to die|not want to live)\b',
-        r'\b(panic attack|anxiety attack|can\'t breathe|hyperventilat|chest pain)\b',
-        r'\b(emergency|crisis|help me|desperate|hopeless|overwhelmed)\b',
-        r'\b(can\'t function|can\'t get out of bed|can\'t stop crying)\b'
-    ]
-    
     # 🔥 HIGH PRIORITY: Explicit requests & deep emotional needs
     high_need_triggers = [
         # Explicit help-seeking
@@ -74,9 +79,8 @@ def calculate_advice_priority(user_input: str, peer_response: str) -> float:
     ]
     
     # 🚨 CHECK FOR CRISIS FIRST (IMMEDIATE RESPONSE)
-    for pattern in crisis_keywords:
-        if re.search(pattern, user_input_lower):
-            return 0.95  # Highest priority - near certain
+    if is_crisis(user_input):
+        return 0.95  # Highest priority - near certain
     
     # 📊 CALCULATE SCORE BASED ON MULTIPLE FACTORS
     score = 0.0
@@ -0,0 +1,69 @@
+# src/utils/turn_engine.py
+import asyncio
+import concurrent.futures
+import threading
+
+
+class TurnEngine:
+    """One long-lived asyncio event loop per process.
+
+    Every conversational turn runs as coroutines on this loop, so concurrent
+    sessions share a single background thread instead of spawning new
+    threads for each stage of each turn.
+    """
+
+    def __init__(self, name: str = "empathia-turn-engine"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The engine's event loop (started on first use)"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+                    self._thread = threading.Thread(
+                        target=self._run_loop,
+                        args=(loop, ready),
+                        name=self.name,
+                        daemon=True
+                    )
+                    self._thread.start()
+                    ready.wait()
+                    self._loop = loop
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def in_engine_thread(self) -> bool:
+        """True when called from inside the engine's own loop thread"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the engine loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Sync shim: run a coroutine on the engine loop and wait for its result"""
+        if self.in_engine_thread():
+            coro.close()
+            raise RuntimeError("TurnEngine.run() would deadlock when called from the engine loop itself")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+
+# Global engine instance (one loop per process)
+turn_engine = TurnEngine()
@@ -2,6 +2,12 @@
 import streamlit as st
 import time
 from .state import clear_state
+from .tracing import tracer
+from .conversation_memory import conversation_memory
+from src.core.psychology_rag import PsychologyBookExpert
+from src.core.embedding_service import SidecarEmbeddings
+from src.core.kb_snapshot import HotSwapVectorIndex
+from .prewarm import expert_prewarmer
 
 def show_conversation():
     """Display chat history."""
@@ -28,6 +34,38 @@ def show_debug_panel():
         if st.session_state.expert_loading:
             st.write(f"Expert loading for: {int(time.time() - st.session_state.expert_start_time)} seconds")
 
+        # Per-stage latency percentiles for this process
+        st.subheader("⏱️ Turn latency (ms)")
+        latency = tracer.summary()
+        if latency:
+            st.table([{"span": name, **stats} for name, stats in latency.items()])
+        else:
+            st.caption("No turns traced yet.")
+
+        st.subheader("🧠 Conversation memory")
+        st.write(conversation_memory.stats())
+
+        st.subheader("🔥 Expert readiness")
+        st.write(expert_prewarmer.stats())
+
+        expert = PsychologyBookExpert._instance
+        if expert is not None and expert._initialized:
+            st.subheader("🔎 Query embedding cache")
+            st.write(expert.embeddings.stats())
+            st.subheader("💾 Expert answer cache")
+            st.write(expert.answer_cache.stats())
+            st.subheader("🚦 Expert retrieval gate")
+            st.write(expert.gate.stats())
+            if isinstance(expert.embeddings.embeddings, SidecarEmbeddings):
+                st.subheader("🧮 Embedding sidecar")
+                try:
+                    st.write(expert.embeddings.embeddings.stats())
+                except (OSError, RuntimeError) as e:
+                    st.write(f"unavailable: {e}")
+            if isinstance(expert.vector_store, HotSwapVectorIndex):
+                st.subheader("📦 Knowledge-base snapshot")
+                st.write(expert.vector_store.stats())
+
 
 # --- Stream message function ---
 def stream_message(message: str, speed: float = 0.01):
@@ -62,3 +100,31 @@ def stream_message(message: str, speed: float = 0.01):
 
 
 
+
+# --- Stream live sections ---
+SECTION_PREFIXES = {
+    "peer": "",
+    "expert": "\n\n🧠 ",
+    "followup": "\n\n",
+}
+
+def stream_sections(deltas) -> str:
+    """Render (section, delta) pairs into one chat bubble as the tokens arrive"""
+    message_placeholder = st.empty()
+    sections = {}
+    start = time.perf_counter()
+
+    def compose():
+        return "".join(SECTION_PREFIXES.get(name, "\n\n") + text for name, text in sections.items())
+
+    for section, delta in deltas:
+        if not sections:
+            tracer.record("ui.first_token", (time.perf_counter() - start) * 1000)
+        sections[section] = sections.get(section, "") + delta
+        message_placeholder.markdown(compose() + "▌")
+
+    # Final display without cursor
+    full_response = compose()
+    message_placeholder.markdown(full_response)
+
+    return full_response
@@ -0,0 +1,16 @@
+from src.benchmarks.cleaner_throughput import EDGE_CASES, LegacyAcademicPDFCleaner, check_golden, make_books
+from src.data_processing.build_knowledge_base import AcademicPDFCleaner
+
+
+def test_compiled_cleaner_matches_the_reference():
+    assert check_golden(AcademicPDFCleaner(), LegacyAcademicPDFCleaner(), make_books(3, 30, 20)) == 0
+
+
+def test_document_headers_and_footers_are_removed():
+    cleaner = AcademicPDFCleaner()
+    book = make_books(1, 30, 20)[0]
+    cleaned = cleaner.clean_pages(book)
+    assert len(cleaned) == len(book)
+    assert not any("Journal of Companion Animal Bereavement" in page for page in cleaned)
+    assert [cleaner.clean_text(page) for page in EDGE_CASES] == \
+        [LegacyAcademicPDFCleaner().clean_text(page) for page in EDGE_CASES]
@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.core.context_packing import mmr, pack_sentences, sentences
+from src.utils.tokens import count_tokens
+
+
+def unit(*rows):
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_mmr_skips_near_duplicates():
+    vectors = unit([1, 0, 0], [1, 0.01, 0], [0, 1, 0])
+    scores = [0.9, 0.89, 0.6]
+    assert mmr(scores, vectors, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_mmr_relevance_only_is_a_plain_ranking():
+    vectors = unit([1, 0, 0], [1, 0.01, 0], [0, 1, 0])
+    assert mmr([0.6, 0.9, 0.8], vectors, k=3, lambda_mult=1.0) == [1, 2, 0]
+
+
+def test_mmr_edge_cases():
+    vectors = unit([1, 0], [0, 1])
+    assert mmr([], np.zeros((0, 2)), k=3) == []
+    assert mmr([0.5, 0.9], vectors, k=5) == [1, 0]
+    assert mmr([0.5, 0.9], vectors, k=1, first=0) == [0]
+
+
+def test_sentences_drop_chunk_boundary_fragments():
+    text = "of the loss. Grief comes in waves. Some days are easier! And then it"
+    assert sentences(text) == ["Grief comes in waves.", "Some days are easier!"]
+    assert sentences("just a fragment") == ["just a fragment"]
+    assert sentences('"Is it normal?" she asked. (It is.) Yes.') == ['"Is it normal?"', "she asked.", "(It is.)", "Yes."]
+
+
+def test_pack_sentences_keeps_whole_sentences_within_budget():
+    texts = ["Grief comes in waves. Some days are easier than others. Talking about it helps.",
+             "Pets are family. Losing one is a real loss."]
+    packed = pack_sentences(texts, budget=16)
+
+    assert count_tokens(packed) <= 16
+    lines = packed.split("\n")
+    assert lines[0].startswith("Grief comes in waves.")
+    for line, text in zip(lines, texts):
+        assert all(sentence in text for sentence in sentences(line))
+
+
+def test_pack_sentences_falls_back_to_truncating_the_best_chunk():
+    text = "This single sentence is far too long to fit in a budget of only a handful of tokens."
+    packed = pack_sentences([text], budget=5)
+    assert packed and text.startswith(packed)
+    assert count_tokens(packed) <= 5
+    assert pack_sentences([], budget=5) == ""
@@ -0,0 +1,147 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from src.utils.conversation_memory import ConversationMemory
+
+
+class InlineSummarizer:
+    """Summarizes on the calling thread, so tests see the result immediately"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+    def summarize(self, previous_summary, messages):
+        self.calls.append([msg.message for msg in messages])
+        return " ".join(filter(None, [previous_summary] + [msg.message for msg in messages]))
+
+
+def embed(texts):
+    """Deterministic stand-in for an embedding model"""
+    return [np.random.default_rng(zlib.crc32(text.encode())).normal(size=8) for text in texts]
+
+
+@pytest.fixture
+def make_memory(tmp_path):
+    memories = []
+
+    def make(**kwargs):
+        kwargs.setdefault("db_path", str(tmp_path / "memory.sqlite3"))
+        memory = ConversationMemory(legacy_memory_file=None, compaction_interval=0, **kwargs)
+        memories.append(memory)
+        return memory
+
+    yield make
+    for memory in memories:
+        memory.store.close()
+
+
+def test_history_window_and_format(make_memory):
+    memory = make_memory(max_history_length=2)
+    assert memory.get_formatted_history("a") == "No previous conversation."
+    for i in range(3):
+        memory.add_message("a", "user", f"question {i}")
+
+    assert memory.get_history("a") == [{"role": "user", "message": "question 1"},
+                                       {"role": "user", "message": "question 2"}]
+    assert memory.get_formatted_history("a") == "User: question 1\nUser: question 2"
+
+
+def test_lru_eviction_reloads_from_the_store(make_memory):
+    memory = make_memory(max_resident_sessions=2)
+    for session_id in ("a", "b", "c"):
+        memory.add_message(session_id, "user", f"hello from {session_id}")
+        memory.get_history(session_id)
+
+    assert list(memory.conversations) == ["b", "c"]
+    assert memory.stats()["evictions_lru"] == 1
+    assert memory.get_history("a") == [{"role": "user", "message": "hello from a"}]
+    assert list(memory.conversations) == ["c", "a"]
+
+
+def test_compaction_evicts_idle_and_expires_stored_sessions(make_memory):
+    memory = make_memory(session_ttl=3600)
+    memory.add_message("a", "user", "hello")
+    memory.get_history("a")
+    assert memory.compact() == 0
+    assert "a" in memory.conversations
+
+    memory.session_ttl = -1  # everything is idle now
+    assert memory.compact() == 1
+    assert not memory.conversations
+    assert memory.store.count("a") == 0
+    assert memory.stats()["evictions_ttl"] == 1
+
+
+def test_sees_messages_from_other_processes(make_memory):
+    memory = make_memory(revalidate_seconds=0)
+    other = make_memory()
+    memory.add_message("a", "user", "first")
+    assert memory.get_formatted_history("a") == "User: first"
+
+    other.add_message("a", "assistant", "reply")
+    assert memory.get_formatted_history("a") == "User: first\nAssistant: reply"
+
+
+def test_older_messages_are_folded_into_the_summary(make_memory):
+    summarizer = InlineSummarizer()
+    memory = make_memory(max_history_length=2, summarizer=summarizer)
+    memory.get_history("a")  # resident sessions queue summaries as messages arrive
+    for i in range(6):
+        memory.add_message("a", "user", f"m{i}")
+
+    assert summarizer.calls == [["m0", "m1", "m2", "m3"]]
+    assert memory.get_formatted_history("a") == "Summary of earlier conversation: m0 m1 m2 m3\nUser: m4\nUser: m5"
+    assert memory.store.get_summary("a")[1:] == (4, 4)
+
+
+def test_history_respects_the_token_budget(make_memory):
+    memory = make_memory(history_token_budget=20)
+    memory.add_message("a", "user", "short")
+    memory.add_message("a", "assistant", "word " * 200)
+
+    history = memory.get_formatted_history("a")
+    assert history.strip().startswith("word") and "short" not in history
+    assert memory.get_token_count("a") <= 20
+
+
+def test_session_vector_can_leave_out_the_current_turn(make_memory):
+    memory = make_memory()
+    memory.set_message_embedder(embed, "test-model")
+    memory.add_message("a", "user", "my cat died")
+    memory.add_message("a", "assistant", "I'm so sorry")
+    before = memory.get_session_vector("a")
+
+    memory.add_message("a", "user", "I can't sleep")
+    after = memory.get_session_vector("a")
+    assert not np.allclose(before, after)
+    assert np.allclose(memory.get_session_vector("a", exclude="I can't sleep"), before)
+    assert np.isclose(np.linalg.norm(after), 1.0)
+
+    memory.add_message("a", "assistant", "That's hard")
+    assert np.allclose(memory.get_session_vector("a", exclude="I can't sleep"), before)
+
+
+def test_session_vector_survives_a_restart(make_memory):
+    memory = make_memory()
+    memory.set_message_embedder(embed, "test-model")
+    memory.add_message("a", "user", "hello")
+    vector = memory.get_session_vector("a")
+
+    calls = []
+    restarted = make_memory()
+    restarted.set_message_embedder(lambda texts: calls.append(texts) or embed(texts), "test-model")
+    assert np.allclose(restarted.get_session_vector("a"), vector)
+    assert calls == []  # loaded from the store, not re-embedded
+
+
+def test_clear_history(make_memory):
+    memory = make_memory()
+    memory.add_message("a", "user", "hello")
+    memory.clear_history("a")
+    assert memory.get_history("a") == []
+    assert memory.store.count("a") == 0
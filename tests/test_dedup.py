@@ -0,0 +1,35 @@
+from src.data_processing.dedup import MinHasher, NearDuplicateIndex
+
+TEXT = ("Grief after the loss of a companion animal is often disenfranchised: friends and colleagues may not "
+        "recognise it as a real bereavement, so owners grieve alone and feel ashamed of how much it hurts. "
+        "Acknowledging the bond, marking the loss with a ritual and talking to others who understand all help.")
+
+
+def test_signatures_are_stable_across_instances():
+    assert (MinHasher().signature(TEXT) == MinHasher().signature(TEXT)).all()
+    assert MinHasher().signatures([]).shape == (0, 128)
+
+
+def test_near_duplicates_are_dropped_across_documents():
+    hasher = MinHasher()
+    index = NearDuplicateIndex(threshold=0.8)
+    near_copy = TEXT.replace("all help.", "all helps.")  # one shingle differs
+    unrelated = "Cats often hide when they are unwell, so changes in appetite deserve a visit to the vet."
+
+    assert index.deduplicate("a.pdf", hasher.signatures([TEXT, unrelated])) == ([], [])
+    assert index.deduplicate("b.pdf", hasher.signatures([near_copy, "Something else entirely."])) == ([0], ["a.pdf"])
+    assert len(index) == 3
+
+
+def test_duplicates_within_one_document():
+    hasher = MinHasher()
+    index = NearDuplicateIndex()
+    assert index.deduplicate("a.pdf", hasher.signatures([TEXT, TEXT])) == ([1], [])
+
+
+def test_dissimilar_texts_are_kept():
+    hasher = MinHasher()
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(hasher.signature(TEXT), "a.pdf")
+    half = " ".join(TEXT.split()[:25]) + " and then something completely different happens to the rest of it"
+    assert index.find(hasher.signature(half)) is None
@@ -0,0 +1,110 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src.core.kb_snapshot import (
+    CURRENT_FILE, HotSwapVectorIndex, SnapshotVectorIndex, SnapshotWriter, current_snapshot, publish_snapshot,
+    read_header, verify_snapshot
+)
+
+
+def write_snapshot(snapshot_dir, texts, dtype="float16", seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(len(texts), 16)).astype(np.float32)
+    writer = SnapshotWriter(str(snapshot_dir), dtype=dtype, embedding_model="test-model")
+    half = len(texts) // 2
+    for start, end in ((0, half), (half, len(texts))):  # more than one batch
+        if start == end:
+            continue
+        writer.add_batch([f"id-{i}" for i in range(start, end)], texts[start:end],
+                         [{"row": i} for i in range(start, end)], vectors[start:end])
+    return writer.close(), vectors
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_round_trip(tmp_path, dtype):
+    texts = [f"chunk {i} about grief" for i in range(10)] + ["ünïcödé chunk", ""]
+    path, vectors = write_snapshot(tmp_path, texts, dtype)
+
+    header = verify_snapshot(path)
+    assert (header["count"], header["dim"], header["dtype"]) == (12, 16, dtype)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".kbsnap-")]  # spool removed
+
+    index = SnapshotVectorIndex(path)
+    assert len(index) == 12 and index.version == header["version"]
+    for row in (0, 5, 10, 11):
+        document, score = index.similarity_search_by_vector_with_score(vectors[row], k=1)[0]
+        assert (document.page_content, document.metadata, document.id) == (texts[row], {"row": row}, f"id-{row}")
+        assert score == pytest.approx(1.0, abs=0.02)
+    assert "id-3" in index.id_set
+
+
+def test_empty_snapshot(tmp_path):
+    path = SnapshotWriter(str(tmp_path)).close()
+    index = SnapshotVectorIndex(path)
+    assert len(index) == 0
+    assert index.top_k(np.ones(4), k=3)[0].size == 0
+
+
+def test_verify_rejects_corruption_and_truncation(tmp_path):
+    path, _ = write_snapshot(tmp_path, ["a", "b", "c"])
+    data = bytearray(open(path, "rb").read())
+
+    corrupt = tmp_path / "corrupt.kbsnap"
+    data[100] ^= 0xFF
+    corrupt.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="checksum"):
+        verify_snapshot(str(corrupt))
+
+    truncated = tmp_path / "truncated.kbsnap"
+    truncated.write_bytes(open(path, "rb").read()[:-5])
+    with pytest.raises(ValueError):
+        read_header(str(truncated))
+
+
+def test_rejects_mismatched_dims(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    writer.add_batch(["a"], ["a"], [{}], np.ones((1, 4)))
+    with pytest.raises(ValueError, match="dim"):
+        writer.add_batch(["b"], ["b"], [{}], np.ones((1, 8)))
+    writer.close()
+
+
+def test_publish_points_current_and_prunes_oldest(tmp_path):
+    assert current_snapshot(str(tmp_path)) is None
+    paths = [write_snapshot(tmp_path, [f"version {i}"], seed=i)[0] for i in range(4)]
+    for path in paths:
+        publish_snapshot(path, keep=2)
+
+    assert current_snapshot(str(tmp_path)) == paths[-1]
+    assert sorted(name for name in os.listdir(tmp_path) if name != CURRENT_FILE) == \
+        sorted(os.path.basename(path) for path in paths[-2:])
+
+
+def test_hot_swap_picks_up_new_snapshots_and_skips_bad_ones(tmp_path):
+    publish_snapshot(write_snapshot(tmp_path, ["first"])[0])
+    index = HotSwapVectorIndex(str(tmp_path), poll_seconds=0)
+    assert index.has_chunk("id-0") and len(index) == 1
+
+    def poll_until(done):
+        for _ in range(200):
+            index.top_k(np.ones(16), k=1)
+            if done():
+                return
+            time.sleep(0.01)
+        raise AssertionError("snapshot swap did not finish")
+
+    second, _ = write_snapshot(tmp_path, ["second", "third"], seed=1)
+    publish_snapshot(second)
+    poll_until(lambda: index.swaps == 1)
+    assert len(index) == 2
+
+    bad, _ = write_snapshot(tmp_path, ["bad"], seed=2)
+    data = bytearray(open(bad, "rb").read())
+    data[100] ^= 0xFF
+    open(bad, "wb").write(bytes(data))
+    publish_snapshot(bad, keep=0)
+    poll_until(lambda: index.last_error is not None)
+    assert index.swaps == 1 and len(index) == 2  # still serving the last good snapshot
+    assert index._failed[0] == bad
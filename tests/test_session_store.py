@@ -0,0 +1,98 @@
+import json
+import sqlite3
+import time
+
+from src.utils.session_store import SQLiteSessionStore
+
+
+def test_append_keeps_session_stats(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "memory.sqlite3"))
+    assert store.session_info("a") == (0, 0)
+
+    count, first_id = store.append("a", "user", "hello")
+    assert count == 1
+    store.append("b", "user", "other session")
+    count, last_id = store.append("a", "assistant", "hi")
+
+    assert count == 2 and last_id > first_id
+    assert store.session_info("a") == (2, last_id)
+    assert store.recent("a", 10) == [(first_id, "user", "hello"), (last_id, "assistant", "hi")]
+    assert store.count() == 3
+    store.close()
+
+
+def test_stats_trigger_covers_other_writers(tmp_path):
+    """Rows inserted without going through append() still update the sessions table"""
+    path = str(tmp_path / "memory.sqlite3")
+    store = SQLiteSessionStore(path)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("INSERT INTO messages (session_id, role, message, created_at) VALUES ('a', 'user', 'x', ?)",
+                     (time.time(),))
+    conn.close()
+    assert store.session_info("a")[0] == 1
+    store.close()
+
+
+def test_backfills_sessions_of_an_older_store(tmp_path):
+    path = str(tmp_path / "memory.sqlite3")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                     "role TEXT NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL)")
+        conn.executemany("INSERT INTO messages (session_id, role, message, created_at) VALUES (?, ?, ?, ?)",
+                         [("a", "user", "one", 1.0), ("a", "assistant", "two", 2.0), ("b", "user", "three", 3.0)])
+    conn.close()
+
+    store = SQLiteSessionStore(path)
+    assert store.session_info("a") == (2, 2)
+    assert store.session_info("b") == (1, 3)
+    assert store.append("a", "user", "four") == (3, 4)
+    store.close()
+
+    # The backfill runs once: reopening must not double the counts
+    assert SQLiteSessionStore(path).session_info("a") == (3, 4)
+
+
+def test_migrates_legacy_json_once(tmp_path):
+    legacy = tmp_path / "conversation_memory.json"
+    legacy.write_text(json.dumps({"a": [{"role": "user", "message": "hi"}, {"role": "assistant", "message": "hello"}],
+                                  "b": [{"role": "user", "message": "hey"}]}))
+    path = str(tmp_path / "memory.sqlite3")
+
+    assert SQLiteSessionStore(path).migrate_from_json(str(legacy)) == 3
+    store = SQLiteSessionStore(path)
+    assert store.migrate_from_json(str(legacy)) == 0
+    assert [row[1:] for row in store.recent("a", 10)] == [("user", "hi"), ("assistant", "hello")]
+    assert store.count() == 3
+
+
+def test_summaries_and_vectors_only_move_forward(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "memory.sqlite3"))
+    assert store.get_summary("a") == ("", 0, 0)
+    assert store.save_summary("a", "newer", 10, 8)
+    assert not store.save_summary("a", "older", 6, 4)
+    assert store.get_summary("a") == ("newer", 10, 8)
+
+    assert store.save_session_vector("a", "model", b"\0" * 8, 10, 10)
+    assert not store.save_session_vector("a", "model", b"\1" * 8, 6, 6)
+    assert store.save_session_vector("a", "other-model", b"\2" * 8, 2, 2)  # a model change always wins
+    assert store.get_session_vector("a") == ("other-model", b"\2" * 8, 2, 2)
+
+
+def test_expire_sessions_removes_every_table(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "memory.sqlite3"))
+    store.append("old", "user", "bye")
+    store.save_summary("old", "s", 1, 1)
+    store.save_session_vector("old", "model", b"\0" * 8, 1, 1)
+    time.sleep(0.02)
+    cutoff = time.time()
+    time.sleep(0.02)
+    store.append("new", "user", "hello")
+
+    assert store.expire_sessions(cutoff) == 1
+    assert store.session_info("new")[0] == 1
+    assert store.session_info("old") == (0, 0)
+    assert store.get_summary("old") == ("", 0, 0)
+    assert store.get_session_vector("old") is None
+    assert store.count() == 1
@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.core.vector_index import (
+    ChunkStoreWriter, MemmapVectorIndex, EMBEDDINGS_FILE, INDEX_FORMAT_VERSION, MANIFEST_FILE, SCALES_FILE
+)
+from src.data_processing.export_vector_index import quantize_int8
+
+
+def write_index(index_dir, texts, vectors, dtype):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    if dtype == "int8":
+        quantized, scales = quantize_int8(vectors)
+        np.save(os.path.join(index_dir, EMBEDDINGS_FILE), quantized)
+        np.save(os.path.join(index_dir, SCALES_FILE), scales)
+    else:
+        np.save(os.path.join(index_dir, EMBEDDINGS_FILE), vectors.astype(np.float16))
+    chunks = ChunkStoreWriter(index_dir)
+    for row, text in enumerate(texts):
+        chunks.add(f"id-{row}", text, {"row": row})
+    assert chunks.close() == len(texts)
+    with open(os.path.join(index_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({"format_version": INDEX_FORMAT_VERSION, "dtype": dtype, "dim": vectors.shape[1],
+                   "count": len(texts)}, f)
+
+
+class FakeEmbeddings:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.vectors[int(text)]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_round_trip_matches_exact_search(tmp_path, dtype):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 32)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(49)] + ["ünïcödé"]
+    write_index(str(tmp_path), texts, vectors, dtype)
+    index = MemmapVectorIndex(str(tmp_path), embedding_function=FakeEmbeddings(vectors), block_rows=16)
+
+    assert len(index) == 50
+    query = rng.normal(size=32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = unit @ (query / np.linalg.norm(query))
+    rows, scores = index.top_k(query, k=5)
+    assert rows.tolist() == np.argsort(-expected)[:5].tolist()
+    assert np.allclose(scores, expected[rows], atol=0.02)
+    assert np.allclose(index.vectors(rows), unit[rows], atol=0.02)
+
+    document = index.similarity_search("49", k=1)[0]
+    assert (document.page_content, document.metadata, document.id) == ("ünïcödé", {"row": 49}, "id-49")
+
+
+def test_rejects_unknown_format(tmp_path):
+    write_index(str(tmp_path), ["a"], np.ones((1, 4), dtype=np.float32), "float16")
+    with open(tmp_path / MANIFEST_FILE, 'w') as f:
+        json.dump({"format_version": INDEX_FORMAT_VERSION + 1, "dtype": "float16"}, f)
+    with pytest.raises(ValueError, match="Unsupported"):
+        MemmapVectorIndex(str(tmp_path))
+
+
+def test_similarity_search_needs_an_embedding_function(tmp_path):
+    write_index(str(tmp_path), ["a"], np.ones((1, 4), dtype=np.float32), "float16")
+    with pytest.raises(ValueError):
+        MemmapVectorIndex(str(tmp_path)).similarity_search("a")